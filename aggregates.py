@@ -0,0 +1,247 @@
+"""Cubo pré-agregado e resumos de preço para os gráficos da Aba 1.
+
+O cubo guarda contagens e somas por combinação de fabricante, tipo, condição,
+ano do modelo, combustível e transmissão. Ele é construído uma vez por versão
+do dataset e cada gráfico de contagem lê apenas a sua fatia, em vez de
+reagrupar as linhas brutas de `car_data` a cada rerun. Os resumos de preço
+fazem o mesmo para o box plot e o histograma de comparação.
+"""
+import numpy as np
+import pandas as pd
+
+CUBE_DIMENSIONS = ['manufacturer', 'type', 'condition', 'model_year', 'fuel', 'transmission']
+CUBE_MEASURES = ['count', 'price_sum', 'odometer_sum', 'odometer_count']
+
+
+def build_cube(df, extra_dimensions=()):
+    """Agrega `df` nas dimensões do cubo (ausentes viram grupos próprios)."""
+    return (
+        df.groupby([*extra_dimensions, *CUBE_DIMENSIONS], observed=True, dropna=False)
+        .agg(
+            count=('price', 'size'),
+            price_sum=('price', 'sum'),
+            odometer_sum=('odometer', 'sum'),
+            odometer_count=('odometer', 'count'),
+        )
+        .reset_index()
+    )
+
+
+def split_cube(cube, column, partitions):
+    """Separa um cubo agregado também por `column` em um cubo por partição.
+
+    Partições sem linhas recebem um cubo vazio.
+    """
+    parts = {partition: part for partition, part in cube.groupby(column, observed=True)}
+    empty = cube.iloc[:0].drop(columns=column)
+    return {
+        partition: parts[partition].drop(columns=column).reset_index(drop=True) if partition in parts else empty
+        for partition in partitions
+    }
+
+
+def combine_cubes(cubes, subtract=()):
+    """Soma cubos parciais (um por partição) no cubo do conjunto.
+
+    As medidas são contagens e somas, então o resultado é o mesmo de
+    `build_cube` sobre todas as linhas. Cubos em `subtract` entram com sinal
+    trocado (partições substituídas ou removidas de um total já somado).
+    """
+    cubes = [*cubes, *(cube.assign(**{m: -cube[m] for m in CUBE_MEASURES}) for cube in subtract)]
+    # Cubos de versões diferentes do dataset podem ter categorias diferentes
+    for column in CUBE_DIMENSIONS:
+        dtypes = [cube[column].dtype for cube in cubes]
+        if isinstance(dtypes[0], pd.CategoricalDtype) and any(dtype != dtypes[0] for dtype in dtypes):
+            categories = sorted(set().union(*(dtype.categories for dtype in dtypes)))
+            cubes = [cube.assign(**{column: cube[column].cat.set_categories(categories)}) for cube in cubes]
+    combined = (
+        pd.concat(cubes, ignore_index=True)
+        .groupby(CUBE_DIMENSIONS, observed=True, dropna=False)[CUBE_MEASURES]
+        .sum()
+        .reset_index()
+    )
+    if subtract:
+        combined = combined[combined['count'] > 0].reset_index(drop=True)
+    return combined
+
+
+def filter_cube(cube, filters):
+    """Aplica filtros (formato de `data_browser`) direto nas linhas do cubo.
+
+    Só vale para filtros sobre dimensões do cubo; retorna None caso contrário,
+    e aí o cubo precisa ser reconstruído a partir das linhas filtradas.
+    """
+    if any(column not in CUBE_DIMENSIONS for column, _, _ in filters):
+        return None
+    mask = np.ones(len(cube), dtype=bool)
+    for column, op, value in filters:
+        if op == 'in':
+            mask &= cube[column].isin(value).to_numpy()
+        else:
+            mask &= cube[column].between(*value).to_numpy(dtype=bool)
+    return cube[mask]
+
+
+def cube_slice(cube, dimensions, measure='count'):
+    """Soma `measure` sobre as demais dimensões (ausentes descartados, como no groupby)."""
+    return (
+        cube.groupby(dimensions, observed=True)[measure]
+        .sum()
+        .reset_index()
+    )
+
+
+def manufacturer_counts(cube):
+    """Equivalente a `df['manufacturer'].value_counts()`."""
+    counts = cube_slice(cube, 'manufacturer').set_index('manufacturer')['count']
+    return counts.sort_values(ascending=False)
+
+
+# --- Resumos de Preço (box plot e histogramas) ---
+
+FINE_BINS = 2000          # grade fixa fina, compartilhada por todos os grupos
+MAX_OUTLIERS_PER_BOX = 100
+
+
+def build_price_summaries(df, n_fine_bins=FINE_BINS):
+    """Resumo de preços por (fabricante, condição), calculado uma vez por versão.
+
+    - `edges`/`counts`: contagens em uma grade fixa fina de faixas de preço, por
+      grupo; os histogramas somam e reagrupam essas faixas sem tocar nas linhas.
+    - `box`: quartis, cercas de Tukey, média e uma amostra dos outliers por
+      condição, no formato aceito pelo `go.Box` com estatísticas pré-calculadas.
+    """
+    price = df['price'].to_numpy(dtype='float64')
+    edges = np.linspace(price.min(), price.max(), n_fine_bins + 1)
+    fine_bin = np.clip(np.searchsorted(edges, price, side='right') - 1, 0, n_fine_bins - 1)
+
+    groups = df[['manufacturer', 'condition']].assign(bin=fine_bin)
+    counts = (
+        groups.groupby(['manufacturer', 'condition', 'bin'], observed=True)
+        .size()
+        .unstack('bin', fill_value=0)
+        .reindex(columns=range(n_fine_bins), fill_value=0)
+    )
+
+    return {
+        'edges': edges,
+        'counts': counts,
+        'box': _box_stats(df, 'condition'),
+    }
+
+
+def _box_stats(df, group_column):
+    rows = []
+    for group, prices in df.groupby(group_column, observed=True)['price']:
+        values = np.sort(prices.to_numpy(dtype='float64'))
+        q1, median, q3 = np.quantile(values, [0.25, 0.5, 0.75])
+        iqr = q3 - q1
+        inside = values[(values >= q1 - 1.5 * iqr) & (values <= q3 + 1.5 * iqr)]
+        outliers = values[(values < inside.min()) | (values > inside.max())]
+        if len(outliers) > MAX_OUTLIERS_PER_BOX:
+            # Amostra uniforme por posto: preserva a forma da cauda
+            keep = np.linspace(0, len(outliers) - 1, MAX_OUTLIERS_PER_BOX).round().astype(int)
+            outliers = outliers[keep]
+        rows.append({
+            group_column: group,
+            'q1': q1,
+            'median': median,
+            'q3': q3,
+            'lowerfence': inside.min(),
+            'upperfence': inside.max(),
+            'mean': values.mean(),
+            'n': len(values),
+            'outliers': outliers,
+        })
+    return pd.DataFrame(rows).set_index(group_column)
+
+
+def price_histogram(summaries, manufacturers, bin_mode='adaptive', target_bins=None):
+    """Histograma de preço por fabricante lido da grade fina do resumo.
+
+    `bin_mode='fixed'` usa as mesmas faixas para qualquer seleção (largura
+    definida pelo dataset inteiro); `'adaptive'` recorta a faixa de preços dos
+    fabricantes escolhidos e escolhe a largura pela regra da raiz quadrada.
+    Retorna (bordas, {fabricante: contagens}).
+    """
+    edges = summaries['edges']
+    counts = summaries['counts']
+    selected = counts[counts.index.get_level_values('manufacturer').isin(manufacturers)]
+    per_manufacturer = selected.groupby(level='manufacturer', observed=True).sum()
+
+    if bin_mode == 'fixed':
+        scope = counts.to_numpy().sum(axis=0)
+    else:
+        scope = per_manufacturer.to_numpy().sum(axis=0)
+
+    nonzero = np.flatnonzero(scope)
+    if len(nonzero) == 0:
+        return edges[:2], {m: np.zeros(1, dtype=int) for m in per_manufacturer.index}
+    first, last = nonzero[0], nonzero[-1] + 1
+
+    if target_bins is None:
+        target_bins = int(np.clip(np.sqrt(scope.sum()), 10, 200))
+    factor = max(1, int(np.ceil((last - first) / target_bins)))
+
+    # Agrupa `factor` faixas finas consecutivas em uma faixa exibida
+    n_coarse = int(np.ceil((last - first) / factor))
+    coarse_edges = edges[np.minimum(first + np.arange(n_coarse + 1) * factor, len(edges) - 1)]
+    histograms = {}
+    for manufacturer, row in per_manufacturer.iterrows():
+        fine = row.to_numpy()[first:last]
+        padded = np.pad(fine, (0, n_coarse * factor - len(fine)))
+        histograms[manufacturer] = padded.reshape(n_coarse, factor).sum(axis=1)
+    return coarse_edges, histograms
+
+
+# --- Depreciação (dispersão amostrada + regressão por tipo) ---
+
+SCATTER_POINT_BUDGET = 20000   # máximo de pontos enviados ao navegador
+DENSITY_GRID_BINS = 80
+
+
+def build_depreciation_summary(df, point_budget=SCATTER_POINT_BUDGET, seed=0):
+    """Dados do gráfico de depreciação, calculados uma vez por versão.
+
+    - `ols`: inclinação/intercepto por tipo, em forma fechada (somas
+      suficientes de um único groupby) sobre todas as linhas do recorte.
+    - `sample`: amostra estratificada por tipo, proporcional ao tamanho de cada
+      tipo, limitada a `point_budget` pontos no total.
+    - `density`: grade 2D de contagens (quilometragem x preço) das linhas todas.
+    """
+    # Limita a quilometragem para melhor visualização da tendência (opcional)
+    df_scatter = df.loc[df['odometer'] < df['odometer'].quantile(0.99), ['odometer', 'price', 'type']]
+    df_scatter = df_scatter.dropna(subset=['type'])
+
+    x = df_scatter['odometer'].astype('float64')
+    y = df_scatter['price'].astype('float64')
+    sums = (
+        pd.DataFrame({'type': df_scatter['type'], 'x': x, 'y': y, 'xx': x * x, 'xy': x * y})
+        .groupby('type', observed=True)
+        .agg(n=('x', 'size'), x=('x', 'sum'), y=('y', 'sum'), xx=('xx', 'sum'), xy=('xy', 'sum'),
+             x_min=('x', 'min'), x_max=('x', 'max'))
+    )
+    denominator = sums['n'] * sums['xx'] - sums['x'] ** 2
+    slope = (sums['n'] * sums['xy'] - sums['x'] * sums['y']) / denominator.where(denominator != 0)
+    ols = pd.DataFrame({
+        'slope': slope,
+        'intercept': (sums['y'] - slope * sums['x']) / sums['n'],
+        'x_min': sums['x_min'],
+        'x_max': sums['x_max'],
+        'n': sums['n'],
+    })
+
+    if len(df_scatter) > point_budget:
+        sample = df_scatter.groupby('type', observed=True).sample(
+            frac=point_budget / len(df_scatter), random_state=seed
+        )
+    else:
+        sample = df_scatter
+
+    counts, x_edges, y_edges = np.histogram2d(x, y, bins=DENSITY_GRID_BINS)
+    return {
+        'ols': ols,
+        'sample': sample.reset_index(drop=True),
+        'density': {'counts': counts, 'x_edges': x_edges, 'y_edges': y_edges},
+        'total_points': len(df_scatter),
+    }
@@ -1,26 +1,95 @@
 import streamlit as st
-import pandas as pd
-import plotly.express as px
-import io
-import sys
+import contextvars
+import hashlib
+import importlib.util
+import os
+import threading
+import time
+import types
 from pathlib import Path
-from langchain.tools import tool
-
-# --- Importações do LangChain (Tool Calling Agent) ---
-try:
-    from langchain_google_genai import ChatGoogleGenerativeAI
-    from langchain.agents import create_agent
-    from langchain.tools import tool
-    from langchain_core.prompts import ChatPromptTemplate
-    
-    IA_DISPONIVEL = True
-except ImportError:
-    IA_DISPONIVEL = False
-except Exception:
-    IA_DISPONIVEL = False
 
-# Read System Prompt from file
-system_prompt = Path("./prompts/system.txt").read_text()
+import aggregates
+import assistant
+import charts
+import chat_context
+import data_browser
+import data_engine
+import data_store
+import filter_index
+import llm_scheduler
+import metrics
+import partition_store
+import query_engine
+import sandbox
+import tool_cache
+
+# --- Importações do LangChain (Tool Calling Agent), sob demanda ---
+# O stack de IA leva segundos para importar e só a Aba 2 usa: o dashboard
+# renderiza sem ele, e a importação roda em segundo plano depois da primeira
+# renderização (ou na primeira vez que o chat precisa dele). Aqui só se
+# verifica se os pacotes estão instalados, sem importá-los.
+AI_PACKAGES = ("langchain", "langchain_google_genai")
+IA_DISPONIVEL = all(importlib.util.find_spec(name) is not None for name in AI_PACKAGES)
+
+# Uma importação por processo; None se falhar (a Aba 2 fica desativada)
+@st.cache_resource
+def load_ai_stack():
+    try:
+        from langchain_google_genai import ChatGoogleGenerativeAI
+        from langchain.agents import create_agent
+        from langchain.tools import tool
+    except Exception:
+        return None
+    return types.SimpleNamespace(ChatGoogleGenerativeAI=ChatGoogleGenerativeAI, create_agent=create_agent, tool=tool)
+
+# Backend de dados: 'pandas' (padrão, dataset inteiro na memória) ou 'duckdb'
+# (Parquet consultado fora da memória). ANALISTA_PARQUET_SOURCE aponta o
+# DuckDB para um glob de arquivos Parquet já limpos, em vez do CSV.
+DATA_BACKEND = os.environ.get("ANALISTA_DATA_BACKEND", data_engine.DEFAULT_BACKEND)
+PARQUET_SOURCE = os.environ.get("ANALISTA_PARQUET_SOURCE")
+# Diretório de arquivos CSV diários (ingestão incremental, particionada por
+# `date_posted`), em vez do vehicles_us.csv único
+DATA_DIR = os.environ.get("ANALISTA_DATA_DIR")
+
+# Caminho absoluto: o app pode ser iniciado de qualquer diretório. No backend
+# DuckDB o agente consulta com SQL, então o prompt é outro.
+PROMPT_PATH = Path(__file__).resolve().parent / "prompts" / ("system_sql.txt" if DATA_BACKEND == 'duckdb' else "system.txt")
+
+MODEL_NAME = "gemini-2.5-flash"
+# Com ANALISTA_FAKE_LLM definida, o chat usa um modelo local (testes offline, sem chave)
+USE_FAKE_LLM = bool(os.environ.get("ANALISTA_FAKE_LLM"))
+FAKE_MODEL_NAME = "fake-tool-calling"
+ACTIVE_MODEL_NAME = FAKE_MODEL_NAME if USE_FAKE_LLM else MODEL_NAME
+
+# Respostas prontas na inicialização do processo: cada uma é uma chamada ao
+# modelo, então com o Gemini só quando pedido (ANALISTA_WARMUP=1). Sem isso, o
+# pré-cálculo começa quando a Aba 2 é aberta pela primeira vez.
+WARM_RESPONSES_AT_STARTUP = USE_FAKE_LLM or os.environ.get("ANALISTA_WARMUP") == "1"
+
+# Prévia da saída da ferramenta enquanto ela roda: fim do texto, com intervalo mínimo entre atualizações
+TOOL_PREVIEW_CHARS = 2000
+TOOL_PREVIEW_SECONDS = 0.1
+
+# --- Métricas de Desempenho ---
+# Spans de tempo dos caminhos quentes (carga, agregados, figuras, ferramenta,
+# modelo), compartilhados entre sessões. ANALISTA_ADMIN exibe o painel
+# "Desempenho"; ANALISTA_METRICS_PATH grava o snapshot em JSON a cada rerun.
+ADMIN_PANEL = bool(os.environ.get("ANALISTA_ADMIN"))
+METRICS_PATH = os.environ.get("ANALISTA_METRICS_PATH")
+
+@st.cache_resource
+def get_metrics():
+    return metrics.Recorder()
+
+recorder = get_metrics()
+rerun_start = time.perf_counter()
+
+# Relido só quando o arquivo muda (a chave inclui o mtime)
+@st.cache_resource(max_entries=1)
+def read_system_prompt(prompt_mtime_ns):
+    return PROMPT_PATH.read_text()
+
+system_prompt = read_system_prompt(PROMPT_PATH.stat().st_mtime_ns)
 
 # --- Configuração da Página ---
 st.set_page_config(
@@ -29,22 +98,298 @@ st.set_page_config(
     layout="wide"
 )
 
+# --- Ingestão Incremental (ANALISTA_DATA_DIR) ---
+# Um por processo: varre o diretório no máximo uma vez por intervalo e só relê
+# os arquivos novos ou alterados. O manifesto traz uma versão por partição.
+@st.cache_resource
+def get_partition_store():
+    return partition_store.PartitionStore(DATA_DIR, data_store.SNAPSHOT_DIR)
+
+manifest = None
+if DATA_DIR and not data_store.SNAPSHOT_DISPONIVEL:
+    st.error("O modo de diretório (ANALISTA_DATA_DIR) grava fragmentos Parquet e precisa do pyarrow instalado.")
+elif DATA_DIR:
+    try:
+        with recorder.span('data.refresh'):
+            manifest = get_partition_store().current()
+    except Exception as e:
+        st.error(f"Erro ao atualizar os arquivos de '{DATA_DIR}': {e}")
+
 # --- Carregar e Limpar os Dados (com cache) ---
-@st.cache_data
-def load_data():
+# cache_resource devolve sempre o mesmo objeto (cache_data desserializaria uma
+# cópia completa a cada rerun); o Copy-on-Write protege o frame compartilhado.
+# O resultado é um backend de data_engine: agregados, contagens e páginas
+# passam por ele, e só o backend pandas tem o DataFrame (`frame`).
+def open_dataset():
+    """Backend de data_engine para a fonte configurada (CSV, diretório ou Parquet), ou None."""
+    if DATA_DIR:
+        if manifest is None:
+            return None
+        if DATA_BACKEND == 'duckdb':
+            return data_engine.open_duckdb(
+                snapshot_dir=data_store.SNAPSHOT_DIR,
+                source=partition_store.fragment_paths(manifest),
+                version=manifest['version'],
+            )
+        # Só os arquivos novos desde a última leitura (ver PartitionStore.read_frame)
+        df = get_partition_store().read_frame(manifest)
+    elif DATA_BACKEND == 'duckdb':
+        # Snapshot Parquet (ou os arquivos de PARQUET_SOURCE), sem carregar na memória
+        return data_engine.open_duckdb(source=PARQUET_SOURCE)
+    else:
+        # Snapshot colunar em disco: o CSV só é reprocessado quando muda
+        df = data_store.load_car_data()
+    version = data_store.dataset_version(df)
+    # Filtros e ordenações passam pelos getters em cache (índice invertido)
+    return data_engine.PandasEngine(
+        df,
+        row_ids_for=lambda filters, sort_by, ascending: get_row_ids(version, filters, sort_by, ascending),
+        frame_for=lambda filters: get_filtered_data(version, filters),
+    )
+
+# `source_version` é a versão do manifesto (None no modo de arquivo único): um
+# refresh com mudanças troca o dataset sem limpar o cache à mão.
+@st.cache_resource(max_entries=1)
+def load_data(source_version=None):
     try:
-        df = pd.read_csv('vehicles_us.csv', usecols=list(range(13)))
-        df.dropna(subset=['price', 'odometer', 'condition', 'model_year', 'model'], inplace=True)
-        df['manufacturer'] = df['model'].apply(lambda x: x.split()[0] if isinstance(x, str) else 'Outros')
-        return df
+        with get_metrics().span('data.load', backend=DATA_BACKEND) as span:
+            engine = open_dataset()
+            span['rows'] = engine.n_rows if engine is not None else 0
+        return engine
     except FileNotFoundError:
-        st.error("Erro: O arquivo 'vehicles_us.csv' não foi encontrado no diretório raiz.")
+        if DATA_DIR:
+            st.error(f"Erro: nenhum arquivo CSV encontrado em '{DATA_DIR}'.")
+        else:
+            st.error("Erro: O arquivo 'vehicles_us.csv' não foi encontrado no diretório raiz.")
         return None
     except Exception as e:
         st.error(f"Erro ao carregar os dados: {e}")
         return None
 
-car_data = load_data()
+dataset = load_data(manifest['version'] if manifest is not None else None)
+car_data = dataset.frame if dataset is not None else None   # None no backend DuckDB
+dataset_version = dataset.version if dataset is not None else None
+
+def scope_version(filters=()):
+    """Versão dos dados que `filters` enxerga.
+
+    Com ingestão particionada, só muda quando alguma partição de data dentro
+    do recorte muda; no arquivo único é a própria versão do dataset.
+    """
+    if manifest is None:
+        return dataset_version
+    return partition_store.scope_version(manifest, filters)
+
+# --- Agregados e Figuras (com cache por versão e filtro global) ---
+# `filters` é a tupla do filtro global (formato de data_browser); () = dataset inteiro.
+# Estruturas posicionais (índices, ordenações, frames filtrados, páginas) são
+# chaveadas pela versão do dataset; agregados, figuras e contagens, pela versão
+# do escopo do filtro (`data_version`), e sobrevivem a mudanças fora dele.
+# Índice e ordenações do frame mais recente; quando um refresh só acrescenta
+# arquivos, são estendidos com as linhas novas em vez de refeitos
+@st.cache_resource
+def get_positional_caches():
+    return {
+        'filter_index': partition_store.AppendCache(filter_index.build_filter_index, filter_index.extend_filter_index),
+        'sort_orders': partition_store.AppendCache(data_browser.build_sort_orders, data_browser.extend_sort_orders),
+    }
+
+@st.cache_resource(max_entries=2)
+def get_filter_index(dataset_version):
+    with get_metrics().span('index.filter'):
+        return get_positional_caches()['filter_index'].get(car_data)
+
+@st.cache_resource(max_entries=2)
+def get_sort_orders(dataset_version):
+    with get_metrics().span('index.sort_orders'):
+        return get_positional_caches()['sort_orders'].get(car_data)
+
+@st.cache_resource(max_entries=32)
+def get_row_ids(dataset_version, filters=(), sort_by=None, ascending=True):
+    return data_browser.row_ids(
+        car_data,
+        get_sort_orders(dataset_version),
+        filters,
+        sort_by,
+        ascending,
+        index=get_filter_index(dataset_version)
+    )
+
+@st.cache_resource(max_entries=8)
+def get_filtered_data(dataset_version, filters=()):
+    if not filters:
+        return car_data
+    return car_data.take(get_row_ids(dataset_version, filters))
+
+# Contagem, página e metadados de colunas, nos dois backends
+@st.cache_resource(max_entries=32)
+def get_count(data_version, filters=()):
+    return dataset.count(filters)
+
+@st.cache_resource(max_entries=16)
+def get_page(dataset_version, filters=(), sort_by=None, ascending=True, page_number=1, page_size=50):
+    return dataset.page(filters, sort_by, ascending, page_number, page_size)
+
+@st.cache_resource
+def get_categories(dataset_version, column):
+    return dataset.categories(column)
+
+@st.cache_resource
+def get_value_range(dataset_version, column):
+    return dataset.value_range(column)
+
+# Um cubo por partição de data, compartilhado entre versões do manifesto: um
+# refresh só reagrega as partições que mudaram
+@st.cache_resource
+def get_partition_cubes():
+    return partition_store.PartitionCache(combine=aggregates.combine_cubes)
+
+def combined_partition_cube(filters):
+    """Cubo do recorte somando os cubos das partições; None se não der para montar assim."""
+    partitions = partition_store.partitions_for(manifest, filters)
+    # Linhas sem data não têm como ser separadas por partição: cubo direto
+    if not partitions or partition_store.MISSING_PARTITION in partitions:
+        return None
+    cache = get_partition_cubes()
+    versions = {partition: manifest['partitions'][partition]['version'] for partition in partitions}
+
+    def build(stale):
+        with get_metrics().span('aggregate.partition_cubes', partitions=len(stale)):
+            return dataset.build_partition_cubes(partition_store.PARTITION_COLUMN, stale)
+
+    if len(partitions) == len(manifest['partitions']):
+        # Período inteiro: total mantido pela diferença (soma as partições novas,
+        # subtrai as substituídas)
+        cube = cache.total(versions, build)
+    else:
+        cache.prune(manifest['partitions'])
+        cube = aggregates.combine_cubes(cache.get(versions, build).values())
+    other_filters = tuple(f for f in filters if f[0] != partition_store.PARTITION_COLUMN)
+    return aggregates.filter_cube(cube, other_filters)
+
+def build_cube(filters):
+    if manifest is not None:
+        cube = combined_partition_cube(filters)
+        if cube is not None:
+            return cube
+        return dataset.build_cube(filters)
+    if not filters:
+        return dataset.build_cube()
+    # Filtros sobre dimensões do cubo recortam o cubo completo, sem voltar às linhas
+    cube = aggregates.filter_cube(get_cube(scope_version()), filters)
+    if cube is None:
+        cube = dataset.build_cube(filters)
+    return cube
+
+# As spans ficam dentro dos getters: só os cache misses (construções) são medidos
+@st.cache_resource(max_entries=16)
+def get_cube(data_version, filters=()):
+    with get_metrics().span('aggregate.cube', filtered=int(bool(filters))):
+        return build_cube(filters)
+
+@st.cache_resource(max_entries=16)
+def get_price_summaries(data_version, filters=()):
+    with get_metrics().span('aggregate.summaries', filtered=int(bool(filters))):
+        return dataset.build_price_summaries(filters)
+
+@st.cache_resource(max_entries=16)
+def get_depreciation_summary(data_version, filters=()):
+    with get_metrics().span('aggregate.depreciation', filtered=int(bool(filters))):
+        return dataset.build_depreciation_summary(filters)
+
+CHART_SOURCES = {
+    'cube': get_cube,
+    'summaries': get_price_summaries,
+    'depreciation': get_depreciation_summary,
+}
+
+@st.cache_resource(max_entries=64)
+def get_figure(chart_id, data_version, filters=(), **widget_state):
+    build_figure, source = charts.CHARTS[chart_id]
+    data = CHART_SOURCES[source](data_version, filters)
+    with get_metrics().span(f"figure.{chart_id}"):
+        return build_figure(data, **widget_state)
+
+# Um pool por versão do snapshot do arquivo único. No modo de diretório, um pool
+# só: cada chamada leva o manifesto e os workers leem apenas os arquivos novos.
+# O manifesto vem como argumento, não da global: a ferramenta do agente roda
+# com as globais do primeiro rerun.
+@st.cache_resource(max_entries=1)
+def get_sandbox(dataset_version, _manifest=None):
+    return sandbox.SandboxPool(DATA_DIR or data_store.CSV_PATH, data_store.SNAPSHOT_DIR, manifest=_manifest)
+
+def sandbox_for(dataset_version, manifest):
+    return get_sandbox(dataset_version if manifest is None else None, manifest)
+
+# Compartilhado entre sessões; as chaves levam a versão do escopo do filtro,
+# então resultados de partições que mudaram deixam de valer sozinhos
+@st.cache_resource
+def get_tool_cache():
+    return tool_cache.ToolResultCache()
+
+# Consultas diretas (sem LLM) sobre os agregados em cache; métrica de acerto compartilhada.
+# Precisam do DataFrame: None no backend DuckDB (tudo vai para o agente).
+@st.cache_resource(max_entries=1)
+def get_query_engine(dataset_version):
+    if car_data is None:
+        return None
+    return query_engine.QueryEngine(
+        car_data,
+        cube_for=lambda filters: get_cube(scope_version(filters), filters),
+        frame_for=lambda filters: get_filtered_data(dataset_version, filters),
+        sorted_ids_for=lambda filters, sort_by, ascending: get_row_ids(dataset_version, filters, sort_by, ascending),
+    )
+
+# Respostas prontas das perguntas sugeridas (TTL + LRU), compartilhadas entre sessões
+@st.cache_resource
+def get_response_cache():
+    return assistant.ResponseCache()
+
+# Fila única das chamadas ao modelo: limita a concorrência entre todas as
+# sessões, reveza entre elas, repete erros 429 com backoff e junta perguntas
+# idênticas em andamento
+@st.cache_resource
+def get_llm_scheduler():
+    return llm_scheduler.Scheduler()
+
+# Uma rodada de pré-cálculo por (versão do dataset, modelo, system prompt): roda
+# na inicialização do chat e de novo quando os dados mudam. Sem filtro global.
+@st.cache_resource
+def start_response_warmup(dataset_version, model_name, system_prompt, _agent):
+    def key_for(prompt):
+        return assistant.response_key(prompt, scope_version(), (), model_name, system_prompt)
+
+    # Passa pela mesma fila das sessões (como uma sessão a mais no rodízio)
+    scope = current_agent_scope(())
+    def invoke(messages):
+        scope_token = agent_scope.set(scope)
+        try:
+            ticket = get_llm_scheduler().submit("warmup", None, lambda: assistant.invoke_events(_agent, messages))
+        finally:
+            agent_scope.reset(scope_token)
+        response = ticket.result()
+        record_llm_turn('llm.warmup', time.perf_counter() - ticket.submitted_at, response["messages"])
+        return response
+
+    # Perguntas que a consulta direta responde não precisam do modelo
+    engine = get_query_engine(dataset_version)
+    prompts = [prompt for prompt in assistant.SUGGESTED_PROMPTS if engine is None or engine.parse(prompt) is None]
+
+    thread = threading.Thread(
+        target=assistant.warm_responses,
+        args=(invoke, get_response_cache(), key_for, prompts),
+        name="response-warmup",
+        daemon=True,
+    )
+    thread.start()
+    return thread
+
+@st.cache_resource(max_entries=64)
+def get_payload_size(chart_id, data_version, filters=(), **widget_state):
+    fig = get_figure(chart_id, data_version, filters, **widget_state)
+    with get_metrics().span(f"serialize.{chart_id}") as span:
+        span['bytes'] = charts.payload_size(fig)
+    return span['bytes']
 
 st.sidebar.title("Sobre o Projeto 💡")
 st.sidebar.markdown(
@@ -63,6 +408,53 @@ st.sidebar.markdown(
 )
 st.sidebar.info("Acesse a ***Aba 2 (Consultor de Dados)*** para interagir com o **Agente de IA**.")
 
+# --- Filtro Global (todos os gráficos e os dados vistos pela IA) ---
+global_filters = ()
+if dataset is not None:
+    st.sidebar.header("Filtro Global 🔎")
+    full_cube = get_cube(scope_version())
+    global_selected = {
+        'manufacturer': st.sidebar.multiselect("Fabricante", sorted(aggregates.manufacturer_counts(full_cube).index), key="global_manufacturers"),
+        'condition': st.sidebar.multiselect("Condição", get_categories(dataset_version, 'condition'), key="global_conditions"),
+        'fuel': st.sidebar.multiselect("Combustível", get_categories(dataset_version, 'fuel'), key="global_fuels"),
+        'type': st.sidebar.multiselect("Tipo", get_categories(dataset_version, 'type'), key="global_types"),
+    }
+    full_years = (int(full_cube['model_year'].min()), int(full_cube['model_year'].max()))
+    global_years = st.sidebar.slider("Ano do Modelo", *full_years, full_years, key="global_years")
+    global_filters = data_browser.make_filters(global_selected, {'model_year': (global_years, full_years)})
+
+    # Período como lista de datas: no modo de diretório, recorta as partições
+    dates = get_categories(dataset_version, partition_store.PARTITION_COLUMN)
+    if len(dates) > 1:
+        full_dates = (dates[0], dates[-1])
+        # A chave acompanha as datas disponíveis: com o período inteiro
+        # selecionado, as datas que chegarem entram na seleção; um recorte
+        # escolhido é mantido enquanto suas datas existirem
+        period = st.session_state.get('global_period') or full_dates
+        if not set(period) <= set(dates):
+            period = full_dates
+        first_date, last_date = st.sidebar.select_slider("Período do anúncio", dates, period, key=f"global_dates_{full_dates[0]}_{full_dates[1]}")
+        st.session_state.global_period = None if (first_date, last_date) == full_dates else (first_date, last_date)
+        if (first_date, last_date) != full_dates:
+            period_dates = dates[dates.index(first_date):dates.index(last_date) + 1]
+            global_filters += ((partition_store.PARTITION_COLUMN, 'in', tuple(period_dates)),)
+
+    if global_filters:
+        n_selected = get_count(scope_version(global_filters), global_filters)
+        st.sidebar.caption(f"{n_selected} de {dataset.n_rows} registros selecionados.")
+
+if DATA_DIR and manifest is not None:
+    store = get_partition_store()
+    summary = store.last_summary
+    st.sidebar.caption(
+        f"Dados: {len(manifest['drops'])} arquivos, {len(manifest['partitions'])} datas, "
+        f"{summary['rows']} registros · última verificação: {len(summary['added'])} novos, "
+        f"{len(summary['changed'])} alterados, {len(summary['removed'])} removidos, "
+        f"{len(summary['partitions_changed'])} datas atualizadas em {summary['seconds']:.2f} s"
+    )
+    # Sem esperar o intervalo: o rerun seguinte já usa o manifesto novo
+    st.sidebar.button("Verificar novos arquivos", on_click=store.current, kwargs={'force': True}, key="refresh_drops")
+
 # --- Título Principal ---
 st.title("🚗 Analista Automotivo IA")
 st.write("Projeto do Sprint 5 - Dashboard com Tool Calling Agent do LangChain e Gemini Flash 2.5")
@@ -71,304 +463,471 @@ st.write("Projeto do Sprint 5 - Dashboard com Tool Calling Agent do LangChain e
 # CRIAR A FERRAMENTA CUSTOMIZADA COM IA
 # --------------------------------------------------------
 
-@tool
+# Filtro global e dados da sessão que está chamando o agente. ContextVar (e não
+# uma global) porque várias sessões usam a ferramenta ao mesmo tempo; o
+# LangGraph propaga o contexto para as threads que executam as ferramentas. Uma
+# só por processo: o agente em cache guarda a ferramenta do primeiro rerun, que
+# tem de ler a mesma variável que os reruns seguintes definem. Pelo mesmo
+# motivo o dataset e as versões vão na variável: as globais da ferramenta são
+# as do primeiro rerun e ficam velhas quando os dados mudam.
+@st.cache_resource
+def get_agent_scope():
+    return contextvars.ContextVar("agent_scope")
+
+agent_scope = get_agent_scope()
+
+def current_agent_scope(filters):
+    return types.SimpleNamespace(
+        filters=filters,
+        dataset=dataset,
+        dataset_version=dataset_version,
+        manifest=manifest,
+        data_version=scope_version(filters),
+    )
+
+# Vira uma ferramenta do LangChain (langchain.tools.tool) em get_agent
 def PythonCodeExecutor(code: str) -> str:
     """
     Execute Python code for data analysis on DataFrame 'df'.
     CRITICAL: You MUST use the actual DataFrame 'df' - do NOT create fake data.
     Always verify results with actual data from df.
+    Text columns are pandas categoricals: pass observed=True to groupby and drop
+    zero counts from value_counts (categories with no rows are not real data).
     Exemple: print(df['price'].mean())
     """
+    # Validate code doesn't create fake data
+    if 'pd.DataFrame' in code and '{' in code:
+        return "ERROR: Do NOT create fake DataFrames. Use the existing 'df' variable only."
+
+    scope = agent_scope.get()
+    result_cache = get_tool_cache()
+    cached = result_cache.get(code, scope.data_version, scope.filters)
+    if cached is not None:
+        return cached
+
     try:
-        old_stdout = sys.stdout
-        redirected_output = sys.stdout = io.StringIO()
-        
-        global car_data
-        df = car_data.copy()  # Use copy to prevent modifications
-        
-        # Validate code doesn't create fake data
-        if 'pd.DataFrame' in code and '{' in code:
-            return "ERROR: Do NOT create fake DataFrames. Use the existing 'df' variable only."
+        # Executa em um worker isolado (stdout próprio, limites de tempo/CPU/memória/saída);
+        # cada trecho impresso segue para a tela enquanto o código ainda roda
+        write = assistant.tool_output_writer()
+        chunks, error = [], None
+        with get_metrics().span('tool.python') as span:
+            for kind, text in sandbox_for(scope.dataset_version, scope.manifest).events(code, scope.filters, scope.manifest):
+                if kind == 'out':
+                    chunks.append(text)
+                    write(text)
+                else:
+                    error = text
+            output = ''.join(chunks)
+            span['output_bytes'] = len(output.encode())
+    except Exception as e:
+        return f"Erro: {e}"
 
-        exec(code, {'df': df, 'pd': pd}, {})
-        
-        sys.stdout = old_stdout
-        output = redirected_output.getvalue()
-        
-        # Check if output is empty
-        if not output.strip():
-            return "ERROR: No output generated. Make sure to use print() to display results."
-                
-        return output
-    
+    if error:
+        return output + error
+
+    # Check if output is empty
+    if not output.strip():
+        return "ERROR: No output generated. Make sure to use print() to display results."
+
+    result_cache.put(code, scope.data_version, scope.filters, output)
+    return output
+
+# Variante SQL da ferramenta (backend DuckDB): consulta o mesmo engine dos gráficos
+def SQLQueryExecutor(query: str) -> str:
+    """
+    Execute one DuckDB SQL SELECT query on the table 'cars'.
+    CRITICAL: You MUST query the actual table 'cars' - do NOT invent data.
+    Only 'cars' (and CTEs over it) can be read: other tables and table functions are rejected.
+    Results come back as a markdown table (aggregate or use LIMIT for long results).
+    Example: SELECT manufacturer, AVG(price) AS avg_price FROM cars GROUP BY manufacturer
+    """
+    scope = agent_scope.get()
+    result_cache = get_tool_cache()
+    cached = result_cache.get(query, scope.data_version, scope.filters)
+    if cached is not None:
+        return cached
+
+    try:
+        # Conexão só de leitura dos arquivos do dataset, com limite de tempo
+        with get_metrics().span('tool.sql') as span:
+            result, truncated = scope.dataset.sql(query, scope.filters)
+            span['rows'] = len(result)
     except Exception as e:
-        sys.stdout = old_stdout
         return f"Erro: {e}"
 
-tools = [PythonCodeExecutor]
+    if result.empty:
+        return "A consulta não retornou linhas."
+    output = result.to_markdown(index=False)
+    if truncated:
+        output += f"\n\n(Resultado truncado em {data_engine.SQL_MAX_ROWS} linhas: agregue ou use LIMIT.)"
+
+    result_cache.put(query, scope.data_version, scope.filters, output)
+    return output
+
+# Ferramenta do agente conforme o backend
+AGENT_TOOL = SQLQueryExecutor if DATA_BACKEND == 'duckdb' else PythonCodeExecutor
+
+def record_llm_turn(name, seconds, messages, **attrs):
+    """Registra a latência de um turno do agente e os tokens informados pelo modelo."""
+    get_metrics().record(
+        name,
+        seconds,
+        model_calls=sum(getattr(m, 'type', None) == 'ai' for m in messages),
+        input_tokens=chat_context.usage_tokens(messages, 'input_tokens') or 0,
+        output_tokens=chat_context.usage_tokens(messages, 'output_tokens') or 0,
+        **attrs,
+    )
+
+
+# --- Modelo e Agente (um por processo) ---
+
+def get_api_key():
+    """Chave da API do Google (env ou secrets), ou None."""
+    try:
+        return os.environ.get("GOOGLE_API_KEY") or st.secrets.get("GOOGLE_API_KEY", None)
+    except Exception:
+        return None  # sem secrets.toml
+
+def key_fingerprint(api_key):
+    return hashlib.sha256(api_key.encode()).hexdigest()[:16] if api_key else None
+
+# O cliente do modelo (com seu pool de conexões HTTP) e o grafo compilado do
+# agente são criados uma vez e compartilhados entre reruns e sessões: o grafo
+# não guarda estado entre chamadas (o histórico vai em cada invoke/stream).
+# Só são recriados quando muda o modelo, a chave (pela impressão digital) ou o
+# conteúdo do system prompt. None se o stack de IA não importou.
+@st.cache_resource(max_entries=2)
+def get_agent(model_name, api_key_fingerprint, system_prompt, _api_key):
+    ai_stack = load_ai_stack()
+    if ai_stack is None:
+        return None
+    if model_name == FAKE_MODEL_NAME:
+        import fake_llm
+        model = fake_llm.FakeToolCallingModel(tool_name=AGENT_TOOL.__name__)
+    else:
+        model = ai_stack.ChatGoogleGenerativeAI(
+            model=model_name,
+            google_api_key=_api_key,
+            temperature=0
+        )
+    return ai_stack.create_agent(
+        model=model,
+        tools=[ai_stack.tool(AGENT_TOOL)],
+        system_prompt=system_prompt
+    )
+
+# Aquecimento na inicialização do processo, em segundo plano: workers do
+# sandbox e agente (e, com WARM_RESPONSES_AT_STARTUP, as respostas das
+# perguntas sugeridas) ficam prontos antes do primeiro acesso à Aba 2.
+@st.cache_resource
+def start_background_warmup(dataset_version, model_name, api_key_fingerprint, system_prompt, _api_key):
+    def warm():
+        # IA_DISPONIVEL só confere se os pacotes existem; a importação ainda pode falhar
+        agent = get_agent(model_name, api_key_fingerprint, system_prompt, _api_key)
+        if agent is None:
+            return
+        if car_data is not None:
+            sandbox_for(dataset_version, manifest)
+        if WARM_RESPONSES_AT_STARTUP:
+            start_response_warmup(dataset_version, model_name, system_prompt, agent)
+
+    thread = threading.Thread(target=warm, name="agent-warmup", daemon=True)
+    thread.start()
+    return thread
+
+api_key = None if USE_FAKE_LLM else get_api_key()
+
+
+# Spans e contadores dos caches compartilhados: painel "Desempenho" e dump em JSON
+def metrics_snapshot():
+    engine = get_query_engine(dataset_version) if dataset is not None else None
+    partition_cubes = get_partition_cubes() if manifest is not None else None
+    return recorder.snapshot(
+        dataset={
+            'backend': DATA_BACKEND,
+            'version': dataset_version,
+            'rows': dataset.n_rows if dataset is not None else 0,
+            'partitions': len(manifest['partitions']) if manifest is not None else None,
+        },
+        caches={
+            'tool_results': get_tool_cache().stats(),
+            'direct_queries': engine.stats() if engine is not None else None,
+            'suggested_responses': len(get_response_cache()),
+            'partition_cubes': {'hits': partition_cubes.hits, 'misses': partition_cubes.misses} if partition_cubes else None,
+        },
+        llm_scheduler=get_llm_scheduler().stats(),
+    )
 
 
 # --- Renderização do App ---
 
-if car_data is not None:
+if dataset is not None:
 
     # --- Criar as Abas ---
-    tab1, tab2, tab3 = st.tabs([
-        "Projeto do Bootcamp (Obrigatório)", 
-        "Bônus: Chat com IA (Agent Executor)",
-        "Ver Dados Brutos"
-    ])
+    # Só a aba ativa é executada: um turno de chat não reconstrói os gráficos
+    # nem serializa a tabela bruta (st.tabs executaria as três a cada rerun).
+    VIEWS = {
+        'dashboard': "Projeto do Bootcamp (Obrigatório)",
+        'chat': "Bônus: Chat com IA (Agent Executor)",
+        'raw': "Ver Dados Brutos",
+    }
+    if ADMIN_PANEL:
+        VIEWS['admin'] = "Desempenho (admin)"
+    if 'active_view' not in st.session_state:
+        st.session_state.active_view = 'dashboard'
+
+    # Widgets de abas não exibidas perdem o estado; reatribuir antes de
+    # instanciá-los preserva as escolhas do usuário ao voltar para a aba.
+    # Por isso os valores padrão vêm do session_state, não de value=/index=.
+    WIDGET_DEFAULTS = {'small_manufacturers': True, 'normalize_hist': True, 'scatter_mode': 'points', 'stream_responses': True}
+    for widget_key, default in WIDGET_DEFAULTS.items():
+        if widget_key not in st.session_state:
+            st.session_state[widget_key] = default
+    for widget_key in [*WIDGET_DEFAULTS, 'manu1', 'manu2']:
+        if widget_key in st.session_state:
+            st.session_state[widget_key] = st.session_state[widget_key]
+
+    active_view = st.radio(
+        "Seção",
+        list(VIEWS),
+        format_func=VIEWS.get,
+        horizontal=True,
+        label_visibility="collapsed",
+        key="active_view"
+    )
 
     # --------------------------------------------------------
     # --- Aba 1: Projeto do Bootcamp (Análise Exploratória Avançada) ---
     # --------------------------------------------------------
-    with tab1:
+    if active_view == 'dashboard':
         st.header("Análise Exploratória Avançada com Plotly Express")
         st.markdown("Esta aba contém 9 visualizações interativas para explorar tendências de mercado e depreciação.")
         
-        # Cria uma cópia para a manipulação de dados
-        df = car_data.copy()
-        
-        # ---------------------------------------------------
-        # REQUISITO 1 (Original): VISUALIZADOR DE DADOS
-        # ---------------------------------------------------
-        st.divider()
-        st.subheader("1. Visualizador de Dados Brutos (com Filtro)")
-        
-        # Tradução do Checkbox
-        include_small_manufacturers = st.checkbox("Incluir fabricantes com menos de 1000 anúncios", value=True)
-        
-        df_display = df.copy()
-
-        if not include_small_manufacturers:
-            manufacturer_counts = df_display['manufacturer'].value_counts()
-            large_manufacturers = manufacturer_counts[manufacturer_counts >= 1000].index
-            df_display = df_display[df_display['manufacturer'].isin(large_manufacturers)]
-            st.info(f"Mostrando apenas {len(large_manufacturers)} fabricantes (com 1000+ anúncios).")
-            
-        st.dataframe(df_display.head(50))
-        st.markdown(f"Total de Registros Exibidos: **{len(df_display)}**")
-
-        # ---------------------------------------------------
-        # REQUISITO 2 (Original): TIPOS DE VEÍCULO POR FABRICANTE
-        # ---------------------------------------------------
-        st.divider()
-        st.subheader("2. Tipos de Veículo por Fabricante")
+        data_version = scope_version(global_filters)
+        cube = get_cube(data_version, global_filters)
+
+        # Figura em cache + envio ao navegador; a span mede a serialização feita
+        # pelo st.plotly_chart, com o tamanho do payload (também em cache)
+        def show_chart(chart_id, **widget_state):
+            fig = get_figure(chart_id, data_version, global_filters, **widget_state)
+            payload = get_payload_size(chart_id, data_version, global_filters, **widget_state)
+            with recorder.span(f"render.{chart_id}", bytes=payload):
+                st.plotly_chart(fig, use_container_width=True)
+            return payload
+
+        # Sem st.stop(): o fim do script (pré-aquecimento, métrica do rerun) ainda roda
+        if global_filters and get_count(data_version, global_filters) == 0:
+            st.warning("Nenhum anúncio corresponde ao Filtro Global. Ajuste os filtros na barra lateral.")
+        else:
+            # ---------------------------------------------------
+            # REQUISITO 1 (Original): VISUALIZADOR DE DADOS
+            # ---------------------------------------------------
+            st.divider()
+            st.subheader("1. Visualizador de Dados Brutos (com Filtro)")
         
-        df_type_manufacturer = df.groupby(['manufacturer', 'type']).size().reset_index(name='count')
+            # Fragmento: o checkbox reexecuta só esta seção
+            @st.fragment
+            def section_data_viewer():
+                # Tradução do Checkbox
+                include_small_manufacturers = st.checkbox("Incluir fabricantes com menos de 1000 anúncios", key="small_manufacturers")
+
+                display_filters = ()
+
+                if not include_small_manufacturers:
+                    manufacturer_counts = aggregates.manufacturer_counts(cube)
+                    large_manufacturers = manufacturer_counts[manufacturer_counts >= 1000].index
+                    display_filters = (('manufacturer', 'in', tuple(large_manufacturers)),)
+                    st.info(f"Mostrando apenas {len(large_manufacturers)} fabricantes (com 1000+ anúncios).")
+
+                # Só a primeira página e a contagem; o frame filtrado nunca é materializado
+                st.dataframe(get_page(dataset_version, global_filters + display_filters))
+                st.markdown(f"Total de Registros Exibidos: **{get_count(scope_version(global_filters + display_filters), global_filters + display_filters)}**")
+
+            section_data_viewer()
+
+            # ---------------------------------------------------
+            # REQUISITO 2 (Original): TIPOS DE VEÍCULO POR FABRICANTE
+            # ---------------------------------------------------
+            st.divider()
+            st.subheader("2. Tipos de Veículo por Fabricante")
         
-        fig_type_manufacturer = px.bar(
-            df_type_manufacturer,
-            x="manufacturer",
-            y="count",
-            color="type",
-            title="Distribuição de Tipos de Veículos (Type) por Fabricante"
-        )
-        st.plotly_chart(fig_type_manufacturer, use_container_width=True)
+            show_chart('type_by_manufacturer')
 
-        # ---------------------------------------------------
-        # REQUISITO 3 (Original): HISTOGRAMA DA CONDITION vs MODEL_YEAR
-        # ---------------------------------------------------
-        st.divider()
-        st.subheader("3. Condição (Condition) por Ano do Modelo")
-        
-        fig_condition_year = px.histogram(
-            df,
-            x="model_year",
-            color="condition",
-            title="Histograma de Condição vs. Ano do Modelo",
-            barmode="group",
-            histfunc='count'
-        )
-        st.plotly_chart(fig_condition_year, use_container_width=True)
-        
-        # ---------------------------------------------------
-        # REQUISITO 4 (Original): COMPARAÇÃO DA DISTRIBUIÇÃO DE PREÇOS
-        # ---------------------------------------------------
-        st.divider()
-        st.subheader("4. Comparação de Distribuição de Preços")
-        
-        available_manufacturers = sorted(df['manufacturer'].unique())
-        
-        # Dropdowns
-        manufacturer1 = st.selectbox(
-            "Selecione o Fabricante 1:",
-            available_manufacturers,
-            index=available_manufacturers.index('ford') if 'ford' in available_manufacturers else 0,
-            key="manu1"
-        )
+            # ---------------------------------------------------
+            # REQUISITO 3 (Original): HISTOGRAMA DA CONDITION vs MODEL_YEAR
+            # ---------------------------------------------------
+            st.divider()
+            st.subheader("3. Condição (Condition) por Ano do Modelo")
         
-        manufacturer2 = st.selectbox(
-            "Selecione o Fabricante 2:",
-            available_manufacturers,
-            index=available_manufacturers.index('toyota') if 'toyota' in available_manufacturers else (1 if len(available_manufacturers) > 1 else 0),
-            key="manu2"
-        )
-        
-        # Checkbox
-        normalize_hist = st.checkbox("Normalizar Histograma (Mostrar Proporção)", value=True)
-        
-        df_comparison = df[
-            (df['manufacturer'] == manufacturer1) | (df['manufacturer'] == manufacturer2)
-        ]
-        
-        histnorm_mode = 'probability density' if normalize_hist else None
-        
-        fig_comparison = px.histogram(
-            df_comparison,
-            x="price",
-            color="manufacturer",
-            title=f"Distribuição de Preços: {manufacturer1} vs. {manufacturer2}",
-            barmode="overlay",
-            opacity=0.75,
-            histnorm=histnorm_mode
-        )
-        
-        fig_comparison.update_layout(
-            xaxis_title="Preço",
-            yaxis_title="Contagem" if not normalize_hist else "Densidade de Probabilidade"
-        )
-        st.plotly_chart(fig_comparison, use_container_width=True)
-        
-        # ===================================================
-        # --- NOVAS VISUALIZAÇÕES (Tier 1 & 2) ---
-        # ===================================================
-
-        # ---------------------------------------------------
-        # REQUISITO 5 (Tier 1): BOX PLOT de Preço por Condição
-        # ---------------------------------------------------
-        st.divider()
-        st.subheader("5. Distribuição de Preços (Box Plot) por Condição")
-        st.write("Visualização para identificar a mediana, quartis e outliers de preços para cada estado de conservação.")
-
-        fig_boxplot = px.box(
-            df, 
-            x='condition', 
-            y='price', 
-            color='condition',
-            title='Distribuição de Preços por Condição do Veículo (Identificação de Outliers)',
-            # Garante que a ordem da condição seja lógica (opcional, mas recomendado)
-            category_orders={"condition": ['new', 'excellent', 'good', 'fair', 'salvage', 'other']}
-        )
-        fig_boxplot.update_layout(xaxis_title="Condição", yaxis_title="Preço")
-        st.plotly_chart(fig_boxplot, use_container_width=True)
-
-        # ---------------------------------------------------
-        # REQUISITO 6 (Tier 1): SCATTER PLOT (Depreciação)
-        # ---------------------------------------------------
-        st.divider()
-        st.subheader("6. Análise de Depreciação: Preço vs. Quilometragem")
-        st.write("Gráfico de dispersão com linha de regressão (OLS) para modelar a depreciação por tipo de veículo.")
+            show_chart('condition_by_year')
         
-        # Limita a quilometragem para melhor visualização da tendência (opcional)
-        df_scatter = df[df['odometer'] < df['odometer'].quantile(0.99)].copy()
+            # ---------------------------------------------------
+            # REQUISITO 4 (Original): COMPARAÇÃO DA DISTRIBUIÇÃO DE PREÇOS
+            # ---------------------------------------------------
+            st.divider()
+            st.subheader("4. Comparação de Distribuição de Preços")
         
-        fig_scatter_reg = px.scatter(
-            df_scatter,
-            x='odometer',
-            y='price',
-            color='type',
-            title='Depreciação vs. Quilometragem por Tipo de Veículo',
-            opacity=0.6,
-            trendline='ols', # Linha de Regressão de Mínimos Quadrados Ordinários (Ols)
-            height=600
-        )
-        fig_scatter_reg.update_layout(xaxis_title="Quilometragem (Odometer)", yaxis_title="Preço")
-        st.plotly_chart(fig_scatter_reg, use_container_width=True)
-
-        # ---------------------------------------------------
-        # REQUISITO 7 (Tier 1): MAPA DE CALOR (Densidade)
-        # ---------------------------------------------------
-        st.divider()
-        st.subheader("7. Mapa de Calor: Densidade de Anúncios")
-        st.write("Visualiza a combinação de Ano do Modelo e Condição onde a maioria dos anúncios se concentra.")
+            # Fragmento: trocar fabricantes ou a normalização reexecuta só esta seção
+            @st.fragment
+            def section_price_comparison():
+                # Opções do dataset inteiro: a seleção não some quando o filtro global muda
+                available_manufacturers = sorted(aggregates.manufacturer_counts(full_cube).index)
+
+                if 'manu1' not in st.session_state:
+                    st.session_state.manu1 = 'ford' if 'ford' in available_manufacturers else available_manufacturers[0]
+                if 'manu2' not in st.session_state:
+                    st.session_state.manu2 = 'toyota' if 'toyota' in available_manufacturers else available_manufacturers[1 if len(available_manufacturers) > 1 else 0]
+
+                # Dropdowns
+                manufacturer1 = st.selectbox(
+                    "Selecione o Fabricante 1:",
+                    available_manufacturers,
+                    key="manu1"
+                )
+
+                manufacturer2 = st.selectbox(
+                    "Selecione o Fabricante 2:",
+                    available_manufacturers,
+                    key="manu2"
+                )
+
+                # Checkbox
+                normalize_hist = st.checkbox("Normalizar Histograma (Mostrar Proporção)", key="normalize_hist")
+
+                comparison_payload = show_chart(
+                    'price_comparison',
+                    manufacturer1=manufacturer1,
+                    manufacturer2=manufacturer2,
+                    normalize=normalize_hist
+                )
+                st.caption(f"Payload do gráfico: {comparison_payload / 1024:.1f} KB")
+
+            section_price_comparison()
         
-        fig_heatmap_density = px.density_heatmap(
-            df,
-            x="model_year",
-            y="condition",
-            title="Densidade de Anúncios por Ano do Modelo e Condição",
-            text_auto=True # Exibe o valor da contagem em cada célula
-        )
-        fig_heatmap_density.update_layout(xaxis_title="Ano do Modelo", yaxis_title="Condição")
-        st.plotly_chart(fig_heatmap_density, use_container_width=True)
-
-        # ---------------------------------------------------
-        # REQUISITO 8 (Tier 2): DISTRIBUIÇÃO DE TIPOS
-        # ---------------------------------------------------
-        st.divider()
-        st.subheader("8. Distribuição de Frequência de Tipos de Veículo")
-        st.write("Contagem simples para ver a composição da frota anunciada.")
+            # ===================================================
+            # --- NOVAS VISUALIZAÇÕES (Tier 1 & 2) ---
+            # ===================================================
+
+            # ---------------------------------------------------
+            # REQUISITO 5 (Tier 1): BOX PLOT de Preço por Condição
+            # ---------------------------------------------------
+            st.divider()
+            st.subheader("5. Distribuição de Preços (Box Plot) por Condição")
+            st.write("Visualização para identificar a mediana, quartis e outliers de preços para cada estado de conservação.")
+
+            box_payload = show_chart('price_by_condition')
+            st.caption(f"Payload do gráfico: {box_payload / 1024:.1f} KB")
+
+            # ---------------------------------------------------
+            # REQUISITO 6 (Tier 1): SCATTER PLOT (Depreciação)
+            # ---------------------------------------------------
+            st.divider()
+            st.subheader("6. Análise de Depreciação: Preço vs. Quilometragem")
+            st.write("Gráfico de dispersão com linha de regressão (OLS) para modelar a depreciação por tipo de veículo.")
+
+            # Fragmento: trocar o modo reexecuta só esta seção
+            @st.fragment
+            def section_depreciation():
+                scatter_mode = st.radio(
+                    "Modo de exibição:",
+                    ['points', 'density'],
+                    format_func={'points': "Pontos (amostra)", 'density': "Densidade (grade)"}.get,
+                    horizontal=True,
+                    key="scatter_mode"
+                )
+                show_chart('depreciation_scatter', mode=scatter_mode)
+
+                depreciation = get_depreciation_summary(data_version, global_filters)
+                st.caption(
+                    f"Retas OLS ajustadas sobre {depreciation['total_points']} anúncios; "
+                    f"{len(depreciation['sample'])} pontos exibidos (limite: {aggregates.SCATTER_POINT_BUDGET})."
+                )
+
+            section_depreciation()
+
+            # ---------------------------------------------------
+            # REQUISITO 7 (Tier 1): MAPA DE CALOR (Densidade)
+            # ---------------------------------------------------
+            st.divider()
+            st.subheader("7. Mapa de Calor: Densidade de Anúncios")
+            st.write("Visualiza a combinação de Ano do Modelo e Condição onde a maioria dos anúncios se concentra.")
         
-        df_type_count = df['type'].value_counts().reset_index()
-        df_type_count.columns = ['Tipo de Veículo', 'Contagem']
+            show_chart('density_heatmap')
+
+            # ---------------------------------------------------
+            # REQUISITO 8 (Tier 2): DISTRIBUIÇÃO DE TIPOS
+            # ---------------------------------------------------
+            st.divider()
+            st.subheader("8. Distribuição de Frequência de Tipos de Veículo")
+            st.write("Contagem simples para ver a composição da frota anunciada.")
         
-        fig_type_dist = px.bar(
-            df_type_count,
-            x='Tipo de Veículo',
-            y='Contagem',
-            color='Tipo de Veículo',
-            title='Contagem de Anúncios por Tipo de Veículo'
-        )
-        st.plotly_chart(fig_type_dist, use_container_width=True)
-
-        # ---------------------------------------------------
-        # REQUISITO 9 (Tier 2): ANÁLISE DE BARRAS DUPLA (Fuel vs Transmission)
-        # ---------------------------------------------------
-        st.divider()
-        st.subheader("9. Combinação de Transmissão por Tipo de Combustível")
-        st.write("Compara a preferência por tipo de transmissão para diferentes combustíveis.")
+            show_chart('type_distribution')
+
+            # ---------------------------------------------------
+            # REQUISITO 9 (Tier 2): ANÁLISE DE BARRAS DUPLA (Fuel vs Transmission)
+            # ---------------------------------------------------
+            st.divider()
+            st.subheader("9. Combinação de Transmissão por Tipo de Combustível")
+            st.write("Compara a preferência por tipo de transmissão para diferentes combustíveis.")
         
-        fig_fuel_trans = px.histogram(
-            df,
-            x='fuel',
-            color='transmission',
-            barmode='group',
-            title='Distribuição de Transmissão por Tipo de Combustível',
-            height=400
-        )
-        fig_fuel_trans.update_layout(xaxis_title="Tipo de Combustível", yaxis_title="Contagem")
-        st.plotly_chart(fig_fuel_trans, use_container_width=True)
+            show_chart('fuel_transmission')
         
-        st.divider()
+            st.divider()
 
     # --------------------------------------------------------
     # --- Aba 2: Bônus - Chat com IA (Agent Executor) ---
     # --------------------------------------------------------
-    with tab2:
+    elif active_view == 'chat':
         st.header("Consultor de Dados Veiculares 🧠")
-        st.markdown("Analise qualquer métrica: a IA executa código Python (usando 'df').")
-
-        if not IA_DISPONIVEL:
+        if DATA_BACKEND == 'duckdb':
+            st.markdown("Analise qualquer métrica: a IA executa consultas SQL (na tabela 'cars').")
+        else:
+            st.markdown("Analise qualquer métrica: a IA executa código Python (usando 'df').")
+        tool_stats = get_tool_cache().stats()
+        st.caption(
+            f"Cache de execuções: {tool_stats['hits']} acertos, {tool_stats['misses']} falhas "
+            f"({tool_stats['hit_rate']:.0%}), {tool_stats['entries']} resultados / {tool_stats['bytes'] / 1024:.1f} KB"
+        )
+        query_engine_ = get_query_engine(dataset_version)
+        if query_engine_ is not None:
+            fast_stats = query_engine_.stats()
+            st.caption(
+                f"Consultas diretas (sem IA): {fast_stats['hits']} de {fast_stats['hits'] + fast_stats['misses']} "
+                f"perguntas ({fast_stats['hit_rate']:.0%})"
+            )
+        if global_filters:
+            st.info(f"Filtro Global ativo: a IA analisa {get_count(scope_version(global_filters), global_filters)} de {dataset.n_rows} registros.")
+
+        # Normalmente já importado em segundo plano; senão, importa agora
+        ai_stack = None
+        if IA_DISPONIVEL:
+            with st.spinner("Carregando as bibliotecas de IA..."):
+                ai_stack = load_ai_stack()
+
+        if ai_stack is None:
             st.warning("As bibliotecas do LangChain não foram instaladas corretamente. A Aba de IA está desativada.")
             st.info("Execute a reinstalação estruturada no terminal.")
 
         # Novo Bloco de Verificação: Apenas verificamos se a chave falha ao ser usada (try/except)
         else:
             try:
-                # Check if API key exists (works both locally and on Render)
-                import os
-                api_key = os.environ.get("GOOGLE_API_KEY") or st.secrets.get("GOOGLE_API_KEY", None)
-                
-                if api_key is None:
+                if not USE_FAKE_LLM and api_key is None:
                     st.warning("Chave da API do Google não encontrada.")
                     st.write("Por favor, adicione a variável de ambiente `GOOGLE_API_KEY` no Render.")
                     st.stop()
-                
-                # Create model (only runs if key exists)
-                model = ChatGoogleGenerativeAI(
-                    model="gemini-2.5-flash", 
-                    google_api_key=api_key,
-                    temperature=0
-                )
-                
-                # Create Agent
-                agent = create_agent(
-                    model=model,
-                    tools=tools,
-                    system_prompt=system_prompt
-                )
-                
+
+                # Modelo e agente em cache (criados uma vez por processo)
+                model_name = ACTIVE_MODEL_NAME
+                agent = get_agent(model_name, key_fingerprint(api_key), system_prompt, api_key)
+
+                # Aquece os workers do sandbox (carregam em segundo plano)
+                if car_data is not None:
+                    sandbox_for(dataset_version, manifest)
+
+                # Pré-calcula as respostas das perguntas sugeridas em segundo plano
+                response_cache = get_response_cache()
+                start_response_warmup(dataset_version, model_name, system_prompt, agent)
+
                 # Initialize chat history
                 if "chat_messages_executor" not in st.session_state:
                     st.session_state.chat_messages_executor = []
@@ -377,20 +936,128 @@ if car_data is not None:
                 if 'button_prompt' not in st.session_state:
                     st.session_state.button_prompt = None
 
-                # NEW: Force stay on this tab when there's activity
-                if 'force_tab2' not in st.session_state:
-                    st.session_state.force_tab2 = False
+                # Tempo até o primeiro token de cada resposta em streaming
+                if 'chat_ttfts' not in st.session_state:
+                    st.session_state.chat_ttfts = []
+
+                # Identifica a sessão no rodízio da fila de chamadas ao modelo
+                if 'llm_session_id' not in st.session_state:
+                    st.session_state.llm_session_id = os.urandom(8).hex()
 
-                # Function to handle button prompts
+                # Function to handle button prompts (on_click: runs before the rerun)
                 def set_button_prompt(prompt):
                     st.session_state.button_prompt = prompt
-                    st.session_state.force_tab2 = True  # Keep user on tab 2
+                    st.session_state.active_view = 'chat'  # Keep user on tab 2
+
+                def show_tool_trace(trace, timings=None):
+                    with st.expander("🔍 Debug: Ver código executado"):
+                        if timings:
+                            ttft = timings['ttft']
+                            st.caption(
+                                f"Total: {timings['total']:.2f} s · Fila: {timings.get('queue', 0.0):.2f} s · Primeiro token: "
+                                + (f"{ttft:.2f} s" if ttft is not None else "—")
+                            )
+                            context = timings.get('context')
+                            if context:
+                                usage = context['usage_input_tokens']
+                                st.caption(
+                                    f"Prompt: ~{context['prompt_tokens']} tokens estimados"
+                                    + (f" ({usage} informados pelo modelo no turno)" if usage is not None else "")
+                                    + f" · {context['recent_turns']} trocas literais, {context['summarized_turns']} resumidas, "
+                                    f"{context['tables_dropped']} tabelas omitidas · histórico completo: ~{context['history_tokens']} tokens"
+                                )
+                            st.markdown("\n".join(
+                                f"{i}. {step['step']}: {step['seconds']:.2f} s"
+                                for i, step in enumerate(timings['steps'], start=1)
+                            ))
+                        if not trace:
+                            st.write("Nenhuma execução de código nesta resposta.")
+                        for step in trace:
+                            st.code(step['code'], language=step.get('language', "python"))
+                            st.text(step['output'])
+
+                def run_agent_call(progress_area, message_placeholder, ticket):
+                    """Consome os eventos da chamada na fila, atualizando o texto e os passos na tela."""
+                    with progress_area:
+                        status = st.status("Consultando o modelo...", expanded=False)
+                    streamed, steps, tool_seconds = '', [], {}
+                    ttft, step_start, done = None, 0.0, None
+                    tool_output, tool_area, shown_at = '', None, 0.0
+
+                    for kind, event in ticket.events():
+                        if kind == 'queued':
+                            status.update(label=f"Na fila: posição {event['position']}..." if event['position'] else "Consultando o modelo...")
+                        elif kind == 'retry':
+                            # A tentativa anterior é descartada (o stream recomeça do zero)
+                            streamed, steps, ttft, step_start = '', [], None, 0.0
+                            tool_output, tool_area = '', None
+                            message_placeholder.empty()
+                            status.update(label=f"Limite de requisições do provedor: nova tentativa em {event['delay']:.0f} s...")
+                        elif kind == 'error':
+                            status.update(label="Falha na chamada ao modelo", state="error")
+                            raise event['error']
+                        elif kind == 'token':
+                            if ttft is None:
+                                ttft = event['elapsed']
+                            streamed += event['text']
+                            message_placeholder.markdown(streamed + "▌")
+                        elif kind == 'model':
+                            steps.append({'step': "Modelo", 'seconds': event['elapsed'] - step_start})
+                            step_start = event['elapsed']
+                            if event['tool_calls']:
+                                # Texto antes de uma chamada de ferramenta não é a resposta final
+                                streamed = ''
+                                message_placeholder.empty()
+                                status.update(label="Executando a consulta SQL..." if DATA_BACKEND == 'duckdb' else "Executando código no sandbox...")
+                            for call in event['tool_calls']:
+                                status.code(call['code'], language=call['language'])
+                        elif kind == 'tool_output':
+                            # Saída parcial do sandbox: só o fim, no máximo ~10 atualizações por segundo
+                            if tool_area is None:
+                                tool_area = status.empty()
+                            tool_output += event['text']
+                            if time.perf_counter() - shown_at > TOOL_PREVIEW_SECONDS:
+                                tool_area.text(tool_output[-TOOL_PREVIEW_CHARS:])
+                                shown_at = time.perf_counter()
+                        elif kind == 'tool':
+                            tool_seconds[event['id']] = event['elapsed'] - step_start
+                            steps.append({'step': AGENT_TOOL.__name__, 'seconds': tool_seconds[event['id']]})
+                            step_start = event['elapsed']
+                            (tool_area or status).text(event['output'])
+                            tool_output, tool_area = '', None
+                            status.update(label="Analisando o resultado...")
+                        elif kind == 'done':
+                            done = event
+
+                    status.update(label=f"Concluído em {done['elapsed']:.1f} s", state="complete")
+                    response = {"messages": done['messages']}
+                    # Espera na fila (e em backoff) = tempo total menos a execução final
+                    total = time.perf_counter() - ticket.submitted_at
+                    timings = {'ttft': ttft, 'total': total, 'queue': max(0.0, total - done['elapsed']), 'steps': steps}
+                    for step in steps:
+                        if step['step'] == "Modelo":
+                            recorder.record('llm.call', step['seconds'])
+                    record_llm_turn('llm.turn', done['elapsed'], done['messages'], queue_s=timings['queue'])
+                    if ttft is not None:
+                        recorder.record('llm.ttft', ttft)
+                    return response, timings
 
                 # Display messages from history
                 for message in st.session_state.chat_messages_executor:
                     with st.chat_message(message["role"]):
                         st.markdown(message["content"])
 
+                st.toggle("Exibir a resposta em tempo real (streaming)", key="stream_responses")
+                scheduler_stats = get_llm_scheduler().stats()
+                st.caption(
+                    f"Chamadas ao modelo (todas as sessões): {scheduler_stats['in_flight']} em andamento, "
+                    f"{scheduler_stats['queued']} na fila · {scheduler_stats['retries']} novas tentativas após 429 · "
+                    f"{scheduler_stats['deduplicated']} perguntas idênticas atendidas juntas"
+                )
+                session_ttfts = sorted(t for t in st.session_state.chat_ttfts if t is not None)
+                if session_ttfts:
+                    st.caption(f"Tempo até o primeiro token (mediana da sessão): {session_ttfts[len(session_ttfts) // 2]:.2f} s")
+
                 # Get user input from chat box FIRST (at top)
                 chat_input = st.chat_input("Ex: Qual o preço médio por fabricante?")
 
@@ -398,82 +1065,23 @@ if car_data is not None:
 
                 # Pre-defined question buttons
                 st.subheader("**💡 Perguntas Sugeridas:**")
+                n_ready = sum(
+                    (query_engine_ is not None and query_engine_.parse(prompt) is not None)
+                    or assistant.response_key(prompt, scope_version(global_filters), global_filters, model_name, system_prompt) in response_cache
+                    for prompt in assistant.SUGGESTED_PROMPTS
+                )
+                st.caption(f"Respostas prontas: {n_ready} de {len(assistant.SUGGESTED_PROMPTS)} perguntas sugeridas.")
 
-                # LINHA 1: FABRICANTES
-                st.markdown("**1. FABRICANTES**")
-                col1, col2, col3, col4, col5 = st.columns(5)
-
-                with col1:
-                    if st.button("📊 Preço Médio por Fabricante", key='btn_1a', use_container_width=True):
-                        set_button_prompt("Qual o preço médio por fabricante ('manufacturer')?")
-
-                with col2:
-                    if st.button("📈 Rank de Preço por Fabricante", key='btn_1b', use_container_width=True):
-                        set_button_prompt("Liste os 5 fabricantes com o maior preço médio, mostrando o preço.")
-
-                with col3:
-                    if st.button("📦 Rank de Fabricantes por Vendas", key='btn_1c', use_container_width=True):
-                        set_button_prompt("Conte o número total de veículos por fabricante e liste os 5 mais vendidos.")
-
-                with col4:
-                    if st.button("🔥 Eficiência por Fabricante", key='btn_1d', use_container_width=True):
-                        set_button_prompt("Para os 5 fabricantes mais caros, qual é a média de cilindros ('cylinders') e o tipo de transmissão ('transmission') mais comum?")
-
-                with col5:
-                    if st.button("⛽️ Popularidade por Tipo de Combustível", key='btn_1e', use_container_width=True):
-                        set_button_prompt("Para a Toyota, conte quantos veículos utilizam gasolina e quantos utilizam diesel.")
-
-                # LINHA 2: MODELOS
-                st.markdown("**2. MODELOS**")
-                col6, col7, col8, col9, col10 = st.columns(5)
-
-                with col6:
-                    if st.button("💰 Top 5 Carros Mais Caros", key='btn_2a', use_container_width=True):
-                        set_button_prompt("Quais são os 5 carros mais caros? Liste o modelo, ano e preço.")
-
-                with col7:
-                    if st.button("📈 Rank de Carros Mais Vendidos", key='btn_2b', use_container_width=True):
-                        set_button_prompt("Conte quantos anúncios existem por modelo de carro e liste os 5 modelos mais populares (maior contagem).")
-
-                with col8:
-                    if st.button("🚜 4x4 Mais Caros (Top 10)", key='btn_2c', use_container_width=True):
-                        set_button_prompt("Quais são os 10 carros mais caros com tração 4x4 ('is_4wd' = True)? Liste o preço e o modelo.")
-
-                with col9:
-                    if st.button("🎨 Popularidade da Cor/Tipo", key='btn_2d', use_container_width=True):
-                        set_button_prompt("Qual a cor ('paint_color') mais comum entre os veículos do tipo 'SUV'?")
-
-                with col10:
-                    if st.button("📉 Rank de Carros Mais Antigos", key='btn_2e', use_container_width=True):
-                        set_button_prompt("Quais são os 10 modelos de carros mais antigos ('model_year') no dataset?")
-
-                # LINHA 3: ANÁLISES
-                st.markdown("**3. ANÁLISES**")
-                col11, col12, col13, col14, col15 = st.columns(5)
-
-                with col11:
-                    if st.button("📉 Análise de Depreciação", key='btn_3a', use_container_width=True):
-                        set_button_prompt("Qual a taxa média de preço dividido por idade (ano atual - 'model_year') para veículos em 'excelente' condição?")
-
-                with col12:
-                    if st.button("🚗 Média de KM por Condição", key='btn_3b', use_container_width=True):
-                        set_button_prompt("Qual a quilometragem média ('odometer') por condição ('condition') dos veículos?")
-
-                with col13:
-                    if st.button("💎 Melhores Negócios (Baixo Custo/Alto Valor)", key='btn_3c', use_container_width=True):
-                        set_button_prompt("Liste os 5 modelos com preço abaixo da média GERAL, mas que estejam em 'excelente' condição.")
-
-                with col14:
-                    if st.button("⛽ Eficiência de Combustível/Cilindro", key='btn_3d', use_container_width=True):
-                        set_button_prompt("Qual é a média de cilindros ('cylinders') para carros a 'gasolina' e para carros a 'diesel'?")
-
-                with col15:
-                    if st.button("💎 Relação Preço/Quilometragem", key='btn_3e', use_container_width=True):
-                        set_button_prompt("Calcule a média da relação entre preço e quilometragem ('price' / 'odometer') por tipo de combustível ('fuel').")
+                for row_title, row_questions in assistant.SUGGESTED_QUESTIONS:
+                    st.markdown(row_title)
+                    for column, (button_key, label, prompt) in zip(st.columns(len(row_questions)), row_questions):
+                        with column:
+                            st.button(label, key=button_key, use_container_width=True, on_click=set_button_prompt, args=(prompt,))
 
                 st.divider()
 
                 # Combine button prompt or chat input
+                is_suggested = bool(st.session_state.button_prompt)
                 user_input = st.session_state.button_prompt or chat_input
 
                 # Clear button prompt after use
@@ -485,30 +1093,75 @@ if car_data is not None:
                     st.chat_message("user").markdown(user_input)
                     st.session_state.chat_messages_executor.append({"role": "user", "content": user_input})
 
+                    # Perguntas sugeridas são independentes do histórico: a resposta pronta vale
+                    response_key = assistant.response_key(user_input, scope_version(global_filters), global_filters, model_name, system_prompt)
+                    cached_response = response_cache.get(response_key) if is_suggested else None
+
                     with st.chat_message("assistant"):
+                        progress_area = st.container()
                         message_placeholder = st.empty()
+                        timings = None
 
                         try:
-                            with st.spinner("Processando sua solicitação..."):
-                                response = agent.invoke({"messages": st.session_state.chat_messages_executor})
-
-                            # Check for malformed call
-                            if response["messages"][-1].response_metadata.get('finish_reason') == 'MALFORMED_FUNCTION_CALL':
-                                message_placeholder.empty()
-                                st.error("O modelo teve dificuldade em processar sua solicitação. Tente reformular.")
-                                st.stop()    
-
-                            # Extract AI response
-                            ai_content = response["messages"][-1].content
-
-                            if isinstance(ai_content, list) and len(ai_content) > 0:
-                                text_content = ai_content[0].get('text', '')
+                            # Perguntas comuns: consulta determinística nos agregados, sem chamar o modelo
+                            fast_answer = query_engine_.answer(user_input, global_filters) if query_engine_ is not None else None
+
+                            if fast_answer is not None:
+                                text_content, trace = fast_answer['text'], fast_answer['trace']
+                                st.caption("⚡ Resposta direta (consulta local, sem IA)")
+                            elif cached_response is not None:
+                                text_content, trace = cached_response['text'], cached_response['trace']
+                                st.caption("⚡ Resposta pronta (cache)")
                             else:
-                                text_content = ai_content
+                                # Contexto limitado: últimas trocas literais + resumo das anteriores
+                                context_messages, context_report = chat_context.build_context(
+                                    st.session_state.chat_messages_executor,
+                                    system_prompt=system_prompt
+                                )
+
+                                # Chamadas equivalentes (mesmo contexto, filtro, modelo e prompt) em
+                                # andamento em outra sessão são reaproveitadas
+                                stream = st.session_state.stream_responses
+                                dispatch_key = hashlib.sha256(
+                                    repr((model_name, system_prompt, scope_version(global_filters), global_filters, stream, context_messages)).encode()
+                                ).hexdigest()
+                                call_events = assistant.stream_events if stream else assistant.invoke_events
+
+                                # A ferramenta enxerga só as linhas do Filtro Global desta sessão
+                                # (o contexto é capturado no envio e usado na thread da fila)
+                                scope_token = agent_scope.set(current_agent_scope(global_filters))
+                                try:
+                                    ticket = get_llm_scheduler().submit(
+                                        st.session_state.llm_session_id,
+                                        dispatch_key,
+                                        lambda: call_events(agent, context_messages),
+                                    )
+                                finally:
+                                    agent_scope.reset(scope_token)
+
+                                response, timings = run_agent_call(progress_area, message_placeholder, ticket)
+                                if stream:
+                                    st.session_state.chat_ttfts.append(timings['ttft'])
+
+                                timings['context'] = {
+                                    **context_report,
+                                    'usage_input_tokens': chat_context.usage_input_tokens(response["messages"]),
+                                }
+
+                                # Check for malformed call
+                                if assistant.is_malformed(response):
+                                    message_placeholder.empty()
+                                    st.error("O modelo teve dificuldade em processar sua solicitação. Tente reformular.")
+                                    st.stop()    
+
+                                # Extract AI response
+                                text_content = assistant.message_text(response["messages"][-1])
+                                trace = assistant.tool_trace(response["messages"])
+                                if is_suggested:
+                                    response_cache.put(response_key, text_content, trace)
 
                             # DEBUG
-                            with st.expander("🔍 Debug: Ver código executado"):
-                                st.code(str(response), language="python")
+                            show_tool_trace(trace, timings)
 
                             # Display text only
                             message_placeholder.markdown(text_content)
@@ -528,11 +1181,117 @@ if car_data is not None:
     # --------------------------------------------------------
     # --- Aba 3: Ver Dados Brutos ---
     # --------------------------------------------------------
-    with tab3:
+    elif active_view == 'raw':
         st.header("Dados Brutos e Colunas")
-        st.dataframe(car_data)
+
+        # Paginação no servidor: só a página visível é enviada ao navegador
+        with st.expander("🔎 Filtros e Ordenação", expanded=False):
+            filter_col1, filter_col2, filter_col3 = st.columns(3)
+            with filter_col1:
+                raw_manufacturers = st.multiselect("Fabricante", sorted(get_categories(dataset_version, 'manufacturer')), key="raw_manufacturers")
+                raw_conditions = st.multiselect("Condição", get_categories(dataset_version, 'condition'), key="raw_conditions")
+            with filter_col2:
+                raw_types = st.multiselect("Tipo", get_categories(dataset_version, 'type'), key="raw_types")
+                raw_fuels = st.multiselect("Combustível", get_categories(dataset_version, 'fuel'), key="raw_fuels")
+            with filter_col3:
+                year_min, year_max = map(int, get_value_range(dataset_version, 'model_year'))
+                raw_years = st.slider("Ano do Modelo", year_min, year_max, (year_min, year_max), key="raw_years")
+                price_min, price_max = map(int, get_value_range(dataset_version, 'price'))
+                raw_prices = st.slider("Preço", price_min, price_max, (price_min, price_max), key="raw_prices")
+
+            sort_col1, sort_col2, sort_col3 = st.columns(3)
+            with sort_col1:
+                raw_sort_by = st.selectbox("Ordenar por", [None, *dataset.columns], format_func=lambda c: "(ordem original)" if c is None else c, key="raw_sort_by")
+            with sort_col2:
+                raw_ascending = st.radio("Ordem", [True, False], format_func={True: "Crescente", False: "Decrescente"}.get, horizontal=True, key="raw_ascending")
+            with sort_col3:
+                raw_page_size = st.selectbox("Linhas por página", [25, 50, 100, 200], index=1, key="raw_page_size")
+
+        raw_filters = tuple(
+            (column, 'in', tuple(values))
+            for column, values in [('manufacturer', raw_manufacturers), ('condition', raw_conditions), ('type', raw_types), ('fuel', raw_fuels)]
+            if values
+        )
+        if raw_years != (year_min, year_max):
+            raw_filters += (('model_year', 'range', raw_years),)
+        if raw_prices != (price_min, price_max):
+            raw_filters += (('price', 'range', raw_prices),)
+
+        n_raw = get_count(scope_version(global_filters + raw_filters), global_filters + raw_filters)
+        n_pages = data_browser.page_count(n_raw, raw_page_size)
+        # Valor só pelo session_state (como em WIDGET_DEFAULTS): sem value= no widget
+        st.session_state.setdefault('raw_page', 1)
+        if st.session_state.raw_page > n_pages:
+            st.session_state.raw_page = n_pages
+
+        raw_page = st.number_input(f"Página (de {n_pages})", min_value=1, max_value=n_pages, step=1, key="raw_page")
+        st.dataframe(get_page(dataset_version, global_filters + raw_filters, raw_sort_by, raw_ascending, raw_page, raw_page_size))
+        first_row = (raw_page - 1) * raw_page_size
+        st.caption(f"Mostrando {min(first_row + 1, n_raw)}–{min(first_row + raw_page_size, n_raw)} de {n_raw} registros")
+
         st.subheader("Colunas Disponíveis para Análise:")
-        st.write(list(car_data.columns))
+        st.write(dataset.columns)
+
+        if car_data is not None:
+            st.subheader("Uso de Memória por Coluna")
+            mem_report = data_store.memory_report(car_data)
+            st.dataframe(mem_report, hide_index=True)
+            st.markdown(f"Total em memória: **{mem_report['memória (KB)'].sum() / 1024:.1f} MB** ({len(car_data)} registros)")
+        else:
+            st.subheader("Armazenamento")
+            total_mb = sum(os.path.getsize(path) for path in dataset.files) / 1024 ** 2
+            st.markdown(
+                f"Backend DuckDB: **{len(dataset.files)}** arquivo(s) Parquet, **{total_mb:.1f} MB** em disco "
+                f"({dataset.n_rows} registros); nada do dataset fica na memória do app."
+            )
+
+    # --------------------------------------------------------
+    # --- Painel de Administração: Desempenho (ANALISTA_ADMIN) ---
+    # --------------------------------------------------------
+    elif active_view == 'admin':
+        st.header("Desempenho do App ⏱️")
+        snapshot = metrics_snapshot()
+        process = snapshot['process']
+        st.caption(
+            f"Processo há {snapshot['uptime_s'] / 60:.0f} min · memória residente: "
+            + (f"{process['rss_mb']:.0f} MB" if process['rss_mb'] is not None else "—")
+            + " · pico: "
+            + (f"{process['peak_rss_mb']:.0f} MB" if process['peak_rss_mb'] is not None else "—")
+            + f" · backend {DATA_BACKEND}, {snapshot['dataset']['rows']} registros"
+        )
+
+        st.subheader("Spans (todas as sessões)")
+        st.write("Os getters em cache só registram construções (cache miss); `render.*` mede o envio de cada gráfico e `rerun.*` o script inteiro.")
+        spans = [
+            {'span': name, **{key: value for key, value in stats.items() if key != 'attrs'}, **stats['attrs']}
+            for name, stats in snapshot['spans'].items()
+        ]
+        if spans:
+            st.dataframe(spans, hide_index=True)
+        else:
+            st.info("Nenhuma span registrada ainda.")
+
+        st.subheader("Caches e Fila do Modelo")
+        st.json({'caches': snapshot['caches'], 'llm_scheduler': snapshot['llm_scheduler']}, expanded=False)
+
+        with st.expander("Últimas spans"):
+            st.dataframe(snapshot['recent'][::-1], hide_index=True)
+
+        admin_col1, admin_col2 = st.columns(2)
+        with admin_col1:
+            st.download_button("Baixar métricas (JSON)", metrics.to_json(snapshot), file_name="metrics.json", mime="application/json")
+        with admin_col2:
+            st.button("Zerar métricas", on_click=recorder.reset)
 
 else:
-    st.info("Aguardando o arquivo 'vehicles_us.csv' para iniciar o aplicativo.")
\ No newline at end of file
+    st.info("Aguardando o arquivo 'vehicles_us.csv' para iniciar o aplicativo.")
+
+# Depois da primeira renderização: importa o stack de IA e aquece sandbox,
+# agente (e respostas prontas, ver WARM_RESPONSES_AT_STARTUP) sem atrasar o dashboard
+if dataset is not None and IA_DISPONIVEL and (USE_FAKE_LLM or api_key):
+    start_background_warmup(dataset_version, ACTIVE_MODEL_NAME, key_fingerprint(api_key), system_prompt, api_key)
+
+# Rerun completo (reruns de fragmentos não passam por aqui)
+recorder.record(f"rerun.{st.session_state.get('active_view', 'dashboard')}", time.perf_counter() - rerun_start)
+if METRICS_PATH:
+    metrics.dump(metrics_snapshot(), METRICS_PATH)
\ No newline at end of file
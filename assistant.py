@@ -0,0 +1,228 @@
+"""Suporte ao Consultor de Dados (Aba 2): perguntas sugeridas e cache de respostas.
+
+As 15 perguntas sugeridas são as consultas mais frequentes. Suas respostas
+(texto final e rastro das execuções da ferramenta) ficam em um cache com TTL,
+chaveado por (pergunta, versão do dataset, filtro, modelo, hash do system
+prompt), e podem ser pré-calculadas em lote na inicialização ou depois de uma
+atualização dos dados.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+RESPONSE_TTL_SECONDS = 6 * 60 * 60
+RESPONSE_MAX_ENTRIES = 256
+
+# Linhas de botões: (título da linha, [(key, rótulo, pergunta), ...])
+SUGGESTED_QUESTIONS = [
+    ("**1. FABRICANTES**", [
+        ('btn_1a', "📊 Preço Médio por Fabricante", "Qual o preço médio por fabricante ('manufacturer')?"),
+        ('btn_1b', "📈 Rank de Preço por Fabricante", "Liste os 5 fabricantes com o maior preço médio, mostrando o preço."),
+        ('btn_1c', "📦 Rank de Fabricantes por Vendas", "Conte o número total de veículos por fabricante e liste os 5 mais vendidos."),
+        ('btn_1d', "🔥 Eficiência por Fabricante", "Para os 5 fabricantes mais caros, qual é a média de cilindros ('cylinders') e o tipo de transmissão ('transmission') mais comum?"),
+        ('btn_1e', "⛽️ Popularidade por Tipo de Combustível", "Para a Toyota, conte quantos veículos utilizam gasolina e quantos utilizam diesel."),
+    ]),
+    ("**2. MODELOS**", [
+        ('btn_2a', "💰 Top 5 Carros Mais Caros", "Quais são os 5 carros mais caros? Liste o modelo, ano e preço."),
+        ('btn_2b', "📈 Rank de Carros Mais Vendidos", "Conte quantos anúncios existem por modelo de carro e liste os 5 modelos mais populares (maior contagem)."),
+        ('btn_2c', "🚜 4x4 Mais Caros (Top 10)", "Quais são os 10 carros mais caros com tração 4x4 ('is_4wd' = True)? Liste o preço e o modelo."),
+        ('btn_2d', "🎨 Popularidade da Cor/Tipo", "Qual a cor ('paint_color') mais comum entre os veículos do tipo 'SUV'?"),
+        ('btn_2e', "📉 Rank de Carros Mais Antigos", "Quais são os 10 modelos de carros mais antigos ('model_year') no dataset?"),
+    ]),
+    ("**3. ANÁLISES**", [
+        ('btn_3a', "📉 Análise de Depreciação", "Qual a taxa média de preço dividido por idade (ano atual - 'model_year') para veículos em 'excelente' condição?"),
+        ('btn_3b', "🚗 Média de KM por Condição", "Qual a quilometragem média ('odometer') por condição ('condition') dos veículos?"),
+        ('btn_3c', "💎 Melhores Negócios (Baixo Custo/Alto Valor)", "Liste os 5 modelos com preço abaixo da média GERAL, mas que estejam em 'excelente' condição."),
+        ('btn_3d', "⛽ Eficiência de Combustível/Cilindro", "Qual é a média de cilindros ('cylinders') para carros a 'gasolina' e para carros a 'diesel'?"),
+        ('btn_3e', "💎 Relação Preço/Quilometragem", "Calcule a média da relação entre preço e quilometragem ('price' / 'odometer') por tipo de combustível ('fuel')."),
+    ]),
+]
+
+SUGGESTED_PROMPTS = [prompt for _, row in SUGGESTED_QUESTIONS for _, _, prompt in row]
+
+
+# --- Extração da Resposta do Agente ---
+
+def message_text(message):
+    """Texto de uma mensagem (o Gemini pode devolver uma lista de partes)."""
+    content = message.content
+    if isinstance(content, list) and len(content) > 0:
+        return content[0].get('text', '') if isinstance(content[0], dict) else str(content[0])
+    return content
+
+
+# Argumento com o código em cada ferramenta do app (PythonCodeExecutor, SQLQueryExecutor)
+TOOL_CODE_ARGS = (('code', 'python'), ('query', 'sql'))
+
+
+def tool_code(call):
+    """{'code', 'language'} de uma chamada de ferramenta, para exibição."""
+    args = call.get('args') or {}
+    for name, language in TOOL_CODE_ARGS:
+        if name in args:
+            return {'code': args[name], 'language': language}
+    return {'code': '', 'language': 'python'}
+
+
+def tool_trace(messages):
+    """Código, linguagem e saída de cada chamada de ferramenta no último turno."""
+    human = [i for i, m in enumerate(messages) if getattr(m, 'type', None) == 'human']
+    messages = messages[human[-1] + 1:] if human else messages
+    outputs = {
+        getattr(m, 'tool_call_id', None): m.content
+        for m in messages
+        if getattr(m, 'type', None) == 'tool'
+    }
+    return [
+        {**tool_code(call), 'output': outputs.get(call['id'], '')}
+        for m in messages
+        for call in (getattr(m, 'tool_calls', None) or [])
+    ]
+
+
+def chunk_text(content):
+    """Texto de um pedaço do stream (string ou lista de partes do Gemini)."""
+    if isinstance(content, str):
+        return content
+    return ''.join(
+        part.get('text', '') if isinstance(part, dict) else str(part)
+        for part in content or []
+    )
+
+
+def stream_events(agent, messages):
+    """Executa o agente em streaming, gerando eventos conforme acontecem.
+
+    Eventos (todos com 'elapsed', segundos desde o início):
+    - ('token', {'text'}): pedaço de texto gerado pelo modelo;
+    - ('model', {'tool_calls', 'text'}): uma chamada ao modelo terminou; as
+      chamadas de ferramenta pedidas vêm em 'tool_calls' ({'id', 'code', 'language'});
+    - ('tool_output', {'text'}): trecho da saída de uma ferramenta em execução
+      (enviado por `tool_output_writer`);
+    - ('tool', {'id', 'output'}): uma execução do PythonCodeExecutor terminou;
+    - ('done', {'messages'}): fim do ciclo; 'messages' são as mensagens novas,
+      no mesmo formato de `agent.invoke(...)["messages"]`.
+    """
+    start = time.perf_counter()
+    new_messages = []
+
+    def event(kind, **payload):
+        return kind, {**payload, 'elapsed': time.perf_counter() - start}
+
+    for mode, payload in agent.stream({"messages": messages}, stream_mode=["messages", "updates", "custom"]):
+        if mode == "custom":
+            if isinstance(payload, dict) and 'tool_output' in payload:
+                yield event('tool_output', text=payload['tool_output'])
+            continue
+        if mode == "messages":
+            chunk, metadata = payload
+            text = chunk_text(chunk.content) if getattr(chunk, 'type', None) in ('ai', 'AIMessageChunk') else ''
+            if text and metadata.get('langgraph_node') == 'model':
+                yield event('token', text=text)
+            continue
+
+        for update in payload.values():
+            for message in (update or {}).get('messages', []):
+                new_messages.append(message)
+                if message.type == 'ai':
+                    calls = [{'id': call['id'], **tool_code(call)} for call in message.tool_calls]
+                    yield event('model', tool_calls=calls, text=chunk_text(message.content))
+                elif message.type == 'tool':
+                    yield event('tool', id=message.tool_call_id, output=message.content)
+
+    yield event('done', messages=new_messages)
+
+
+def tool_output_writer():
+    """Função que repassa um trecho da saída da ferramenta ao `stream_events`.
+
+    Dentro de uma execução do agente em streaming, usa o stream "custom" do
+    LangGraph; fora dela (invoke, testes), os trechos são descartados.
+    """
+    try:
+        from langgraph.config import get_stream_writer
+
+        writer = get_stream_writer()
+    except (ImportError, RuntimeError):
+        return lambda text: None
+    return lambda text: writer({'tool_output': text})
+
+
+def invoke_events(agent, messages):
+    """`agent.invoke` no formato de eventos de `stream_events` (só o 'done')."""
+    start = time.perf_counter()
+    response = agent.invoke({"messages": messages})
+    yield 'done', {'messages': response["messages"], 'elapsed': time.perf_counter() - start}
+
+
+def is_malformed(response):
+    return response["messages"][-1].response_metadata.get('finish_reason') == 'MALFORMED_FUNCTION_CALL'
+
+
+# --- Cache de Respostas ---
+
+def response_key(prompt, dataset_version, filters, model_name, system_prompt):
+    prompt_hash = hashlib.sha256(system_prompt.encode()).hexdigest()[:16]
+    return prompt.strip(), dataset_version, tuple(filters), model_name, prompt_hash
+
+
+class ResponseCache:
+    """Respostas completas do agente, com TTL e despejo LRU (thread-safe).
+
+    Só em memória: um processo novo começa vazio e refaz o pré-cálculo.
+    """
+
+    def __init__(self, ttl_seconds=RESPONSE_TTL_SECONDS, max_entries=RESPONSE_MAX_ENTRIES):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if time.time() - entry['created_at'] > self.ttl_seconds:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key, text, trace):
+        with self._lock:
+            self._entries[key] = {'text': text, 'trace': trace, 'created_at': time.time()}
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def warm_responses(invoke, cache, key_for, prompts=SUGGESTED_PROMPTS):
+    """Pré-calcula as respostas de `prompts` que ainda não estão no cache.
+
+    `invoke(messages)` executa o agente e devolve um dict com 'messages' (como
+    `agent.invoke`); `key_for(prompt)` monta a chave do cache. Falhas são ignoradas: a pergunta
+    só fica sem resposta pronta e segue o caminho normal quando clicada.
+    Retorna quantas respostas foram calculadas.
+    """
+    computed = 0
+    for prompt in prompts:
+        key = key_for(prompt)
+        if key in cache:
+            continue
+        try:
+            response = invoke([{"role": "user", "content": prompt}])
+        except Exception:
+            continue
+        if is_malformed(response):
+            continue
+        cache.put(key, message_text(response["messages"][-1]), tool_trace(response["messages"]))
+        computed += 1
+    return computed
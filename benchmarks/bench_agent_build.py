@@ -0,0 +1,78 @@
+"""Custo de criar o modelo e o agente a cada rerun da Aba 2.
+
+Antes, todo rerun criava um `ChatGoogleGenerativeAI` novo e chamava
+`create_agent`, que compila o grafo do LangGraph. Agora os dois ficam em
+`st.cache_resource`; este script mede o que era pago por rerun e o custo de
+um acerto no cache.
+
+    python benchmarks/bench_agent_build.py --repeat 20
+"""
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+import streamlit as st  # noqa: E402
+from langchain.agents import create_agent  # noqa: E402
+from langchain.tools import tool  # noqa: E402
+
+import fake_llm  # noqa: E402
+
+
+@tool
+def PythonCodeExecutor(code: str) -> str:
+    """Stub da ferramenta do app."""
+    return code
+
+
+def make_models():
+    models = {'fake-tool-calling': fake_llm.FakeToolCallingModel}
+    try:
+        from langchain_google_genai import ChatGoogleGenerativeAI
+    except ImportError:
+        print("langchain_google_genai não instalado: medindo só o modelo local")
+    else:
+        # Só constrói o cliente; nenhuma requisição é feita
+        models['gemini-2.5-flash'] = lambda: ChatGoogleGenerativeAI(
+            model='gemini-2.5-flash', google_api_key='benchmark-sem-chamadas', temperature=0
+        )
+    return models
+
+
+def median_ms(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    system_prompt = (ROOT / 'prompts' / 'system.txt').read_text()
+
+    print(f"{'modelo':<20} {'por rerun, antes (ms)':>22} {'cache (ms)':>11}")
+    for name, build_model in make_models().items():
+        def build():
+            return create_agent(model=build_model(), tools=[PythonCodeExecutor], system_prompt=system_prompt)
+
+        @st.cache_resource
+        def get_agent(model_name, system_prompt):
+            return build()
+
+        get_agent(name, system_prompt)
+        uncached = median_ms(build, args.repeat)
+        cached = median_ms(lambda: get_agent(name, system_prompt), args.repeat)
+        print(f"{name:<20} {uncached:>22.2f} {cached:>11.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,159 @@
+"""Suíte de desempenho do app inteiro (Streamlit AppTest, modelo falso, offline).
+
+Para cada tamanho de dataset sintético, um processo novo roda o app sem
+navegador e mede o rerun frio e o quente do dashboard, a troca de filtro, a
+aba de chat com uma pergunta ao modelo falso e a aba de dados brutos, além do
+pico de memória. As spans do `metrics.py` gravadas pelo próprio app
+(`ANALISTA_METRICS_PATH`) mostram onde o tempo foi gasto.
+
+Com `--save` o resultado vira a linha de base; com `--baseline` a execução
+falha (código 1) se alguma etapa ficou mais lenta ou mais pesada que a
+tolerância, para pegar regressões sem rede e sem chave de API.
+
+    python benchmarks/bench_app.py --sizes 50000,200000,1000000 --save base.json
+    python benchmarks/bench_app.py --sizes 50000,200000,1000000 --baseline base.json --tolerance 0.25
+"""
+import argparse
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / 'benchmarks'))
+
+import synthetic_data  # noqa: E402
+
+QUESTION = "Escreva código: cilindros por combustível, passo a passo"
+TOP_SPANS = 8
+# Diferenças abaixo disso são ruído de medição, não regressão
+NOISE_FLOOR = {'s': 0.05, 'MB': 20}
+
+
+def timed_run(at, setup=None):
+    start = time.perf_counter()
+    (setup(at) if setup else at).run()
+    if at.exception:
+        raise RuntimeError(at.exception[0].value)
+    return time.perf_counter() - start
+
+
+def set_view(view):
+    def setup(at):
+        at.session_state['active_view'] = view
+        return at
+    return setup
+
+
+def set_type_filter(at):
+    at.session_state['global_types'] = ['sedan']
+    return at
+
+
+def ask(at):
+    return at.chat_input[0].set_value(QUESTION)
+
+
+def measure(n_rows):
+    """Roda no processo filho: tempo de cada etapa (s), pico de memória e spans."""
+    workdir = Path(tempfile.mkdtemp(prefix='car_app_'))
+    try:
+        synthetic_data.generate(n_rows).to_csv(workdir / 'vehicles_us.csv', index=False)
+        (workdir / 'prompts').symlink_to(ROOT / 'prompts')
+        metrics_path = workdir / 'metrics.json'
+        os.environ['ANALISTA_FAKE_LLM'] = '1'
+        os.environ['ANALISTA_METRICS_PATH'] = str(metrics_path)
+        os.chdir(workdir)
+
+        from streamlit.testing.v1 import AppTest
+
+        at = AppTest.from_file(str(ROOT / 'app.py'), default_timeout=600)
+        result = {}
+        for name, setup in [
+            ('dashboard (frio)', None),
+            ('dashboard (quente)', None),
+            ('troca de filtro', set_type_filter),
+            ('aba de chat', set_view('chat')),
+            ('pergunta ao modelo', ask),
+            ('dados brutos', set_view('raw')),
+        ]:
+            result[name] = timed_run(at, setup)
+        result['pico de memória (MB)'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+        spans = json.loads(metrics_path.read_text())['spans']
+        slowest = sorted(spans.items(), key=lambda item: item[1]['total_s'], reverse=True)[:TOP_SPANS]
+        result['spans'] = {
+            name: {'calls': stats['calls'], 'total_s': stats['total_s'], 'p95_ms': stats['p95_ms']}
+            for name, stats in slowest
+        }
+        return result
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def run_child(n_rows):
+    command = [sys.executable, __file__, '--measure', str(n_rows)]
+    out = subprocess.run(command, check=True, capture_output=True, text=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def regressions(results, baseline, tolerance):
+    """Etapas acima de (1 + tolerance) vezes a linha de base, por tamanho."""
+    found = []
+    for size, result in results.items():
+        for name, value in result.items():
+            reference = baseline.get(size, {}).get(name)
+            if name == 'spans' or reference is None:
+                continue
+            unit = 'MB' if name.endswith('(MB)') else 's'
+            if value > reference * (1 + tolerance) and value - reference > NOISE_FLOOR[unit]:
+                found.append(f"{int(size):,} linhas, {name}: {reference:.2f} -> {value:.2f} {unit}")
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default='50000,200000,1000000', help="linhas, separadas por vírgula")
+    parser.add_argument('--save', help="grava os resultados em JSON (linha de base)")
+    parser.add_argument('--baseline', help="JSON de uma execução anterior para comparar")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="piora relativa aceita (0.25 = 25%%)")
+    parser.add_argument('--measure', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        print(json.dumps(measure(args.measure)))
+        return
+
+    results = {}
+    for n_rows in sorted(int(size) for size in args.sizes.split(',')):
+        results[str(n_rows)] = run_child(n_rows)
+
+    steps = [name for name in next(iter(results.values())) if name != 'spans']
+    print(f"{'etapa':<24}" + ''.join(f"{int(size):>14,}" for size in results))
+    for name in steps:
+        unit = '' if name.endswith('(MB)') else ' s'
+        print(f"{name:<24}" + ''.join(f"{result[name]:>12.2f}{unit or '  '}" for result in results.values()))
+    for size, result in results.items():
+        print(f"\nspans com mais tempo total ({int(size):,} linhas):")
+        for name, stats in result['spans'].items():
+            print(f"  {name:<34}{stats['calls']:>5}x {stats['total_s']:>8.2f} s   p95 {stats['p95_ms']:>8.1f} ms")
+
+    if args.save:
+        Path(args.save).write_text(json.dumps(results, indent=2))
+    if args.baseline:
+        found = regressions(results, json.loads(Path(args.baseline).read_text()), args.tolerance)
+        print(f"\n{len(found)} regressões (tolerância {args.tolerance:.0%})")
+        for line in found:
+            print(f"  {line}")
+        if found:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
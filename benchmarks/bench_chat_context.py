@@ -0,0 +1,74 @@
+"""Tokens de prompt e latência por turno em uma sessão longa de chat.
+
+Compara o histórico completo (comportamento antigo) com o contexto limitado de
+`chat_context`, usando o modelo local de `fake_llm` com latência proporcional
+ao tamanho do prompt e uma ferramenta que devolve uma tabela markdown grande,
+como as respostas reais do agente.
+
+    python benchmarks/bench_chat_context.py --turns 30
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from langchain.agents import create_agent  # noqa: E402
+from langchain.tools import tool  # noqa: E402
+
+import chat_context  # noqa: E402
+import fake_llm  # noqa: E402
+
+TABLE_ROWS = 40
+QUESTIONS = [
+    "Qual o preço médio por fabricante?",
+    "E a quilometragem média por condição?",
+    "Quais modelos aparecem mais?",
+    "Qual a cor mais comum?",
+]
+
+
+@tool
+def PythonCodeExecutor(code: str) -> str:
+    """Stub: devolve uma tabela markdown do tamanho de uma resposta típica."""
+    rows = "\n".join(f"| fabricante_{i} | {10000 + 137 * i:.2f} |" for i in range(TABLE_ROWS))
+    return f"| Fabricante | Preço Médio |\n| :--- | ---: |\n{rows}"
+
+
+def run_session(agent, turns, bounded):
+    history, results = [], []
+    for turn in range(turns):
+        history.append({'role': 'user', 'content': QUESTIONS[turn % len(QUESTIONS)]})
+        if bounded:
+            messages, _ = chat_context.build_context(history)
+        else:
+            messages = history
+        start = time.perf_counter()
+        response = agent.invoke({"messages": messages})
+        elapsed = time.perf_counter() - start
+        history.append({'role': 'assistant', 'content': response["messages"][-1].content})
+        results.append((chat_context.usage_input_tokens(response["messages"]), elapsed))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--turns', type=int, default=30)
+    parser.add_argument('--latency-per-1k', type=float, default=0.05, help="segundos por 1000 tokens de entrada")
+    args = parser.parse_args()
+
+    model = fake_llm.FakeToolCallingModel(latency_per_1k_input_tokens=args.latency_per_1k)
+    agent = create_agent(model=model, tools=[PythonCodeExecutor], system_prompt=(ROOT / 'prompts' / 'system.txt').read_text())
+
+    full = run_session(agent, args.turns, bounded=False)
+    bounded = run_session(agent, args.turns, bounded=True)
+
+    print(f"{'turno':>5} {'tokens (completo)':>18} {'s (completo)':>13} {'tokens (limitado)':>18} {'s (limitado)':>13}")
+    for turn, ((full_tokens, full_s), (bounded_tokens, bounded_s)) in enumerate(zip(full, bounded), start=1):
+        print(f"{turn:>5} {full_tokens:>18} {full_s:>13.3f} {bounded_tokens:>18} {bounded_s:>13.3f}")
+
+
+if __name__ == '__main__':
+    main()
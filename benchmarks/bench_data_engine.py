@@ -0,0 +1,145 @@
+"""Backends de dados: pandas (em memória) vs DuckDB (Parquet fora da memória).
+
+Gera arquivos sintéticos em partes (CSV -> Parquet limpo, pelo mesmo
+`build_parquet_snapshot` do app) e mede, para cada tamanho, os agregados da
+Aba 1, a contagem e a página ordenada com filtro, e o pico de memória. Cada
+medição roda em um processo novo; o pandas é pulado quando a estimativa de
+memória passa da memória disponível.
+
+    python benchmarks/bench_data_engine.py --sizes 50000,5000000,50000000 --workdir /tmp/car_engine
+"""
+import argparse
+import json
+import os
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / 'benchmarks'))
+
+import pyarrow.parquet as pq  # noqa: E402
+
+import data_engine  # noqa: E402
+import data_store  # noqa: E402
+import synthetic_data  # noqa: E402
+
+CHUNK_ROWS = 1_000_000
+# Folga sobre o frame: frames filtrados, ordenações e agregados intermediários
+PANDAS_MEMORY_FACTOR = 4
+
+FILTERS = (('type', 'in', ('sedan', 'SUV')), ('model_year', 'range', (2005, 2015)))
+WORKLOADS = {
+    'cubo': lambda engine: engine.build_cube(),
+    'preços (hist. + box)': lambda engine: engine.build_price_summaries(),
+    'depreciação': lambda engine: engine.build_depreciation_summary(),
+    'cubo filtrado': lambda engine: engine.build_cube(FILTERS),
+    'contagem filtrada': lambda engine: engine.count(FILTERS),
+    'página ordenada': lambda engine: engine.page(FILTERS, 'price', False, 1, 50),
+}
+
+
+def generate(data_dir, n_rows):
+    """Partes de até CHUNK_ROWS linhas em `data_dir` (reaproveitadas se já existirem)."""
+    data_dir.mkdir(parents=True, exist_ok=True)
+    for i, start in enumerate(range(0, n_rows, CHUNK_ROWS)):
+        csv_path = data_dir / f"part-{i:04d}.csv"
+        if data_store.snapshot_path(csv_path, data_dir, kind='parquet').exists():
+            continue
+        synthetic_data.generate(min(CHUNK_ROWS, n_rows - start), seed=i).to_csv(csv_path, index=False)
+        data_engine.build_parquet_snapshot(csv_path, data_dir)
+        csv_path.unlink()
+
+
+def open_engine(backend, data_dir, memory_limit):
+    if backend == 'duckdb':
+        return data_engine.open_duckdb(
+            snapshot_dir=data_dir, source=str(data_dir / '*.parquet'), memory_limit=memory_limit
+        )
+    table = pq.read_table(sorted(str(path) for path in data_dir.glob('*.parquet')))
+    return data_engine.PandasEngine(data_store.apply_schema(table.to_pandas(strings_to_categorical=True)))
+
+
+def measure(backend, data_dir, repeat, memory_limit):
+    """Roda no processo filho: tempos (s) de cada etapa e pico de memória (MB)."""
+    start = time.perf_counter()
+    engine = open_engine(backend, data_dir, memory_limit)
+    result = {'abrir': time.perf_counter() - start, 'rows': engine.n_rows}
+    if engine.frame is not None:
+        result['frame_mb'] = engine.frame.memory_usage(deep=True).sum() / 1024 ** 2
+    for name, workload in WORKLOADS.items():
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            workload(engine)
+            timings.append(time.perf_counter() - start)
+        result[name] = statistics.median(timings)
+    result['pico de memória (MB)'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return result
+
+
+def run_child(backend, data_dir, args):
+    command = [
+        sys.executable, __file__, '--measure', backend, '--data-dir', str(data_dir),
+        '--repeat', str(args.repeat), '--memory-limit', args.memory_limit or '',
+    ]
+    out = subprocess.run(command, check=True, capture_output=True, text=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def available_mb():
+    return os.sysconf('SC_AVPHYS_PAGES') * os.sysconf('SC_PAGE_SIZE') / 1024 ** 2
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default='50000,5000000,50000000', help="linhas, separadas por vírgula")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--memory-limit', default=None, help="memory_limit do DuckDB (ex.: 1GB); padrão: o do DuckDB")
+    parser.add_argument('--workdir', default=None, help="mantém os arquivos gerados entre execuções")
+    parser.add_argument('--measure', choices=data_engine.BACKENDS, help=argparse.SUPPRESS)
+    parser.add_argument('--data-dir', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        print(json.dumps(measure(args.measure, Path(args.data_dir), args.repeat, args.memory_limit or None)))
+        return
+
+    workdir = Path(args.workdir or tempfile.mkdtemp(prefix='car_engine_'))
+    mb_per_row = None
+    try:
+        for n_rows in sorted(int(size) for size in args.sizes.split(',')):
+            data_dir = workdir / f"rows_{n_rows}"
+            start = time.perf_counter()
+            generate(data_dir, n_rows)
+            disk_mb = sum(path.stat().st_size for path in data_dir.glob('*.parquet')) / 1024 ** 2
+            print(f"\n{n_rows:,} linhas: {disk_mb:.0f} MB em Parquet (gerado em {time.perf_counter() - start:.0f} s)")
+
+            results = {}
+            for backend in data_engine.BACKENDS:
+                if backend == 'pandas' and mb_per_row is not None:
+                    estimate = mb_per_row * n_rows * PANDAS_MEMORY_FACTOR
+                    if estimate > available_mb():
+                        print(f"pandas pulado: ~{estimate / 1024:.1f} GB estimados, {available_mb() / 1024:.1f} GB disponíveis")
+                        continue
+                results[backend] = run_child(backend, data_dir, args)
+                if backend == 'pandas':
+                    mb_per_row = results[backend]['frame_mb'] / results[backend]['rows']
+
+            print(f"{'etapa':<22}" + ''.join(f"{backend:>12}" for backend in results))
+            for name in ['abrir', *WORKLOADS, 'pico de memória (MB)']:
+                unit = '' if name.endswith('(MB)') else ' s'
+                print(f"{name:<22}" + ''.join(f"{result[name]:>10.2f}{unit or '  '}" for result in results.values()))
+    finally:
+        if args.workdir is None:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,193 @@
+"""Ingestão incremental (partition_store) vs reconstrução completa, do refresh ao render.
+
+Gera `--days` arquivos diários sintéticos (cada um com `date_posted` do seu
+dia), faz a ingestão inicial e então mede a chegada de um arquivo novo em
+dois níveis:
+
+- dados: cada etapa até o dashboard ter o que desenhar (refresh, frame,
+  índice do filtro, ordenações, cubo, resumos de preço e de depreciação),
+  pelo caminho incremental do app contra refazer tudo sobre o mesmo manifesto;
+- app: o rerun do Streamlit (AppTest, modelo falso) depois do clique em
+  "Verificar novos arquivos", até o fim do render, para um arquivo novo e para
+  um arquivo antigo alterado (que obriga a refazer o frame), com as spans do
+  `metrics.py` de cada rerun.
+
+    python benchmarks/bench_ingest.py --days 60 --rows-per-day 20000
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / 'benchmarks'))
+
+import pandas as pd  # noqa: E402
+
+import aggregates  # noqa: E402
+import data_browser  # noqa: E402
+import data_engine  # noqa: E402
+import filter_index  # noqa: E402
+import partition_store  # noqa: E402
+import synthetic_data  # noqa: E402
+
+FIRST_DAY = pd.Timestamp('2019-01-01')
+TOP_SPANS = 8
+WARMUP_THREADS = ('agent-warmup', 'response-warmup')
+
+
+def write_drop(drop_dir, day, rows_per_day, seed=None):
+    df = synthetic_data.generate(rows_per_day, seed=day if seed is None else seed)
+    df['date_posted'] = (FIRST_DAY + pd.Timedelta(days=day)).strftime('%Y-%m-%d')
+    df.to_csv(drop_dir / f"listings-{day:04d}.csv", index=False)
+
+
+def partition_cube(engine, manifest, cache):
+    versions = {p: info['version'] for p, info in manifest['partitions'].items()}
+    return cache.total(versions, lambda stale: engine.build_partition_cubes(partition_store.PARTITION_COLUMN, stale))
+
+
+def timed(function):
+    start = time.perf_counter()
+    result = function()
+    return result, time.perf_counter() - start
+
+
+def prepare(store, positional, cubes, rebuild_seconds=None):
+    """Do refresh aos dados do dashboard; tempo de cada etapa (s).
+
+    Com `rebuild_seconds` (o tempo de reingerir todos os CSVs), é o caminho
+    completo: frame, índice, ordenações e cubo refeitos sobre o manifesto atual,
+    sem aproveitar nada da versão anterior.
+    """
+    steps = {}
+    full = rebuild_seconds is not None
+    if full:
+        manifest, steps['refresh'] = store.manifest, rebuild_seconds
+        df, steps['frame'] = timed(lambda: partition_store.read_frame(manifest, store.snapshot_dir))
+        _, steps['índice do filtro'] = timed(lambda: filter_index.build_filter_index(df))
+        _, steps['ordenações'] = timed(lambda: data_browser.build_sort_orders(df))
+        engine = data_engine.PandasEngine(df)
+        _, steps['cubo'] = timed(engine.build_cube)
+    else:
+        manifest, steps['refresh'] = timed(lambda: store.current(force=True))
+        df, steps['frame'] = timed(lambda: store.read_frame(manifest))
+        _, steps['índice do filtro'] = timed(lambda: positional['filter_index'].get(df))
+        _, steps['ordenações'] = timed(lambda: positional['sort_orders'].get(df))
+        engine = data_engine.PandasEngine(df)
+        _, steps['cubo'] = timed(lambda: partition_cube(engine, manifest, cubes))
+    # Não são somáveis por partição (quantis, amostra): refeitos nos dois caminhos
+    _, steps['resumos de preço'] = timed(engine.build_price_summaries)
+    _, steps['depreciação'] = timed(engine.build_depreciation_summary)
+    steps['total'] = sum(steps.values())
+    return steps
+
+
+def measure_data(drop_dir, snapshot_dir, days, rows_per_day, rebuild_seconds):
+    store = partition_store.PartitionStore(drop_dir, snapshot_dir, interval=0)
+    positional = {
+        'filter_index': partition_store.AppendCache(filter_index.build_filter_index, filter_index.extend_filter_index),
+        'sort_orders': partition_store.AppendCache(data_browser.build_sort_orders, data_browser.extend_sort_orders),
+    }
+    cubes = partition_store.PartitionCache(combine=aggregates.combine_cubes)
+
+    _, initial = timed(lambda: prepare(store, positional, cubes))
+    write_drop(drop_dir, days, rows_per_day)
+    incremental = prepare(store, positional, cubes)
+    full = prepare(store, positional, cubes, rebuild_seconds)
+
+    print(f"\ndados do dashboard com 1 arquivo novo (ingestão inicial: {initial:.2f} s)")
+    print(f"{'etapa':<24}{'incremental':>14}{'completo':>12}")
+    for name in incremental:
+        print(f"{name:<24}{incremental[name]:>13.3f}s{full[name]:>11.3f}s")
+    print(f"índice/ordenações: {positional['filter_index'].extensions} extensão, "
+          f"{positional['filter_index'].builds} construção; cubos por partição: "
+          f"{cubes.hits} reaproveitados, {cubes.misses} calculados")
+
+
+def span_totals(metrics_path):
+    spans = json.loads(metrics_path.read_text())['spans']
+    return {name: stats['total_s'] for name, stats in spans.items()}
+
+
+def measure_app(workdir, drop_dir, days, rows_per_day):
+    """Reruns do app no modo de diretório: (nome, segundos, spans com mais tempo no rerun)."""
+    from streamlit.testing.v1 import AppTest
+
+    app_dir = workdir / 'app'
+    app_dir.mkdir()
+    metrics_path = app_dir / 'metrics.json'
+    os.environ['ANALISTA_DATA_DIR'] = str(drop_dir)
+    os.environ['ANALISTA_FAKE_LLM'] = '1'
+    os.environ['ANALISTA_METRICS_PATH'] = str(metrics_path)
+    os.chdir(app_dir)
+
+    at = AppTest.from_file(str(ROOT / 'app.py'), default_timeout=600)
+
+    def wait_for_warmup():
+        # Pré-aquecimento e pré-cálculo de respostas rodam em segundo plano
+        for thread in threading.enumerate():
+            if thread.name in WARMUP_THREADS:
+                thread.join()
+
+    def rerun(setup=None):
+        wait_for_warmup()
+        before = span_totals(metrics_path) if metrics_path.exists() else {}
+        if setup:
+            setup()
+            at.button(key='refresh_drops').click()
+        _, seconds = timed(at.run)
+        if at.exception:
+            raise RuntimeError(at.exception[0].value)
+        after = span_totals(metrics_path)
+        spent = {name: total - before.get(name, 0.0) for name, total in after.items()}
+        slowest = sorted(((s, n) for n, s in spent.items() if s > 0), reverse=True)[:TOP_SPANS]
+        return seconds, slowest
+
+    results = [('app frio (ingestão + dashboard)', *rerun())]
+    results.append(('arquivo novo: clique até o render',
+                    *rerun(lambda: write_drop(drop_dir, days + 1, rows_per_day))))
+    results.append(('arquivo alterado: clique até o render',
+                    *rerun(lambda: write_drop(drop_dir, 0, rows_per_day, seed=10_000))))
+    wait_for_warmup()  # antes de apagar os arquivos que eles leem
+
+    print(f"\napp (AppTest, {days + 2} arquivos no fim)")
+    for name, seconds, slowest in results:
+        print(f"{name:<44}{seconds:>9.3f}s")
+        for span_seconds, span in slowest:
+            print(f"    {span:<36}{span_seconds:>9.3f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--days', type=int, default=60)
+    parser.add_argument('--rows-per-day', type=int, default=20000)
+    parser.add_argument('--skip-app', action='store_true', help="só as etapas de dados, sem o AppTest")
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp(prefix='car_ingest_'))
+    drop_dir, snapshot_dir = workdir / 'drops', workdir / 'snapshot'
+    drop_dir.mkdir()
+    try:
+        for day in range(args.days):
+            write_drop(drop_dir, day, args.rows_per_day)
+        print(f"{args.days} arquivos diários de {args.rows_per_day:,} linhas")
+
+        # Refresh do caminho completo: reingerir todos os CSVs
+        _, rebuild = timed(lambda: partition_store.refresh(drop_dir, workdir / 'rebuild'))
+
+        measure_data(drop_dir, snapshot_dir, args.days, args.rows_per_day, rebuild)
+        if not args.skip_app:
+            measure_app(workdir, drop_dir, args.days, args.rows_per_day)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
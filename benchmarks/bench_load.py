@@ -0,0 +1,60 @@
+"""Compara o cold start de load_data(): CSV direto vs snapshot Arrow mapeado.
+
+Cada medição roda em um processo Python novo, como um container acordando.
+
+    python benchmarks/bench_load.py --csv vehicles_us.csv --repeat 5
+"""
+import argparse
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+CHILD = """
+import sys, time
+sys.path.insert(0, {root!r})
+t0 = time.perf_counter()
+import data_store
+{body}
+print(time.perf_counter() - t0)
+"""
+
+PATHS = {
+    'csv': "data_store.read_csv_clean({csv!r})",
+    'snapshot': "data_store.read_snapshot({csv!r}, {snapshot_dir!r})",
+}
+
+
+def run_child(body):
+    code = CHILD.format(root=str(ROOT), body=body)
+    out = subprocess.run([sys.executable, '-c', code], check=True, capture_output=True, text=True)
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--csv', default=str(ROOT / 'vehicles_us.csv'))
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    sys.path.insert(0, str(ROOT))
+    import data_store
+
+    snapshot_dir = tempfile.mkdtemp(prefix='car_snapshot_')
+    try:
+        data_store.build_snapshot(args.csv, snapshot_dir)
+        print(f"{'caminho':<10} {'mediana (s)':>12} {'mín (s)':>10}")
+        for name, template in PATHS.items():
+            body = template.format(csv=args.csv, snapshot_dir=snapshot_dir)
+            timings = [run_child(body) for _ in range(args.repeat)]
+            print(f"{name:<10} {statistics.median(timings):>12.3f} {min(timings):>10.3f}")
+    finally:
+        shutil.rmtree(snapshot_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""Taxa de acerto e latência da consulta direta (sem LLM) do chat.
+
+Roda as perguntas sugeridas e variações comuns em pt/en pelo QueryEngine, com
+getters em memória equivalentes aos caches do app, e mostra o que seria
+encaminhado ao agente.
+
+    python benchmarks/bench_query_engine.py --rows 51525
+"""
+import argparse
+import functools
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / 'benchmarks'))
+
+import aggregates  # noqa: E402
+import assistant  # noqa: E402
+import data_browser  # noqa: E402
+import data_store  # noqa: E402
+import filter_index  # noqa: E402
+import query_engine  # noqa: E402
+import synthetic_data  # noqa: E402
+
+EXTRA_QUESTIONS = [
+    "Qual o preço médio por tipo de veículo?",
+    "Quantos carros existem por condição?",
+    "Quantos SUVs pretos existem?",
+    "Preço médio dos carros de 2015 a 2018 por condição",
+    "Qual o preço médio de uma Toyota em excelente estado?",
+    "Quais fabricantes são mais caros?",
+    "Os 10 carros mais baratos com preço acima de 1000",
+    "How many cars with price < 500 by manufacturer?",
+    "Average mileage by fuel for 4wd trucks",
+    "Top 5 most common colors",
+    "Qual modelo tem a maior variação de preço?",
+    "Existe correlação entre quilometragem e preço?",
+]
+
+
+def make_engine(df):
+    index = filter_index.build_filter_index(df)
+    sort_orders = data_browser.build_sort_orders(df)
+
+    @functools.lru_cache(maxsize=32)
+    def row_ids(filters=(), sort_by=None, ascending=True):
+        return data_browser.row_ids(df, sort_orders, filters, sort_by, ascending, index=index)
+
+    @functools.lru_cache(maxsize=8)
+    def frame_for(filters):
+        return df.take(row_ids(filters)) if filters else df
+
+    @functools.lru_cache(maxsize=16)
+    def cube_for(filters):
+        return aggregates.build_cube(frame_for(filters))
+
+    return query_engine.QueryEngine(df, cube_for, frame_for, row_ids)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=51525)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix='car_query_') as workdir:
+        csv_path = Path(workdir) / 'vehicles_us.csv'
+        synthetic_data.generate(args.rows).to_csv(csv_path, index=False)
+        df = data_store.read_csv_clean(csv_path)
+    engine = make_engine(df)
+    questions = assistant.SUGGESTED_PROMPTS + EXTRA_QUESTIONS
+
+    for question in questions:
+        engine.answer(question)  # primeira passada: monta cubos e frames filtrados
+
+    timings, fallbacks = [], []
+    for question in questions:
+        start = time.perf_counter()
+        answer = engine.answer(question)
+        if answer is None:
+            fallbacks.append(question)
+        else:
+            timings.append(time.perf_counter() - start)
+
+    hits = len(questions) - len(fallbacks)
+    print(f"respondidas sem LLM: {hits}/{len(questions)} ({hits / len(questions):.0%})")
+    print(f"latência (caches quentes): mediana {statistics.median(timings) * 1000:.1f} ms, máx {max(timings) * 1000:.1f} ms")
+    print("encaminhadas ao agente:")
+    for question in fallbacks:
+        print(f"  - {question}")
+
+
+if __name__ == '__main__':
+    main()
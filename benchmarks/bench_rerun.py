@@ -0,0 +1,72 @@
+"""Tempo de rerun ponta a ponta do app (Streamlit AppTest, sem navegador).
+
+Compara um rerun do dashboard com um rerun da aba de chat, ambos com os caches
+vazios, para confirmar que a aba de chat não paga a construção dos
+gráficos.
+
+    python benchmarks/bench_rerun.py --rows 51525 --repeat 5
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / 'benchmarks'))
+
+import streamlit as st  # noqa: E402
+from streamlit.testing.v1 import AppTest  # noqa: E402
+
+import synthetic_data  # noqa: E402
+
+
+def prepare_workdir(rows):
+    """Diretório com um vehicles_us.csv sintético e os prompts do app."""
+    workdir = Path(tempfile.mkdtemp(prefix='car_app_'))
+    synthetic_data.generate(rows).to_csv(workdir / 'vehicles_us.csv', index=False)
+    (workdir / 'prompts').symlink_to(ROOT / 'prompts')
+    return workdir
+
+
+def timed_run(at):
+    start = time.perf_counter()
+    at.run()
+    if at.exception:
+        raise RuntimeError(at.exception[0].value)
+    return time.perf_counter() - start
+
+
+def measure_view(view, repeat):
+    at = AppTest.from_file(str(ROOT / 'app.py'), default_timeout=300)
+    at.run()  # gera o snapshot em disco antes das medições
+    at.session_state['active_view'] = view
+    timings = []
+    for _ in range(repeat):
+        # Caches vazios: as duas abas pagam a leitura do snapshot, mas só o
+        # dashboard deveria pagar agregados e figuras
+        st.cache_resource.clear()
+        timings.append(timed_run(at))
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=51525)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    os.environ.setdefault('ANALISTA_FAKE_LLM', '1')  # chat sem chamadas de rede
+    os.chdir(prepare_workdir(args.rows))
+
+    print(f"{'aba':<10} {'mediana (s)':>12} {'mín (s)':>10}")
+    for view in ['dashboard', 'chat', 'raw']:
+        timings = measure_view(view, args.repeat)
+        print(f"{view:<10} {statistics.median(timings):>12.3f} {min(timings):>10.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""Mede a alocação de memória por rerun: cópias profundas vs visões Copy-on-Write.
+
+Simula o acesso a dados de um rerun (Aba 1 + uma chamada do PythonCodeExecutor)
+e verifica que código do usuário não consegue alterar o frame em cache.
+
+    python benchmarks/bench_rerun_alloc.py --csv vehicles_us.csv
+"""
+import argparse
+import sys
+import tracemalloc
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+import pandas as pd  # noqa: E402
+
+import data_store  # noqa: E402
+
+# Consulta típica enviada pelo agente à ferramenta (somente leitura)
+TOOL_CODE = """
+result = df.groupby('manufacturer', observed=True)['price'].mean()
+"""
+
+# Código que tenta alterar o frame compartilhado
+MUTATING_CODE = """
+df['price'] = 0
+df.drop(columns=['model'], inplace=True)
+df.loc[:, 'odometer'] = -1
+df.sort_values('price', inplace=True)
+print(df['price'].mean())
+"""
+
+
+def rerun_with_copies(car_data):
+    df = car_data.copy()
+    df_display = df.copy()
+    tool_df = car_data.copy()
+    exec(TOOL_CODE, {'df': tool_df, 'pd': pd}, {})
+    return len(df_display)
+
+
+def rerun_with_views(car_data):
+    df = data_store.read_only_view(car_data)
+    df_display = df
+    tool_df = data_store.read_only_view(car_data)
+    exec(TOOL_CODE, {'df': tool_df, 'pd': pd}, {})
+    return len(df_display)
+
+
+def peak_allocation(fn, car_data):
+    tracemalloc.start()
+    fn(car_data)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--csv', default=str(ROOT / 'vehicles_us.csv'))
+    args = parser.parse_args()
+
+    car_data = data_store.read_csv_clean(args.csv)
+    snapshot = car_data.copy()
+
+    for name, fn in [('cópias', rerun_with_copies), ('visões CoW', rerun_with_views)]:
+        peak = peak_allocation(fn, car_data)
+        print(f"{name:<12} pico alocado por rerun: {peak / 1024 / 1024:8.2f} MB")
+
+    exec(MUTATING_CODE, {'df': data_store.read_only_view(car_data), 'pd': pd}, {})
+    pd.testing.assert_frame_equal(car_data, snapshot)
+    print("OK: car_data intacto após o código da ferramenta")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""Verifica o sandbox do PythonCodeExecutor: concorrência, isolamento e limites.
+
+    python benchmarks/bench_sandbox.py --csv vehicles_us.csv
+"""
+import argparse
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+import data_store  # noqa: E402
+import sandbox  # noqa: E402
+
+QUERY = "print(df.groupby('manufacturer', observed=True)['price'].mean().round(2).to_string())"
+SLOW_QUERY = "import time; time.sleep(1); print(len(df))"
+
+
+def check(label, condition):
+    print(f"{'OK ' if condition else 'FALHOU'} {label}")
+    return condition
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--csv', default=str(ROOT / 'vehicles_us.csv'))
+    parser.add_argument('--workers', type=int, default=2)
+    args = parser.parse_args()
+
+    snapshot_dir = tempfile.mkdtemp(prefix='car_snapshot_')
+    car_data = data_store.load_car_data(args.csv, snapshot_dir)
+
+    pool = sandbox.SandboxPool(args.csv, snapshot_dir, size=args.workers, timeout=3, cpu_seconds=2, memory_mb=512)
+    ok = True
+    try:
+        start = time.perf_counter()
+        ok &= check("primeira chamada (inclui aquecimento)", 'ford' in pool.run(QUERY))
+        print(f"    {time.perf_counter() - start:.2f}s")
+
+        start = time.perf_counter()
+        pool.run(QUERY)
+        print(f"    chamada aquecida: {(time.perf_counter() - start) * 1000:.1f} ms")
+
+        # Concorrência: N chamadas lentas em N workers levam ~1 chamada, não N
+        start = time.perf_counter()
+        with ThreadPoolExecutor(args.workers) as executor:
+            outputs = list(executor.map(pool.run, [SLOW_QUERY] * args.workers))
+        elapsed = time.perf_counter() - start
+        ok &= check(f"{args.workers} chamadas concorrentes em {elapsed:.2f}s", elapsed < 1.9 and all(o.strip() == str(len(car_data)) for o in outputs))
+
+        # stdout isolado: cada chamada recebe só a própria saída
+        with ThreadPoolExecutor(args.workers) as executor:
+            outputs = list(executor.map(pool.run, [f"print({i})" for i in range(8)]))
+        ok &= check("saídas não se misturam entre chamadas", [o.strip() for o in outputs] == [str(i) for i in range(8)])
+
+        ok &= check("escrita no df não altera o dataset", pool.run("df['price'] = 0; print('x')") == 'x\n' and pool.run("print(df['price'].sum())").strip() == str(car_data['price'].sum()))
+
+        ok &= check("filtro aplicado no worker", pool.run("print(len(df))", (('manufacturer', 'in', ('ford',)),)).strip() == str((car_data['manufacturer'] == 'ford').sum()))
+
+        start = time.perf_counter()
+        ok &= check("tempo limite interrompe a execução", 'tempo limite' in pool.run("import time; time.sleep(30)"))
+        ok &= check("teto de memória", 'memória' in pool.run("x = bytearray(4 * 1024 ** 3); print(len(x))"))
+        ok &= check("pool se recupera após falhas", 'ford' in pool.run(QUERY))
+        print(f"    testes de limite: {time.perf_counter() - start:.2f}s")
+    finally:
+        pool.close()
+
+    # Limite de CPU antes do tempo de parede: o worker é encerrado por SIGXCPU
+    cpu_pool = sandbox.SandboxPool(args.csv, snapshot_dir, size=1, timeout=30, cpu_seconds=1)
+    try:
+        start = time.perf_counter()
+        ok &= check("limite de CPU encerra o loop", 'limites de CPU' in cpu_pool.run("while True: pass"))
+        print(f"    {time.perf_counter() - start:.2f}s")
+    finally:
+        cpu_pool.close()
+
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+"""Teste de carga do chat: várias sessões chamando o modelo ao mesmo tempo.
+
+Usa o modelo local de `fake_llm` atrás de um `FakeProvider` que aceita poucas
+requisições simultâneas (e por segundo) e responde 429 acima disso, como a
+API do Gemini. Compara as chamadas diretas (comportamento antigo: cada sessão
+chama o agente na sua thread) com a fila de `llm_scheduler`. Parte das
+sessões faz a mesma pergunta, para exercitar a deduplicação.
+
+    python benchmarks/bench_scheduler.py --sessions 12 --questions 3
+"""
+import argparse
+import statistics
+import sys
+import threading
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from langchain.agents import create_agent  # noqa: E402
+from langchain.tools import tool  # noqa: E402
+
+import assistant  # noqa: E402
+import fake_llm  # noqa: E402
+import llm_scheduler  # noqa: E402
+
+QUESTIONS = [
+    "Qual o preço médio por fabricante?",
+    "Qual a quilometragem média por condição?",
+    "Quais modelos aparecem mais?",
+    "Qual a cor mais comum?",
+]
+
+
+@tool
+def PythonCodeExecutor(code: str) -> str:
+    """Stub da ferramenta do app (resposta imediata)."""
+    return "| fabricante | preço |\n| :--- | ---: |\n| ford | 15000.00 |"
+
+
+def question_for(session, turn, shared):
+    # As `shared` primeiras sessões fazem as mesmas perguntas, na mesma ordem
+    if session < shared:
+        return QUESTIONS[turn % len(QUESTIONS)]
+    return f"{QUESTIONS[(session + turn) % len(QUESTIONS)]} (sessão {session})"
+
+
+def run_load(ask, sessions, questions, shared):
+    """Cada sessão faz `questions` perguntas em sequência; devolve latências e falhas."""
+    latencies, failures = [], []
+    lock = threading.Lock()
+
+    def session_loop(session):
+        for turn in range(questions):
+            messages = [{'role': 'user', 'content': question_for(session, turn, shared)}]
+            start = time.perf_counter()
+            try:
+                ask(session, messages)
+            except Exception as error:
+                with lock:
+                    failures.append(error)
+                continue
+            with lock:
+                latencies.append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=session_loop, args=(s,)) for s in range(sessions)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, failures, time.perf_counter() - start
+
+
+def report(name, latencies, failures, wall, provider, extra=''):
+    if latencies:
+        ordered = sorted(latencies)
+        p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+        timing = f"mediana {statistics.median(ordered):.2f} s, p95 {p95:.2f} s"
+    else:
+        timing = "sem respostas"
+    print(
+        f"{name:<9} ok {len(latencies):>3}  falhas {len(failures):>3}  {timing}  total {wall:.1f} s  "
+        f"provedor: {provider.accepted} aceitas, {provider.rejected} com 429, máx. {provider.max_in_flight} simultâneas{extra}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sessions', type=int, default=12)
+    parser.add_argument('--questions', type=int, default=3, help="perguntas por sessão")
+    parser.add_argument('--shared', type=int, default=4, help="sessões que fazem as mesmas perguntas")
+    parser.add_argument('--latency', type=float, default=0.3, help="segundos por chamada ao modelo")
+    parser.add_argument('--provider-concurrency', type=int, default=3)
+    parser.add_argument('--provider-rps', type=float, default=8)
+    parser.add_argument('--concurrency', type=int, default=llm_scheduler.MAX_CONCURRENT_CALLS)
+    args = parser.parse_args()
+
+    system_prompt = (ROOT / 'prompts' / 'system.txt').read_text()
+
+    def make_agent():
+        provider = fake_llm.FakeProvider(max_concurrent=args.provider_concurrency, requests_per_second=args.provider_rps)
+        model = fake_llm.FakeToolCallingModel(latency=args.latency, provider=provider)
+        return provider, create_agent(model=model, tools=[PythonCodeExecutor], system_prompt=system_prompt)
+
+    print(f"{args.sessions} sessões x {args.questions} perguntas; provedor: {args.provider_concurrency} simultâneas, {args.provider_rps:g}/s")
+
+    provider, agent = make_agent()
+    direct = run_load(lambda session, messages: agent.invoke({"messages": messages}), args.sessions, args.questions, args.shared)
+    report("direto", *direct, provider)
+
+    provider, agent = make_agent()
+    scheduler = llm_scheduler.Scheduler(max_concurrency=args.concurrency, backoff_base=0.2, backoff_max=2.0)
+
+    def ask(session, messages):
+        key = repr(messages)
+        return scheduler.submit(session, key, lambda: assistant.invoke_events(agent, messages)).result()
+
+    queued = run_load(ask, args.sessions, args.questions, args.shared)
+    stats = scheduler.stats()
+    report("fila", *queued, provider, f"; {stats['retries']} novas tentativas, {stats['deduplicated']} deduplicadas")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""Tempo de importação e cold start do app (primeira renderização do dashboard).
+
+Cada medição roda em um processo Python novo, como um container acordando:
+- importação isolada de cada grupo de dependências do app;
+- primeira renderização do dashboard (Streamlit AppTest) com o stack de IA
+  importado no topo (comportamento antigo, simulado importando-o antes do
+  app) e sob demanda (atual), e se o LangChain foi carregado até ali.
+
+    python benchmarks/bench_startup.py --rows 51525 --repeat 3
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / 'benchmarks'))
+
+import synthetic_data  # noqa: E402
+
+AI_STACK_IMPORTS = """
+from langchain_google_genai import ChatGoogleGenerativeAI
+from langchain.agents import create_agent
+from langchain.tools import tool
+"""
+
+IMPORT_GROUPS = {
+    'streamlit': "import streamlit",
+    'pandas': "import pandas",
+    'plotly': "import plotly.express",
+    'módulos do app': "import aggregates, assistant, charts, chat_context, data_browser, data_store, filter_index, llm_scheduler, query_engine, sandbox, tool_cache",
+    'LangChain + Gemini': AI_STACK_IMPORTS,
+}
+
+IMPORT_CHILD = """
+import sys, time
+sys.path.insert(0, {root!r})
+t0 = time.perf_counter()
+{body}
+print(time.perf_counter() - t0)
+"""
+
+RENDER_CHILD = """
+import sys, time
+t0 = time.perf_counter()
+{preload}
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file({app!r}, default_timeout=300)
+at.run()
+if at.exception:
+    raise SystemExit(at.exception[0].value)
+print(time.perf_counter() - t0, 'langchain' in sys.modules)
+"""
+
+
+def run_child(code, cwd):
+    # Sem chave e sem modelo local: nada dispara o aquecimento do agente
+    env = {k: v for k, v in os.environ.items() if k not in ('GOOGLE_API_KEY', 'ANALISTA_FAKE_LLM')}
+    out = subprocess.run([sys.executable, '-c', code], check=True, capture_output=True, text=True, cwd=cwd, env=env)
+    return out.stdout.strip().splitlines()[-1].split()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=51525)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix='car_startup_') as workdir:
+        synthetic_data.generate(args.rows).to_csv(Path(workdir) / 'vehicles_us.csv', index=False)
+        (Path(workdir) / 'prompts').symlink_to(ROOT / 'prompts')
+
+        print(f"{'importação':<22} {'mediana (s)':>12}")
+        for name, body in IMPORT_GROUPS.items():
+            code = IMPORT_CHILD.format(root=str(ROOT), body=body)
+            timings = [float(run_child(code, workdir)[0]) for _ in range(args.repeat)]
+            print(f"{name:<22} {statistics.median(timings):>12.2f}")
+
+        # Primeira execução gera o snapshot em disco; não entra na medição
+        run_child(RENDER_CHILD.format(preload='', app=str(ROOT / 'app.py')), workdir)
+
+        print(f"\n{'primeira renderização':<22} {'mediana (s)':>12} {'LangChain carregado':>20}")
+        for name, preload in [('importação no topo', AI_STACK_IMPORTS), ('sob demanda', '')]:
+            code = RENDER_CHILD.format(preload=preload, app=str(ROOT / 'app.py'))
+            results = [run_child(code, workdir) for _ in range(args.repeat)]
+            median = statistics.median(float(seconds) for seconds, _ in results)
+            print(f"{name:<22} {median:>12.2f} {'sim' if results[-1][1] == 'True' else 'não':>20}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,232 @@
+"""Construção das figuras Plotly da Aba 1.
+
+Os gráficos de contagem recebem o cubo de `aggregates` e usam `histfunc='sum'`
+sobre a coluna `count`, mantendo o visual dos histogramas originais sem enviar
+as linhas brutas. O box plot e a comparação de preços são desenhados a partir
+dos resumos de preço (estatísticas e faixas pré-calculadas), e a depreciação
+de uma amostra limitada de pontos com retas OLS calculadas sobre todas as linhas.
+"""
+import numpy as np
+import plotly.express as px
+import plotly.graph_objects as go
+
+import aggregates
+
+CONDITION_ORDER = ['new', 'excellent', 'good', 'fair', 'salvage', 'other']
+
+
+# --- Gráficos a partir do cubo ---
+
+def type_by_manufacturer(cube):
+    df_type_manufacturer = aggregates.cube_slice(cube, ['manufacturer', 'type'])
+    return px.bar(
+        df_type_manufacturer,
+        x="manufacturer",
+        y="count",
+        color="type",
+        title="Distribuição de Tipos de Veículos (Type) por Fabricante"
+    )
+
+
+def condition_by_year(cube):
+    df_condition_year = aggregates.cube_slice(cube, ['model_year', 'condition'])
+    fig = px.histogram(
+        df_condition_year,
+        x="model_year",
+        y="count",
+        color="condition",
+        title="Histograma de Condição vs. Ano do Modelo",
+        barmode="group",
+        histfunc='sum'
+    )
+    fig.update_layout(yaxis_title="count")
+    return fig
+
+
+def density_heatmap(cube):
+    df_density = aggregates.cube_slice(cube, ['model_year', 'condition'])
+    fig = px.density_heatmap(
+        df_density,
+        x="model_year",
+        y="condition",
+        z="count",
+        histfunc='sum',
+        title="Densidade de Anúncios por Ano do Modelo e Condição",
+        text_auto=True # Exibe o valor da contagem em cada célula
+    )
+    fig.update_layout(xaxis_title="Ano do Modelo", yaxis_title="Condição", coloraxis_colorbar_title="count")
+    return fig
+
+
+def type_distribution(cube):
+    df_type_count = aggregates.cube_slice(cube, 'type').sort_values('count', ascending=False)
+    df_type_count.columns = ['Tipo de Veículo', 'Contagem']
+    return px.bar(
+        df_type_count,
+        x='Tipo de Veículo',
+        y='Contagem',
+        color='Tipo de Veículo',
+        title='Contagem de Anúncios por Tipo de Veículo'
+    )
+
+
+def fuel_transmission(cube):
+    df_fuel_trans = aggregates.cube_slice(cube, ['fuel', 'transmission'])
+    fig = px.histogram(
+        df_fuel_trans,
+        x='fuel',
+        y='count',
+        color='transmission',
+        barmode='group',
+        histfunc='sum',
+        title='Distribuição de Transmissão por Tipo de Combustível',
+        height=400
+    )
+    fig.update_layout(xaxis_title="Tipo de Combustível", yaxis_title="Contagem")
+    return fig
+
+
+# --- Gráficos a partir dos resumos de preço ---
+
+def price_comparison(summaries, manufacturer1, manufacturer2, normalize, bin_mode='adaptive'):
+    edges, histograms = aggregates.price_histogram(
+        summaries, [manufacturer1, manufacturer2], bin_mode=bin_mode
+    )
+    widths = np.diff(edges)
+    centers = edges[:-1] + widths / 2
+
+    fig = go.Figure()
+    colors = px.colors.qualitative.Plotly
+    for i, manufacturer in enumerate(dict.fromkeys([manufacturer1, manufacturer2])):
+        counts = histograms.get(manufacturer, np.zeros(len(widths), dtype=int))
+        # Mesmo cálculo do histnorm='probability density' do Plotly
+        y = counts / (counts.sum() * widths) if normalize and counts.sum() else counts
+        fig.add_trace(go.Bar(
+            x=centers,
+            y=y,
+            width=widths,
+            name=manufacturer,
+            marker_color=colors[i % len(colors)],
+            opacity=0.75,
+        ))
+
+    fig.update_layout(
+        title=f"Distribuição de Preços: {manufacturer1} vs. {manufacturer2}",
+        barmode="overlay",
+        bargap=0,
+        legend_title_text="manufacturer",
+        xaxis_title="Preço",
+        yaxis_title="Contagem" if not normalize else "Densidade de Probabilidade"
+    )
+    return fig
+
+
+def price_by_condition(summaries):
+    box = summaries['box']
+    # Garante que a ordem da condição seja lógica (opcional, mas recomendado)
+    order = [c for c in CONDITION_ORDER if c in box.index] + [c for c in box.index if c not in CONDITION_ORDER]
+
+    fig = go.Figure()
+    colors = px.colors.qualitative.Plotly
+    for i, condition in enumerate(order):
+        stats = box.loc[condition]
+        color = colors[i % len(colors)]
+        fig.add_trace(go.Box(
+            x=[condition],
+            q1=[stats['q1']],
+            median=[stats['median']],
+            q3=[stats['q3']],
+            lowerfence=[stats['lowerfence']],
+            upperfence=[stats['upperfence']],
+            mean=[stats['mean']],
+            name=condition,
+            marker_color=color,
+        ))
+        # Outliers (amostrados no resumo) como pontos, como no px.box
+        fig.add_trace(go.Scatter(
+            x=[condition] * len(stats['outliers']),
+            y=stats['outliers'],
+            mode='markers',
+            marker=dict(color=color, size=4),
+            name=condition,
+            showlegend=False,
+            hoverinfo='y',
+        ))
+
+    fig.update_layout(
+        title='Distribuição de Preços por Condição do Veículo (Identificação de Outliers)',
+        legend_title_text="condition",
+        xaxis=dict(title="Condição", categoryorder='array', categoryarray=order),
+        yaxis_title="Preço"
+    )
+    return fig
+
+
+# --- Depreciação (amostra WebGL + OLS sobre todas as linhas) ---
+
+def depreciation_scatter(summary, mode='points'):
+    ols = summary['ols']
+    types = list(ols.index)
+    colors = px.colors.qualitative.Plotly
+    color_map = {t: colors[i % len(colors)] for i, t in enumerate(types)}
+
+    if mode == 'density':
+        density = summary['density']
+        x_edges, y_edges = density['x_edges'], density['y_edges']
+        fig = go.Figure(go.Heatmap(
+            x=(x_edges[:-1] + x_edges[1:]) / 2,
+            y=(y_edges[:-1] + y_edges[1:]) / 2,
+            # Células vazias ficam transparentes
+            z=np.where(density['counts'] > 0, density['counts'], np.nan).T,
+            colorscale='Blues',
+            colorbar_title='count',
+        ))
+        fig.update_layout(title='Depreciação vs. Quilometragem por Tipo de Veículo', height=600)
+    else:
+        fig = px.scatter(
+            summary['sample'],
+            x='odometer',
+            y='price',
+            color='type',
+            title='Depreciação vs. Quilometragem por Tipo de Veículo',
+            opacity=0.6,
+            render_mode='webgl',
+            color_discrete_map=color_map,
+            category_orders={'type': types},
+            height=600
+        )
+
+    # Linha de Regressão de Mínimos Quadrados Ordinários (OLS), ajustada em todas as linhas
+    for vehicle_type, fit in ols.dropna(subset=['slope']).iterrows():
+        x_line = np.array([fit['x_min'], fit['x_max']])
+        fig.add_trace(go.Scattergl(
+            x=x_line,
+            y=fit['intercept'] + fit['slope'] * x_line,
+            mode='lines',
+            line=dict(color=color_map[vehicle_type]),
+            name=f"{vehicle_type} (OLS)",
+            legendgroup=vehicle_type,
+            showlegend=mode == 'density',
+            hovertemplate=f"{vehicle_type}<br>preço = {fit['intercept']:.0f} + {fit['slope']:.4f} × km<extra></extra>",
+        ))
+
+    fig.update_layout(xaxis_title="Quilometragem (Odometer)", yaxis_title="Preço")
+    return fig
+
+
+# id do gráfico -> (função, fonte dos dados: 'cube', 'summaries' ou 'depreciation')
+CHARTS = {
+    'type_by_manufacturer': (type_by_manufacturer, 'cube'),
+    'condition_by_year': (condition_by_year, 'cube'),
+    'price_comparison': (price_comparison, 'summaries'),
+    'price_by_condition': (price_by_condition, 'summaries'),
+    'depreciation_scatter': (depreciation_scatter, 'depreciation'),
+    'density_heatmap': (density_heatmap, 'cube'),
+    'type_distribution': (type_distribution, 'cube'),
+    'fuel_transmission': (fuel_transmission, 'cube'),
+}
+
+
+def payload_size(fig):
+    """Tamanho (bytes) do JSON da figura enviado ao navegador."""
+    return len(fig.to_json())
@@ -0,0 +1,135 @@
+"""Contexto limitado da conversa enviado ao agente a cada turno.
+
+O histórico completo (`st.session_state.chat_messages_executor`) continua
+sendo exibido, mas o agente recebe só:
+- as últimas `recent_turns` trocas literalmente, sem as tabelas markdown
+  grandes das respostas antigas (trocadas por uma referência com colunas e
+  número de linhas; só a resposta mais recente mantém as tabelas, para
+  perguntas de continuação);
+- um resumo extrativo das trocas anteriores (pergunta e primeira linha da
+  resposta), também limitado, prefixado à primeira mensagem mantida.
+
+Se o total estimado passar de `budget_tokens`, mais trocas vão para o resumo.
+Assim o prompt por turno fica aproximadamente constante em sessões longas.
+"""
+import re
+
+CONTEXT_TOKEN_BUDGET = 3000
+RECENT_TURNS = 3
+SUMMARY_MAX_TURNS = 10
+SUMMARY_LINE_CHARS = 160
+TABLE_MAX_ROWS = 5          # tabelas maiores que isso saem do histórico antigo
+
+_TABLE = re.compile(r"(?:^[ \t]*\|.*\|[ \t]*(?:\n|$))+", re.MULTILINE)
+
+
+def estimate_tokens(text):
+    """Estimativa grosseira (4 caracteres por token), suficiente para o orçamento."""
+    return len(text) // 4
+
+
+def strip_tables(text, turn_number):
+    """Troca tabelas markdown grandes por uma referência; devolve (texto, nº de tabelas)."""
+    dropped = 0
+
+    def replace(match):
+        nonlocal dropped
+        lines = match.group(0).strip().splitlines()
+        n_rows = max(0, len(lines) - 2)  # cabeçalho e separador
+        if n_rows <= TABLE_MAX_ROWS:
+            return match.group(0)
+        dropped += 1
+        columns = ', '.join(c.strip() for c in lines[0].strip().strip('|').split('|'))
+        return f"[tabela omitida da resposta {turn_number}: {n_rows} linhas; colunas: {columns}]\n"
+
+    return _TABLE.sub(replace, text), dropped
+
+
+def _split_turns(history):
+    """Agrupa as mensagens em trocas, cada uma começando por uma pergunta."""
+    turns = []
+    for message in history:
+        if message['role'] == 'user' or not turns:
+            turns.append([])
+        turns[-1].append(message)
+    return turns
+
+
+def _shorten(text, limit=SUMMARY_LINE_CHARS):
+    text = ' '.join(text.split())
+    return text if len(text) <= limit else text[:limit - 1].rstrip() + '…'
+
+
+def summarize(turns, first_number=1):
+    """Resumo extrativo das trocas: uma linha por pergunta/resposta (as mais recentes)."""
+    lines = []
+    for number, turn in enumerate(turns, start=first_number):
+        question = next((m['content'] for m in turn if m['role'] == 'user'), '')
+        answer = next((m['content'] for m in turn if m['role'] == 'assistant'), '')
+        answer, _ = strip_tables(answer, number)
+        first_line = next((line for line in answer.splitlines() if line.strip()), '(sem resposta)')
+        lines.append(f"{number}. Pergunta: {_shorten(question)} → Resposta: {_shorten(first_line)}")
+
+    omitted = len(lines) - SUMMARY_MAX_TURNS
+    if omitted > 0:
+        lines = [f"({omitted} trocas anteriores omitidas)"] + lines[omitted:]
+    return "\n".join(lines)
+
+
+def build_context(history, system_prompt='', budget_tokens=CONTEXT_TOKEN_BUDGET, recent_turns=RECENT_TURNS):
+    """Mensagens a enviar ao agente e um relatório do contexto montado.
+
+    `history` é a lista de {'role', 'content'} da sessão, terminando na
+    pergunta atual. O relatório traz os tokens estimados do prompt (system
+    prompt incluído), as trocas mantidas/resumidas e as tabelas omitidas.
+    """
+    turns = _split_turns(history)
+    current, previous = turns[-1], turns[:-1]
+    n_recent = min(recent_turns, len(previous))
+
+    while True:
+        old, recent = previous[:len(previous) - n_recent], previous[len(previous) - n_recent:]
+        messages, tables_dropped = [], 0
+        for i, turn in enumerate(recent):
+            number = len(old) + i + 1
+            keep_tables = i == len(recent) - 1
+            for message in turn:
+                content = message['content']
+                if message['role'] == 'assistant' and not keep_tables:
+                    content, dropped = strip_tables(content, number)
+                    tables_dropped += dropped
+                messages.append({'role': message['role'], 'content': content})
+        messages += [dict(message) for message in current]
+
+        if old:
+            summary = summarize(old)
+            messages[0]['content'] = f"[Resumo da conversa anterior]\n{summary}\n\n{messages[0]['content']}"
+
+        prompt_tokens = estimate_tokens(system_prompt) + sum(estimate_tokens(m['content']) for m in messages)
+        if prompt_tokens <= budget_tokens or n_recent == 0:
+            break
+        n_recent -= 1
+
+    report = {
+        'prompt_tokens': prompt_tokens,
+        'history_tokens': sum(estimate_tokens(m['content']) for m in history),
+        'recent_turns': len(recent),
+        'summarized_turns': len(old),
+        'tables_dropped': tables_dropped,
+    }
+    return messages, report
+
+
+def usage_tokens(messages, field='input_tokens'):
+    """Tokens informados pelo modelo em `field` (soma das chamadas do turno), ou None."""
+    totals = [
+        m.usage_metadata.get(field, 0)
+        for m in messages
+        if getattr(m, 'usage_metadata', None)
+    ]
+    return sum(totals) if totals else None
+
+
+def usage_input_tokens(messages):
+    """Tokens de entrada informados pelo modelo (soma das chamadas do turno), ou None."""
+    return usage_tokens(messages, 'input_tokens')
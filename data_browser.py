@@ -0,0 +1,116 @@
+"""Navegação paginada de `car_data` no servidor.
+
+Apenas a página visível é serializada para o navegador. As ordenações de cada
+coluna são calculadas uma vez por versão do dataset; aplicar filtro/ordenação
+produz um vetor de posições de linha (custo vetorizado, sem reordenar o
+frame), e virar a página é só um recorte desse vetor.
+
+Filtros são tuplas (hasheáveis, para servir de chave de cache):
+    ('manufacturer', 'in', ('ford', 'toyota'))
+    ('price', 'range', (500, 20000))
+"""
+import numpy as np
+
+import filter_index
+
+
+def make_filters(selected=None, ranges=None):
+    """Monta a tupla de filtros a partir dos widgets.
+
+    `selected`: {coluna: valores escolhidos} (lista vazia = sem filtro).
+    `ranges`: {coluna: ((mín, máx) escolhidos, (mín, máx) do dataset)}; a faixa
+    só vira filtro quando difere da faixa completa.
+    """
+    filters = tuple(
+        (column, 'in', tuple(values))
+        for column, values in (selected or {}).items()
+        if values
+    )
+    filters += tuple(
+        (column, 'range', tuple(chosen))
+        for column, (chosen, full) in (ranges or {}).items()
+        if tuple(chosen) != tuple(full)
+    )
+    return filters
+
+
+def build_sort_orders(df):
+    """Posições das linhas em ordem crescente de cada coluna (ausentes no fim)."""
+    positions = df.reset_index(drop=True)
+    return {
+        column: positions[column].sort_values(kind='stable', na_position='last').index.to_numpy()
+        for column in df.columns
+    }
+
+
+def _sort_keys(values):
+    """Chave numérica com a mesma ordem de `sort_values` (ausentes como NaN, no fim)."""
+    if values.dtype == 'category':
+        codes = values.cat.codes.to_numpy()
+        return np.where(codes >= 0, codes, np.nan)
+    return values.to_numpy(dtype='float64', na_value=np.nan)
+
+
+def extend_sort_orders(sort_orders, df, start):
+    """Ordenações de `df` a partir das de `df[:start]`, sem alterar as originais.
+
+    Só as linhas novas são ordenadas; cada uma entra na ordem existente por
+    busca binária, depois das linhas antigas com o mesmo valor (a mesma ordem
+    do `sort_values` estável sobre o frame inteiro).
+    """
+    positions = np.arange(start, len(df))
+    extended = {}
+    for column, order in sort_orders.items():
+        keys = _sort_keys(df[column])
+        new_order = positions[np.argsort(keys[start:], kind='stable')]
+        at = np.searchsorted(keys[order], keys[new_order], side='right')
+        extended[column] = np.insert(order, at, new_order)
+    return extended
+
+
+def filter_mask(df, filters, index=None):
+    """Máscara dos filtros; os suportados por `index` usam o índice invertido."""
+    if index is not None:
+        indexed = [f for f in filters if filter_index.supports(index, f)]
+        filters = [f for f in filters if not filter_index.supports(index, f)]
+        mask = filter_index.bitmap(index, indexed)
+    else:
+        mask = np.ones(len(df), dtype=bool)
+
+    for column, op, value in filters:
+        values = df[column]
+        if op == 'in':
+            mask &= values.isin(value).to_numpy()
+        elif op == 'range':
+            low, high = value
+            mask &= values.between(low, high).fillna(False).to_numpy(dtype=bool)
+        else:
+            raise ValueError(f"Operador de filtro desconhecido: {op}")
+    return mask
+
+
+def row_ids(df, sort_orders, filters=(), sort_by=None, ascending=True, index=None):
+    """Posições das linhas que passam nos filtros, na ordem pedida."""
+    if sort_by is None:
+        order = np.arange(len(df))
+    else:
+        order = sort_orders[sort_by]
+        if not ascending:
+            # Inverte só a parte não nula: ausentes continuam no fim
+            n_valid = int(df[sort_by].notna().sum())
+            order = np.concatenate([order[:n_valid][::-1], order[n_valid:]])
+
+    if not filters:
+        return order
+    mask = filter_mask(df, filters, index)
+    return order[mask[order]]
+
+
+def page(df, ids, page_number, page_size):
+    """Linhas da página `page_number` (começando em 1) do vetor `ids`."""
+    start = (page_number - 1) * page_size
+    return df.take(ids[start:start + page_size])
+
+
+def page_count(n_rows, page_size):
+    return max(1, -(-n_rows // page_size))
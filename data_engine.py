@@ -0,0 +1,549 @@
+"""Backends de consulta: agregados da Aba 1, paginação e ferramenta SQL do chat.
+
+- `PandasEngine` (padrão): o dataset inteiro em um DataFrame (snapshot Arrow
+  de `data_store`); os agregados vêm de `aggregates` sobre o frame filtrado.
+- `DuckDBEngine`: arquivos Parquet consultados pelo DuckDB embarcado, sem
+  carregar o dataset na memória. Filtros e colunas usadas descem até a leitura
+  dos arquivos (predicate/projection pushdown, com as estatísticas de cada row
+  group), a varredura usa todas as threads e operadores que passam do
+  `memory_limit` fazem spill em disco. Serve para arquivos de anúncios de
+  vários anos que não cabem na memória.
+
+Os dois expõem a mesma interface (version, n_rows, columns, categories,
+value_range, count, page, os três `build_*` e `build_partition_cubes`, usado
+pela ingestão particionada), e os agregados têm o formato
+dos de `aggregates`, então charts.py não muda. Filtros seguem o formato de
+`data_browser`. Só o DuckDBEngine tem `sql()`, usada pelo SQLQueryExecutor.
+"""
+import glob
+import hashlib
+import json
+import numbers
+import os
+import threading
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import aggregates
+import data_browser
+import data_store
+
+try:
+    import duckdb
+
+    DUCKDB_DISPONIVEL = True
+except ImportError:
+    DUCKDB_DISPONIVEL = False
+
+BACKENDS = ('pandas', 'duckdb')
+DEFAULT_BACKEND = 'pandas'
+
+SQL_TABLE = 'cars'            # nome da tabela nas consultas do agente
+SQL_MAX_ROWS = 200            # linhas devolvidas ao agente por consulta
+SQL_TIMEOUT_SECONDS = 30
+
+_FULL_VIEW = 'cars_all'       # todas as linhas, sem o filtro global
+
+# Mesma limpeza de `data_store.read_csv_clean`, em SQL (streaming, fora da memória)
+_CLEAN_CSV_SQL = """
+SELECT
+    CAST(price AS INTEGER) AS price,
+    CAST(model_year AS SMALLINT) AS model_year,
+    model,
+    condition,
+    CAST(cylinders AS FLOAT) AS cylinders,
+    fuel,
+    CAST(odometer AS FLOAT) AS odometer,
+    transmission,
+    type,
+    paint_color,
+    coalesce(is_4wd = 1, false) AS is_4wd,
+    CAST(date_posted AS VARCHAR) AS date_posted,
+    CAST(days_listed AS SMALLINT) AS days_listed,
+    coalesce(nullif(regexp_extract(model, '^\\s*(\\S+)', 1), ''), 'Outros') AS manufacturer
+FROM read_csv({source}, header = true)
+WHERE {required}
+"""
+
+
+# --- Backend pandas ---
+
+class PandasEngine:
+    """Backend padrão: agregados de `aggregates` sobre o DataFrame filtrado.
+
+    `row_ids_for(filters, sort_by, ascending)` e `frame_for(filters)` permitem
+    que o app injete os getters com cache (índice invertido, frames filtrados);
+    sem eles, tudo é calculado a cada chamada.
+    """
+
+    name = 'pandas'
+
+    def __init__(self, df, row_ids_for=None, frame_for=None):
+        self.frame = df
+        self.version = data_store.dataset_version(df)
+        self._row_ids_for = row_ids_for or self._row_ids
+        self._frame_for = frame_for or self._frame
+        self._sort_orders = None
+
+    @property
+    def n_rows(self):
+        return len(self.frame)
+
+    @property
+    def columns(self):
+        return list(self.frame.columns)
+
+    def categories(self, column):
+        return list(self.frame[column].cat.categories)
+
+    def value_range(self, column):
+        return self.frame[column].min(), self.frame[column].max()
+
+    def count(self, filters=()):
+        return len(self._row_ids_for(filters, None, True))
+
+    def page(self, filters=(), sort_by=None, ascending=True, page_number=1, page_size=50):
+        ids = self._row_ids_for(filters, sort_by, ascending)
+        return data_browser.page(self.frame, ids, page_number, page_size)
+
+    def build_cube(self, filters=()):
+        return aggregates.build_cube(self._frame_for(filters))
+
+    def build_partition_cubes(self, column, partitions):
+        # Direto no frame: o cache de frames filtrados fica para o Filtro Global
+        mask = self.frame[column].isin(partitions).to_numpy()
+        frame = self.frame if mask.all() else self.frame[mask]
+        return aggregates.split_cube(aggregates.build_cube(frame, [column]), column, partitions)
+
+    def build_price_summaries(self, filters=()):
+        return aggregates.build_price_summaries(self._frame_for(filters))
+
+    def build_depreciation_summary(self, filters=()):
+        return aggregates.build_depreciation_summary(self._frame_for(filters))
+
+    def _row_ids(self, filters, sort_by, ascending):
+        if self._sort_orders is None:
+            self._sort_orders = data_browser.build_sort_orders(self.frame)
+        return data_browser.row_ids(self.frame, self._sort_orders, filters, sort_by, ascending)
+
+    def _frame(self, filters):
+        return self.frame.take(self._row_ids(filters, None, True)) if filters else self.frame
+
+
+# --- Backend DuckDB ---
+
+def _quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _literal(value):
+    if isinstance(value, (bool, np.bool_)):
+        return 'TRUE' if value else 'FALSE'
+    if isinstance(value, numbers.Integral):
+        return str(int(value))
+    if isinstance(value, numbers.Real):
+        # Sem o cast, o DuckDB lê o literal como DECIMAL (estoura em multiplicações)
+        return f"{float(value)!r}::DOUBLE"
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def where_clause(filters, columns):
+    """Filtros de `data_browser` como cláusula WHERE (valores validados e escapados)."""
+    clauses = []
+    for column, op, value in filters:
+        if column not in columns:
+            raise ValueError(f"Coluna desconhecida no filtro: {column}")
+        if op == 'in':
+            values = ', '.join(_literal(v) for v in value)
+            clauses.append(f"{_quote(column)} IN ({values})" if value else 'FALSE')
+        elif op == 'range':
+            low, high = value
+            clauses.append(f"{_quote(column)} BETWEEN {_literal(low)} AND {_literal(high)}")
+        else:
+            raise ValueError(f"Operador de filtro desconhecido: {op}")
+    return f" WHERE {' AND '.join(clauses)}" if clauses else ''
+
+
+def build_parquet_snapshot(csv_path=data_store.CSV_PATH, snapshot_dir=data_store.SNAPSHOT_DIR):
+    """Converte o CSV limpo para Parquet pelo próprio DuckDB (em streaming, sem pandas)."""
+    parquet_path = data_store.snapshot_path(csv_path, snapshot_dir, kind='parquet')
+    Path(snapshot_dir).mkdir(parents=True, exist_ok=True)
+    stat = os.stat(csv_path)
+
+    required = ' AND '.join(f"{column} IS NOT NULL" for column in data_store.REQUIRED_COLUMNS)
+    query = _CLEAN_CSV_SQL.format(source=_literal(str(csv_path)), required=required)
+    tmp_path = Path(f"{parquet_path}.tmp")
+    with duckdb.connect() as db:
+        db.execute(f"COPY ({query}) TO {_literal(str(tmp_path))} (FORMAT parquet, COMPRESSION zstd)")
+        rows = db.execute(f"SELECT count(*) FROM read_parquet({_literal(str(tmp_path))})").fetchone()[0]
+    os.replace(tmp_path, parquet_path)
+
+    data_store.write_snapshot_meta(csv_path, snapshot_dir, rows, stat, kind='parquet')
+    return parquet_path
+
+
+def open_duckdb(csv_path=data_store.CSV_PATH, snapshot_dir=data_store.SNAPSHOT_DIR, source=None, version=None, **settings):
+    """DuckDBEngine sobre `source` (glob ou lista de Parquet já limpos) ou sobre o snapshot do CSV.
+
+    `version` substitui a versão calculada (ex.: a do manifesto das partições).
+    `settings` vai para o DuckDBEngine (memory_limit, threads).
+    """
+    if not DUCKDB_DISPONIVEL:
+        raise ImportError("O backend 'duckdb' precisa do pacote duckdb (pip install duckdb).")
+    if source is None:
+        if not Path(csv_path).exists():
+            raise FileNotFoundError(csv_path)
+        if not data_store.snapshot_is_fresh(csv_path, snapshot_dir, kind='parquet'):
+            build_parquet_snapshot(csv_path, snapshot_dir)
+        files = [data_store.snapshot_path(csv_path, snapshot_dir, kind='parquet')]
+        version = data_store.snapshot_version(csv_path, snapshot_dir, kind='parquet')
+    else:
+        files = sorted(map(str, source)) if isinstance(source, (list, tuple)) else sorted(glob.glob(str(source)))
+        if not files:
+            raise FileNotFoundError(source)
+        # Arquivos grandes demais para hash: nome, tamanho e mtime de cada um
+        digest = hashlib.sha256()
+        for path in files:
+            stat = os.stat(path)
+            digest.update(f"{path}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+        version = version or digest.hexdigest()[:16]
+    return DuckDBEngine(files, version, temp_directory=Path(snapshot_dir) / 'duckdb_tmp', **settings)
+
+
+class DuckDBEngine:
+    """Consultas SQL sobre arquivos Parquet, com os agregados no formato de `aggregates`.
+
+    Uma conexão por engine; cada chamada usa um cursor próprio, então a engine
+    pode ser compartilhada entre sessões e threads. Depois de criada, a
+    conexão só lê os arquivos do dataset (acesso externo e configuração
+    travados), o que protege a ferramenta SQL do agente.
+    """
+
+    name = 'duckdb'
+    frame = None
+
+    def __init__(self, files, version, temp_directory=None, memory_limit=None, threads=None):
+        self.files = [str(path) for path in files]
+        self.version = version
+        self._db = duckdb.connect()
+
+        settings = {'autoinstall_known_extensions': False, 'autoload_known_extensions': False}
+        if memory_limit:
+            settings['memory_limit'] = memory_limit
+        if threads:
+            settings['threads'] = threads
+        allowed_directories = []
+        if temp_directory:
+            Path(temp_directory).mkdir(parents=True, exist_ok=True)
+            settings['temp_directory'] = str(temp_directory)
+            allowed_directories.append(str(temp_directory))
+        for name, value in settings.items():
+            self._db.execute(f"SET {name} = {_literal(value)}")
+
+        file_list = '[' + ', '.join(_literal(path) for path in self.files) + ']'
+        self._db.execute(f"CREATE VIEW {_FULL_VIEW} AS SELECT * FROM read_parquet({file_list}, union_by_name = true)")
+        self._db.execute(f"SET allowed_paths = {file_list}")
+        self._db.execute(f"SET allowed_directories = [{', '.join(map(_literal, allowed_directories))}]")
+        self._db.execute("SET enable_external_access = false")
+        self._db.execute("SET lock_configuration = true")
+
+        schema = self._db.execute(f"DESCRIBE {_FULL_VIEW}").fetchall()
+        self.columns = [row[0] for row in schema]
+        self.n_rows = self._db.execute(f"SELECT count(*) FROM {_FULL_VIEW}").fetchone()[0]
+        self._categories = {}
+        self._lock = threading.Lock()
+
+    # --- Consultas ---
+
+    def _query(self, sql):
+        with self._db.cursor() as cursor:
+            return cursor.execute(sql).df()
+
+    def _rows(self, filters):
+        """Subconsulta com as linhas que passam nos filtros."""
+        return f"(SELECT * FROM {_FULL_VIEW}{where_clause(filters, self.columns)})"
+
+    def categories(self, column):
+        """Valores distintos de `column`, ordenados (como as categorias do pandas)."""
+        with self._lock:
+            if column not in self._categories:
+                values = self._query(
+                    f"SELECT DISTINCT {_quote(column)} AS v FROM {_FULL_VIEW} WHERE {_quote(column)} IS NOT NULL ORDER BY v"
+                )['v']
+                self._categories[column] = values.tolist()
+            return self._categories[column]
+
+    def value_range(self, column):
+        row = self._query(f"SELECT min({_quote(column)}) AS low, max({_quote(column)}) AS high FROM {_FULL_VIEW}").iloc[0]
+        return row['low'], row['high']
+
+    def count(self, filters=()):
+        return int(self._query(f"SELECT count(*) AS n FROM {self._rows(filters)}")['n'].iloc[0])
+
+    def page(self, filters=(), sort_by=None, ascending=True, page_number=1, page_size=50):
+        order = ''
+        if sort_by is not None:
+            if sort_by not in self.columns:
+                raise ValueError(f"Coluna desconhecida: {sort_by}")
+            order = f" ORDER BY {_quote(sort_by)} {'ASC' if ascending else 'DESC'} NULLS LAST"
+        start = (page_number - 1) * page_size
+        df = self._query(f"SELECT * FROM {self._rows(filters)}{order} LIMIT {int(page_size)} OFFSET {int(start)}")
+        df.index = pd.RangeIndex(start, start + len(df))
+        return df
+
+    def _as_categories(self, df, columns):
+        for column in columns:
+            df[column] = pd.Categorical(df[column], categories=self.categories(column))
+        return df
+
+    # --- Agregados (mesmo formato de `aggregates`) ---
+
+    def build_cube(self, filters=(), extra_dimensions=()):
+        dimensions = ', '.join(map(_quote, [*extra_dimensions, *aggregates.CUBE_DIMENSIONS]))
+        cube = self._query(f"""
+            SELECT {dimensions},
+                   count(*) AS count,
+                   sum(price)::BIGINT AS price_sum,
+                   coalesce(sum(odometer), 0) AS odometer_sum,
+                   count(odometer) AS odometer_count
+            FROM {self._rows(filters)}
+            GROUP BY ALL
+            ORDER BY ALL
+        """)
+        cube['model_year'] = cube['model_year'].astype('int16')
+        for column in ['count', 'price_sum', 'odometer_count']:
+            cube[column] = cube[column].astype('int64')
+        cube['odometer_sum'] = cube['odometer_sum'].astype('float64')
+        dimensions = [c for c in aggregates.CUBE_DIMENSIONS if c != 'model_year']
+        return self._as_categories(cube, dimensions)
+
+    def build_partition_cubes(self, column, partitions):
+        cube = self.build_cube(((column, 'in', tuple(partitions)),), extra_dimensions=[column])
+        return aggregates.split_cube(cube, column, partitions)
+
+    def build_price_summaries(self, filters=(), n_fine_bins=aggregates.FINE_BINS):
+        rows = self._rows(filters)
+        low, high = self._query(f"SELECT min(price) AS low, max(price) AS high FROM {rows}").iloc[0]
+        edges = np.linspace(low, high, n_fine_bins + 1)
+        scale = n_fine_bins / (high - low) if high > low else 0
+
+        counts = self._query(f"""
+            SELECT manufacturer, condition,
+                   least(greatest(floor((price - {_literal(low)}) * {_literal(scale)}), 0), {n_fine_bins - 1})::INTEGER AS bin,
+                   count(*) AS n
+            FROM {rows}
+            GROUP BY ALL
+        """)
+        counts = (
+            self._as_categories(counts, ['manufacturer', 'condition'])
+            .set_index(['manufacturer', 'condition', 'bin'])['n']
+            .unstack('bin', fill_value=0)
+            .reindex(columns=range(n_fine_bins), fill_value=0)
+        )
+        return {'edges': edges, 'counts': counts, 'box': self._box_stats(rows, 'condition')}
+
+    def _box_stats(self, rows, group_column):
+        """Box plot exato a partir do histograma (grupo, preço).
+
+        quantile_cont manteria todos os preços de cada grupo na memória; o
+        GROUP BY faz spill em disco e devolve só os preços distintos, sobre os
+        quais quartis, cercas e a amostra de outliers de `aggregates._box_stats`
+        são calculados pelas contagens acumuladas.
+        """
+        histogram = self._query(f"""
+            SELECT {_quote(group_column)} AS g, price::DOUBLE AS price, count(*) AS n
+            FROM {rows} WHERE {_quote(group_column)} IS NOT NULL
+            GROUP BY ALL ORDER BY g, price
+        """)
+        records = []
+        for group, part in histogram.groupby('g', sort=True):
+            values, counts = part['price'].to_numpy(), part['n'].to_numpy()
+            cumulative = np.cumsum(counts)
+            n = int(cumulative[-1])
+
+            def at(positions):
+                # Preço na posição (0-based) da lista ordenada com repetições
+                return values[np.searchsorted(cumulative, positions, side='right')]
+
+            # Interpolação linear, como np.quantile
+            positions = (n - 1) * np.array([0.25, 0.5, 0.75])
+            low = np.floor(positions).astype(int)
+            q1, median, q3 = at(low) + (at(np.minimum(low + 1, n - 1)) - at(low)) * (positions - low)
+            iqr = q3 - q1
+            inside = values[(values >= q1 - 1.5 * iqr) & (values <= q3 + 1.5 * iqr)]
+
+            is_outlier = (values < inside.min()) | (values > inside.max())
+            outlier_values, outlier_counts = values[is_outlier], counts[is_outlier]
+            n_outliers = int(outlier_counts.sum())
+            if n_outliers > aggregates.MAX_OUTLIERS_PER_BOX:
+                # Amostra uniforme por posto: preserva a forma da cauda
+                keep = np.linspace(0, n_outliers - 1, aggregates.MAX_OUTLIERS_PER_BOX).round().astype(int)
+                outliers = outlier_values[np.searchsorted(np.cumsum(outlier_counts), keep, side='right')]
+            else:
+                outliers = np.repeat(outlier_values, outlier_counts)
+            records.append({
+                group_column: group,
+                'q1': q1,
+                'median': median,
+                'q3': q3,
+                'lowerfence': inside.min(),
+                'upperfence': inside.max(),
+                'mean': (values * counts).sum() / n,
+                'n': n,
+                'outliers': outliers,
+            })
+        if not records:
+            columns = ['q1', 'median', 'q3', 'lowerfence', 'upperfence', 'mean', 'n', 'outliers']
+            return pd.DataFrame(columns=columns, index=pd.Index([], name=group_column))
+        return pd.DataFrame(records).set_index(group_column)
+
+    def build_depreciation_summary(self, filters=(), point_budget=aggregates.SCATTER_POINT_BUDGET, seed=0):
+        scatter = f"""
+            (SELECT odometer::DOUBLE AS x, price::DOUBLE AS y, type, price, odometer, model, model_year, days_listed, date_posted
+             FROM {self._rows(filters)}
+             WHERE type IS NOT NULL
+               AND odometer < (SELECT quantile_cont(odometer, 0.99) FROM {self._rows(filters)}))
+        """
+        sums = self._query(f"""
+            SELECT type, count(*) AS n, sum(x) AS x, sum(y) AS y, sum(x * x) AS xx, sum(x * y) AS xy,
+                   min(x) AS x_min, max(x) AS x_max, min(y) AS y_min, max(y) AS y_max
+            FROM {scatter} GROUP BY type ORDER BY type
+        """).set_index('type')
+        denominator = sums['n'] * sums['xx'] - sums['x'] ** 2
+        slope = (sums['n'] * sums['xy'] - sums['x'] * sums['y']) / denominator.where(denominator != 0)
+        ols = pd.DataFrame({
+            'slope': slope,
+            'intercept': (sums['y'] - slope * sums['x']) / sums['n'],
+            'x_min': sums['x_min'],
+            'x_max': sums['x_max'],
+            'n': sums['n'],
+        })
+        total_points = int(sums['n'].sum())
+        if not total_points:
+            return {
+                'ols': ols,
+                'sample': pd.DataFrame({'odometer': [], 'price': [], 'type': []}),
+                'density': {'counts': np.zeros((0, 0)), 'x_edges': np.array([]), 'y_edges': np.array([])},
+                'total_points': 0,
+            }
+
+        # Amostra estratificada por tipo: pré-seleção por hash (determinística,
+        # sem ordenar tudo) e corte exato de round(n_tipo * fração) por tipo
+        fraction = min(1.0, point_budget / total_points) if total_points else 1.0
+        prefilter = min(1.0, 2 * fraction)
+        sample = self._query(f"""
+            SELECT odometer, price, type FROM (
+                SELECT *, row_number() OVER (PARTITION BY type ORDER BY h) AS rn
+                FROM (
+                    SELECT odometer, price, type,
+                           hash({int(seed)}, price, odometer, model, model_year, days_listed, date_posted) AS h
+                    FROM {scatter}
+                ) WHERE h % 1000000 < {int(prefilter * 1000000)}
+            ) s JOIN ({_values_sql(sums.reset_index(), ['type', 'n'])}) t USING (type)
+            WHERE rn <= round(t.n * {_literal(fraction)})
+            ORDER BY type
+        """)
+        sample = self._as_categories(sample, ['type'])
+
+        # Grade 2D com as bordas do np.histogram2d (última faixa fechada)
+        bins = aggregates.DENSITY_GRID_BINS
+        x_edges = _histogram_edges(sums['x_min'].min(), sums['x_max'].max(), bins)
+        y_edges = _histogram_edges(sums['y_min'].min(), sums['y_max'].max(), bins)
+        grid = self._query(f"""
+            SELECT {_bin_sql('x', x_edges, bins)} AS bx, {_bin_sql('y', y_edges, bins)} AS by, count(*) AS n
+            FROM {scatter} GROUP BY ALL
+        """)
+        counts = np.zeros((bins, bins))
+        counts[grid['bx'].to_numpy(dtype=int), grid['by'].to_numpy(dtype=int)] = grid['n'].to_numpy()
+        return {
+            'ols': ols,
+            'sample': sample.reset_index(drop=True),
+            'density': {'counts': counts, 'x_edges': x_edges, 'y_edges': y_edges},
+            'total_points': total_points,
+        }
+
+    # --- Ferramenta SQL do agente ---
+
+    def sql(self, query, filters=(), max_rows=SQL_MAX_ROWS, timeout=SQL_TIMEOUT_SECONDS):
+        """Executa um SELECT do agente sobre a tabela `cars` (já com o filtro global).
+
+        Retorna (DataFrame com até `max_rows` linhas, se foi truncado). Só uma
+        instrução SELECT é aceita, e ela só pode ler `cars` (e suas CTEs): a
+        view sem o filtro global e funções como `read_parquet` ignorariam o
+        filtro. Consultas longas são interrompidas após `timeout` segundos.
+        """
+        statements = duckdb.extract_statements(query)
+        if len(statements) != 1 or statements[0].type != duckdb.StatementType.SELECT:
+            raise ValueError("Envie uma única consulta SELECT por chamada.")
+
+        with self._db.cursor() as cursor:
+            tree = json.loads(cursor.execute("SELECT json_serialize_sql(?)", [query]).fetchone()[0])
+            if tree['error']:
+                raise ValueError(tree['error_message'])
+            other_sources = sorted(set(_table_references(tree['statements'])) - {SQL_TABLE})
+            if other_sources:
+                raise ValueError(f"A consulta só pode ler a tabela `{SQL_TABLE}` (recebido: {', '.join(other_sources)}).")
+
+            cursor.execute(f"CREATE TEMP VIEW {SQL_TABLE} AS SELECT * FROM {self._rows(filters)}")
+            timer = threading.Timer(timeout, cursor.interrupt)
+            timer.start()
+            try:
+                cursor.execute(query)
+                rows = cursor.fetchmany(max_rows + 1)
+                columns = [column[0] for column in cursor.description]
+            finally:
+                timer.cancel()
+        return pd.DataFrame(rows[:max_rows], columns=columns), len(rows) > max_rows
+
+
+def _table_references(node, ctes=frozenset()):
+    """Tabelas e funções de tabela lidas pela árvore de `json_serialize_sql`.
+
+    Nomes de CTE só contam como CTE onde estão visíveis e sem qualificação
+    (`main.x` é sempre a tabela do catálogo).
+    """
+    if isinstance(node, list):
+        for item in node:
+            yield from _table_references(item, ctes)
+        return
+    if not isinstance(node, dict):
+        return
+    if node.get('type') == 'BASE_TABLE':
+        name = '.'.join(part for part in (node['catalog_name'], node['schema_name'], node['table_name']) if part)
+        if name not in ctes:
+            yield name
+    elif node.get('type') == 'TABLE_FUNCTION':
+        yield f"{node['function']['function_name']}()"
+
+    if node.get('cte_map'):
+        # Cada CTE enxerga as anteriores e a si mesma (recursiva); o corpo, todas
+        defined = set(ctes)
+        for entry in node['cte_map']['map']:
+            defined.add(entry['key'])
+            yield from _table_references(entry['value'], frozenset(defined))
+        ctes = frozenset(defined)
+    for key, value in node.items():
+        if key != 'cte_map':
+            yield from _table_references(value, ctes)
+
+
+def _values_sql(df, columns):
+    """Um DataFrame pequeno como tabela VALUES, para juntar com a consulta."""
+    rows = ', '.join(
+        '(' + ', '.join(_literal(value) for value in row) + ')'
+        for row in df[columns].itertuples(index=False)
+    )
+    return f"SELECT * FROM (VALUES {rows}) AS t({', '.join(map(_quote, columns))})"
+
+
+def _histogram_edges(low, high, bins):
+    if low == high:
+        low, high = low - 0.5, high + 0.5
+    return np.linspace(low, high, bins + 1)
+
+
+def _bin_sql(column, edges, bins):
+    low, high = float(edges[0]), float(edges[-1])
+    return f"least(floor(({column} - {_literal(low)}) * {_literal(bins / (high - low))}), {bins - 1})::INTEGER"
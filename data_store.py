@@ -0,0 +1,247 @@
+"""Ingestão do dataset de veículos com snapshot colunar em disco.
+
+O CSV é lido e limpo uma única vez; o resultado (incluindo a coluna derivada
+`manufacturer`) é gravado em um arquivo Arrow IPC sem compressão, que pode ser
+mapeado em memória nos próximos cold starts. O snapshot só é reconstruído quando
+o CSV de origem muda (mtime/tamanho e, em caso de dúvida, hash SHA-256).
+"""
+import hashlib
+import json
+import os
+from pathlib import Path
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as pa_ipc
+
+    SNAPSHOT_DISPONIVEL = True
+except ImportError:
+    SNAPSHOT_DISPONIVEL = False
+
+CSV_PATH = Path("vehicles_us.csv")
+SNAPSHOT_DIR = Path(".cache")
+
+# Incrementar quando a limpeza/derivação mudar, para invalidar snapshots antigos
+SNAPSHOT_FORMAT_VERSION = 2
+
+REQUIRED_COLUMNS = ['price', 'odometer', 'condition', 'model_year', 'model']
+
+# Schema compacto aplicado no carregamento. Strings de baixa cardinalidade viram
+# categóricas; números usam o menor tipo que comporta a faixa do dataset.
+# Colunas que ainda podem ter ausentes após a limpeza ficam em float32.
+CAR_DATA_SCHEMA = {
+    'price': 'int32',
+    'model_year': 'int16',
+    'model': 'category',
+    'condition': 'category',
+    'cylinders': 'float32',
+    'fuel': 'category',
+    'odometer': 'float32',
+    'transmission': 'category',
+    'type': 'category',
+    'paint_color': 'category',
+    'is_4wd': 'boolean',
+    'date_posted': 'category',
+    'days_listed': 'int16',
+    'manufacturer': 'category',
+}
+
+
+# --- Leitura e Limpeza do CSV ---
+
+def read_csv_clean(csv_path=CSV_PATH):
+    """Lê o CSV bruto e aplica a limpeza original do app."""
+    df = pd.read_csv(csv_path, usecols=list(range(13)))
+    df = df.dropna(subset=REQUIRED_COLUMNS)
+    # Vetorizado: primeira palavra do modelo (equivalente a x.split()[0])
+    df['manufacturer'] = df['model'].str.split(n=1).str[0].fillna('Outros')
+    return apply_schema(df.reset_index(drop=True))
+
+
+# --- Schema Compacto ---
+
+def apply_schema(df, schema=CAR_DATA_SCHEMA):
+    """Converte as colunas para os dtypes de `schema` (só as que divergem)."""
+    conversions = {}
+    for column, dtype in schema.items():
+        if column not in df.columns or str(df[column].dtype) == dtype:
+            continue
+        if column == 'is_4wd':
+            # No CSV original, 1.0 = tração 4x4 e NaN = sem tração 4x4
+            df[column] = df[column].eq(1).astype('boolean')
+        else:
+            conversions[column] = dtype
+    return df.astype(conversions) if conversions else df
+
+
+def memory_report(df):
+    """Uso de memória por coluna (bytes reais, incluindo strings)."""
+    usage = df.memory_usage(deep=True, index=False)
+    report = pd.DataFrame({
+        'coluna': usage.index,
+        'dtype': [str(df[c].dtype) for c in usage.index],
+        'memória (KB)': (usage.values / 1024).round(1),
+    })
+    report['% do total'] = (100 * usage.values / usage.sum()).round(1)
+    return report.sort_values('memória (KB)', ascending=False).reset_index(drop=True)
+
+
+# --- Acesso Somente Leitura ---
+
+def read_only_view(df):
+    """Visão rasa de `df` que compartilha os buffers do frame em cache.
+
+    Com Copy-on-Write, qualquer escrita na visão (atribuição de coluna,
+    `inplace=True`, `.loc[...] = ...`) copia só o bloco afetado, então o frame
+    original nunca é alterado e nada é copiado enquanto só houver leitura.
+    """
+    return df.copy(deep=False)
+
+
+# --- Fingerprint da Fonte ---
+
+def file_sha256(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+# Arquivo de dados e metadado de cada tipo de snapshot: 'arrow' (backend pandas)
+# e 'parquet' (backend DuckDB, gravado por data_engine)
+SNAPSHOT_FILES = {
+    'arrow': ('.arrow', '.meta.json'),
+    'parquet': ('.parquet', '.parquet.meta.json'),
+}
+
+
+def _snapshot_paths(csv_path, snapshot_dir, kind='arrow'):
+    stem = Path(csv_path).stem
+    snapshot_dir = Path(snapshot_dir)
+    data_suffix, meta_suffix = SNAPSHOT_FILES[kind]
+    return snapshot_dir / f"{stem}{data_suffix}", snapshot_dir / f"{stem}{meta_suffix}"
+
+
+def snapshot_path(csv_path=CSV_PATH, snapshot_dir=SNAPSHOT_DIR, kind='arrow'):
+    return _snapshot_paths(csv_path, snapshot_dir, kind)[0]
+
+
+def _read_meta(meta_path):
+    try:
+        return json.loads(Path(meta_path).read_text())
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def _write_meta(meta_path, meta):
+    tmp_path = Path(f"{meta_path}.tmp")
+    tmp_path.write_text(json.dumps(meta, indent=2))
+    os.replace(tmp_path, meta_path)
+
+
+def snapshot_is_fresh(csv_path=CSV_PATH, snapshot_dir=SNAPSHOT_DIR, kind='arrow'):
+    """Retorna True se o snapshot em disco corresponde ao CSV atual.
+
+    A checagem rápida compara mtime e tamanho. Se apenas o mtime mudou (ex.: o
+    arquivo foi copiado de novo com o mesmo conteúdo), o hash decide e o
+    metadado é atualizado sem reconstruir o snapshot.
+    """
+    data_path, meta_path = _snapshot_paths(csv_path, snapshot_dir, kind)
+    meta = _read_meta(meta_path)
+    if meta is None or not data_path.exists():
+        return False
+    if meta.get('format_version') != SNAPSHOT_FORMAT_VERSION:
+        return False
+
+    stat = os.stat(csv_path)
+    if meta.get('source_size') != stat.st_size:
+        return False
+    if meta.get('source_mtime_ns') == stat.st_mtime_ns:
+        return True
+
+    if meta.get('source_sha256') != file_sha256(csv_path):
+        return False
+    meta['source_mtime_ns'] = stat.st_mtime_ns
+    _write_meta(meta_path, meta)
+    return True
+
+
+# --- Construção e Leitura do Snapshot ---
+
+def build_snapshot(csv_path=CSV_PATH, snapshot_dir=SNAPSHOT_DIR):
+    """Lê o CSV, grava o snapshot Arrow IPC e retorna o DataFrame limpo."""
+    arrow_path = snapshot_path(csv_path, snapshot_dir)
+    Path(snapshot_dir).mkdir(parents=True, exist_ok=True)
+
+    stat = os.stat(csv_path)
+    df = read_csv_clean(csv_path)
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    tmp_path = Path(f"{arrow_path}.tmp")
+    # Sem compressão: o arquivo precisa ser mapeável em memória diretamente
+    with pa.OSFile(str(tmp_path), 'wb') as sink:
+        with pa_ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp_path, arrow_path)
+
+    write_snapshot_meta(csv_path, snapshot_dir, len(df), stat)
+    return df
+
+
+def write_snapshot_meta(csv_path, snapshot_dir, rows, stat, kind='arrow'):
+    """Registra de qual CSV (tamanho, mtime e hash) o snapshot foi gerado.
+
+    `stat` é o `os.stat` do CSV tirado antes da leitura, para que uma escrita
+    concorrente no CSV invalide o snapshot em vez de passar despercebida.
+    """
+    _, meta_path = _snapshot_paths(csv_path, snapshot_dir, kind)
+    _write_meta(meta_path, {
+        'format_version': SNAPSHOT_FORMAT_VERSION,
+        'source': str(csv_path),
+        'source_size': stat.st_size,
+        'source_mtime_ns': stat.st_mtime_ns,
+        'source_sha256': file_sha256(csv_path),
+        'rows': rows,
+    })
+
+
+def snapshot_version(csv_path=CSV_PATH, snapshot_dir=SNAPSHOT_DIR, kind='arrow'):
+    """Versão do dataset (hash do CSV de origem) registrada no metadado do snapshot."""
+    _, meta_path = _snapshot_paths(csv_path, snapshot_dir, kind)
+    return _read_meta(meta_path)['source_sha256'][:16]
+
+
+def read_snapshot(csv_path=CSV_PATH, snapshot_dir=SNAPSHOT_DIR):
+    """Mapeia o snapshot em memória e converte para DataFrame."""
+    with pa.memory_map(str(snapshot_path(csv_path, snapshot_dir)), 'r') as source:
+        table = pa_ipc.open_file(source).read_all()
+    return apply_schema(table.to_pandas())
+
+
+def load_car_data(csv_path=CSV_PATH, snapshot_dir=SNAPSHOT_DIR):
+    """Ponto de entrada do app: usa o snapshot se estiver atualizado.
+
+    Sem pyarrow instalado, cai no caminho antigo (leitura direta do CSV).
+    """
+    if not SNAPSHOT_DISPONIVEL:
+        df = read_csv_clean(csv_path)
+        df.attrs['dataset_version'] = file_sha256(csv_path)[:16]
+        return df
+
+    if not Path(csv_path).exists():
+        raise FileNotFoundError(csv_path)
+
+    if snapshot_is_fresh(csv_path, snapshot_dir):
+        df = read_snapshot(csv_path, snapshot_dir)
+    else:
+        df = build_snapshot(csv_path, snapshot_dir)
+    df.attrs['dataset_version'] = snapshot_version(csv_path, snapshot_dir)
+    return df
+
+
+def dataset_version(df):
+    """Identificador do conteúdo carregado (chave dos caches derivados)."""
+    return df.attrs.get('dataset_version', 'desconhecida')
@@ -0,0 +1,192 @@
+"""Modelo de chat falso e local, para testes offline e benchmarks.
+
+Substitui o `ChatGoogleGenerativeAI` quando a variável de ambiente
+`ANALISTA_FAKE_LLM` está definida. Imita o ciclo de tool calling do agente:
+para uma pergunta do usuário, pede uma execução do `PythonCodeExecutor` com
+um snippet pandas escolhido por palavras-chave (ou do `SQLQueryExecutor`, com
+a consulta SQL equivalente); ao receber o resultado da
+ferramenta, responde com um resumo que inclui a saída. Não faz chamadas de
+rede; a latência (até a primeira resposta e por token no streaming) é simulada.
+
+`FakeProvider` simula o lado do servidor: vários modelos podem compartilhar
+um provedor com limite de requisições simultâneas e por segundo, que responde
+com `RateLimitError` (429) quando o limite é excedido, como a API do Gemini.
+"""
+import collections
+import contextlib
+import json
+import re
+import threading
+import time
+from typing import Any
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+# (palavras-chave, snippet pandas, consulta SQL) — o primeiro que casar com a pergunta é usado
+_SNIPPETS = [
+    (('cilindro', 'cylinder'),
+     "print(df.groupby('fuel', observed=True)['cylinders'].mean().round(2).to_markdown())",
+     "SELECT fuel, round(avg(cylinders), 2) AS cylinders FROM cars GROUP BY fuel ORDER BY fuel"),
+    (('quilometragem', 'odometer', 'km'),
+     "print(df.groupby('condition', observed=True)['odometer'].mean().round(2).to_markdown())",
+     "SELECT condition, round(avg(odometer), 2) AS odometer FROM cars GROUP BY condition ORDER BY condition"),
+    (('cor', 'color'),
+     "print(df['paint_color'].value_counts().head(5).to_markdown())",
+     "SELECT paint_color, count(*) AS count FROM cars WHERE paint_color IS NOT NULL GROUP BY paint_color ORDER BY count DESC LIMIT 5"),
+    (('modelo', 'model'),
+     "print(df['model'].value_counts().head(5).to_markdown())",
+     "SELECT model, count(*) AS count FROM cars GROUP BY model ORDER BY count DESC LIMIT 5"),
+    (('caro', 'expensive'),
+     "print(df.sort_values('price', ascending=False).drop_duplicates(subset=['model', 'model_year']).head(5)[['model', 'model_year', 'price']].to_markdown())",
+     "SELECT model, model_year, max(price) AS price FROM cars GROUP BY model, model_year ORDER BY price DESC LIMIT 5"),
+]
+_DEFAULT_SNIPPET = (
+    "print(df.groupby('manufacturer', observed=True)['price'].mean().round(2).sort_values(ascending=False).to_markdown())",
+    "SELECT manufacturer, round(avg(price), 2) AS price FROM cars GROUP BY manufacturer ORDER BY price DESC",
+)
+
+# Argumento de cada ferramenta do app e a linguagem do snippet
+_TOOL_ARGS = {'PythonCodeExecutor': ('code', 'python'), 'SQLQueryExecutor': ('query', 'sql')}
+
+
+def snippet_for(question, language='python'):
+    column = 1 if language == 'sql' else 0
+    lowered = question.lower()
+    for keywords, *snippets in _SNIPPETS:
+        if any(k in lowered for k in keywords):
+            return snippets[column]
+    return _DEFAULT_SNIPPET[column]
+
+
+class RateLimitError(Exception):
+    """429 simulado; `retry_after` (segundos) é opcional, como no cabeçalho HTTP."""
+
+    status_code = 429
+
+    def __init__(self, retry_after=None):
+        super().__init__("429 RESOURCE_EXHAUSTED: limite de requisições do provedor local excedido")
+        self.retry_after = retry_after
+
+
+class FakeProvider:
+    """Servidor de modelo simulado, compartilhado entre modelos e threads."""
+
+    def __init__(self, max_concurrent=2, requests_per_second=None):
+        self.max_concurrent = max_concurrent
+        self.requests_per_second = requests_per_second
+        self.accepted = 0
+        self.rejected = 0
+        self.max_in_flight = 0
+        self._in_flight = 0
+        self._recent = collections.deque()
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def request(self):
+        with self._lock:
+            now = time.monotonic()
+            while self._recent and now - self._recent[0] >= 1.0:
+                self._recent.popleft()
+            over_rate = self.requests_per_second and len(self._recent) >= self.requests_per_second
+            if self._in_flight >= self.max_concurrent or over_rate:
+                self.rejected += 1
+                raise RateLimitError()
+            self._in_flight += 1
+            self._recent.append(now)
+            self.accepted += 1
+            self.max_in_flight = max(self.max_in_flight, self._in_flight)
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+
+class FakeToolCallingModel(BaseChatModel):
+    """Chat model determinístico que chama a ferramenta (`tool_name`) uma vez por pergunta."""
+
+    latency: float = 0.0
+    token_latency: float = 0.0
+    latency_per_1k_input_tokens: float = 0.0
+    tool_name: str = 'PythonCodeExecutor'
+    provider: Any = None
+
+    @property
+    def _llm_type(self):
+        return 'fake-tool-calling'
+
+    def bind_tools(self, tools, **kwargs: Any):
+        return self
+
+    def _wait(self, messages):
+        # Custo fixo por chamada mais um custo proporcional ao tamanho do prompt
+        input_tokens = _usage(messages, '')['input_tokens']
+        delay = self.latency + self.latency_per_1k_input_tokens * input_tokens / 1000
+        with self.provider.request() if self.provider else contextlib.nullcontext():
+            if delay:
+                time.sleep(delay)
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        self._wait(messages)
+        return ChatResult(generations=[ChatGeneration(message=self._reply(messages))])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        self._wait(messages)
+        message = self._reply(messages)
+
+        if message.tool_calls:
+            call = message.tool_calls[0]
+            yield ChatGenerationChunk(message=AIMessageChunk(
+                content='',
+                tool_call_chunks=[{'name': call['name'], 'args': json.dumps(call['args']), 'id': call['id'], 'index': 0}],
+                response_metadata=message.response_metadata,
+                usage_metadata=message.usage_metadata,
+            ))
+            return
+
+        tokens = re.findall(r"\S+\s*|\s+", message.content)
+        for i, token in enumerate(tokens):
+            if i and self.token_latency:
+                time.sleep(self.token_latency)
+            last = i == len(tokens) - 1
+            chunk = ChatGenerationChunk(message=AIMessageChunk(
+                content=token,
+                response_metadata=message.response_metadata if last else {},
+                usage_metadata=message.usage_metadata if last else None,
+            ))
+            if run_manager:
+                run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+
+    def _reply(self, messages):
+        last = messages[-1]
+        if isinstance(last, ToolMessage):
+            message = AIMessage(
+                content=f"Resultado da análise (modelo local de teste):\n\n{last.content}",
+                response_metadata={'finish_reason': 'STOP'},
+                usage_metadata=_usage(messages, last.content),
+            )
+        else:
+            question = last.content if isinstance(last.content, str) else str(last.content)
+            arg_name, language = _TOOL_ARGS.get(self.tool_name, ('code', 'python'))
+            message = AIMessage(
+                content='',
+                tool_calls=[{
+                    'name': self.tool_name,
+                    'args': {arg_name: snippet_for(question, language)},
+                    'id': f"call_{len(messages)}",
+                    'type': 'tool_call',
+                }],
+                response_metadata={'finish_reason': 'STOP'},
+                usage_metadata=_usage(messages, ''),
+            )
+        return message
+
+
+def _usage(messages, output):
+    # Estimativa grosseira (4 caracteres por token), só para as métricas
+    input_tokens = sum(len(str(m.content)) for m in messages) // 4
+    output_tokens = len(output) // 4
+    return {'input_tokens': input_tokens, 'output_tokens': output_tokens, 'total_tokens': input_tokens + output_tokens}
@@ -0,0 +1,111 @@
+"""Índices invertidos para o filtro global do dashboard.
+
+Construídos uma vez por versão do dataset:
+- colunas categóricas: valor -> posições das linhas com aquele valor;
+- colunas numéricas: valores ordenados + posições, para consultas de faixa
+  por busca binária.
+
+Quando o dataset só ganha linhas no fim (ingestão por arquivos diários),
+`extend_filter_index` acrescenta as novas a um índice existente.
+
+Combinar filtros vira operação de conjunto sobre bitmaps (vetores booleanos)
+montados a partir dessas posições, sem varrer as colunas. Os filtros usam o
+mesmo formato de tupla de `data_browser`.
+"""
+import numpy as np
+
+INDEXED_CATEGORICALS = ['manufacturer', 'condition', 'fuel', 'type', 'transmission', 'model', 'paint_color', 'date_posted']
+INDEXED_NUMERICS = ['model_year', 'price', 'odometer']
+
+
+def build_filter_index(df):
+    values = {}
+    for column in INDEXED_CATEGORICALS:
+        if column not in df.columns:
+            continue
+        categories = df[column].cat.categories
+        codes = df[column].cat.codes.to_numpy()
+        order = np.argsort(codes, kind='stable')
+        # Ausentes têm código -1 e ficam antes do primeiro limite
+        bounds = np.searchsorted(codes[order], np.arange(len(categories) + 1))
+        values[column] = {
+            category: order[bounds[i]:bounds[i + 1]]
+            for i, category in enumerate(categories)
+        }
+
+    ranges = {}
+    for column in INDEXED_NUMERICS:
+        if column not in df.columns:
+            continue
+        column_values = df[column].to_numpy(dtype='float64')
+        order = np.argsort(column_values, kind='stable')  # NaN vai para o fim
+        ranges[column] = (column_values[order], order)
+
+    return {'n_rows': len(df), 'values': values, 'ranges': ranges}
+
+
+def _merge_sorted(sorted_values, order, new_values, new_positions):
+    """Insere valores (com suas posições) num par (valores ordenados, posições), mantendo a ordem."""
+    new_order = np.argsort(new_values, kind='stable')
+    new_values, new_positions = new_values[new_order], new_positions[new_order]
+    # side='right': empates ficam depois das linhas antigas, como no argsort estável
+    at = np.searchsorted(sorted_values, new_values, side='right')
+    return np.insert(sorted_values, at, new_values), np.insert(order, at, new_positions)
+
+
+def extend_filter_index(index, df, start):
+    """Índice de `df` a partir do índice de `df[:start]`, sem alterar o original.
+
+    As posições antigas continuam válidas (as linhas novas vêm depois); cada
+    posting só cresce nas categorias que aparecem nas linhas novas, e as faixas
+    numéricas recebem as linhas novas por busca binária, sem reordenar tudo.
+    """
+    positions = np.arange(start, len(df))
+    values = {}
+    for column, postings in index['values'].items():
+        codes = df[column].cat.codes.to_numpy()[start:]
+        categories = df[column].cat.categories
+        postings = dict(postings)
+        for code in np.unique(codes[codes >= 0]):
+            category = categories[code]
+            added = positions[codes == code]
+            old = postings.get(category)
+            postings[category] = added if old is None else np.concatenate([old, added])
+        values[column] = postings
+
+    ranges = {}
+    for column, (sorted_values, order) in index['ranges'].items():
+        new_values = df[column].to_numpy(dtype='float64')[start:]
+        ranges[column] = _merge_sorted(sorted_values, order, new_values, positions)
+
+    return {'n_rows': len(df), 'values': values, 'ranges': ranges}
+
+
+def supports(index, filter_):
+    column, op, _ = filter_
+    return (op == 'in' and column in index['values']) or (op == 'range' and column in index['ranges'])
+
+
+def row_ids_for(index, filter_):
+    """Posições (não ordenadas) das linhas que satisfazem um único filtro."""
+    column, op, value = filter_
+    if op == 'in':
+        postings = index['values'][column]
+        hits = [postings[v] for v in value if v in postings]
+        return np.concatenate(hits) if hits else np.empty(0, dtype=np.intp)
+
+    low, high = value
+    sorted_values, order = index['ranges'][column]
+    start = np.searchsorted(sorted_values, low, side='left')
+    stop = np.searchsorted(sorted_values, high, side='right')
+    return order[start:stop]
+
+
+def bitmap(index, filters):
+    """Interseção dos filtros suportados pelo índice, como vetor booleano."""
+    mask = np.ones(index['n_rows'], dtype=bool)
+    for filter_ in filters:
+        hit = np.zeros(index['n_rows'], dtype=bool)
+        hit[row_ids_for(index, filter_)] = True
+        mask &= hit
+    return mask
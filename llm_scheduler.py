@@ -0,0 +1,263 @@
+"""Fila e despacho das chamadas ao modelo, compartilhados entre sessões.
+
+Cada sessão do Streamlit envia o turno do agente para um `Scheduler` único
+por processo, em vez de chamar o modelo direto na thread do script:
+- no máximo `max_concurrency` chamadas em andamento ao mesmo tempo;
+- justiça entre sessões: as filas de cada sessão são atendidas em rodízio,
+  então uma sessão com várias perguntas não atrasa as outras;
+- erros de limite de requisições (429 / RESOURCE_EXHAUSTED) são repetidos com
+  backoff exponencial com jitter, e o backoff pausa todos os workers (o
+  limite é do provedor, não da chamada). A nova tentativa refaz a chamada
+  inteira, mesmo que o 429 venha no meio do stream: um turno do agente volta
+  a executar as ferramentas já chamadas (o código determinístico sai do
+  `tool_cache`), e quem consome os eventos descarta os da tentativa anterior
+  ao receber 'retry';
+- chamadas idênticas em andamento (mesma chave) são executadas uma vez só e
+  o resultado é entregue a todos os interessados;
+- quem espera recebe a posição na fila enquanto a chamada não começa.
+
+A chamada é uma função que devolve um iterável de eventos (o formato de
+`assistant.stream_events`); ela roda em uma thread do pool, dentro do
+contexto (`contextvars`) de quem a enviou, e os eventos são repassados
+conforme chegam.
+"""
+import collections
+import contextvars
+import random
+import threading
+import time
+
+MAX_CONCURRENT_CALLS = 4
+MAX_RETRIES = 4
+BACKOFF_BASE = 1.0        # segundos; dobra a cada tentativa
+BACKOFF_MAX = 30.0
+POLL_SECONDS = 0.25       # intervalo de atualização da posição na fila
+
+# Classes de erro de limite de requisições (google.api_core, langchain, fake_llm)
+_RATE_LIMIT_TYPES = {'ResourceExhausted', 'TooManyRequests', 'RateLimitError', 'GoogleRateLimitError'}
+
+
+def is_rate_limit(error):
+    """Erro de limite de requisições do provedor (vale para Gemini e para o fake_llm).
+
+    Decide pelo tipo da exceção ou pelo código HTTP/status dela, nunca pela
+    mensagem. Segue a cadeia de causas: o langchain embrulha o erro do SDK.
+    """
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        if any(cls.__name__ in _RATE_LIMIT_TYPES for cls in type(error).__mro__):
+            return True
+        if any(getattr(error, attr, None) == 429 for attr in ('status_code', 'code')):
+            return True
+        if getattr(error, 'status', None) == 'RESOURCE_EXHAUSTED':
+            return True
+        error = error.__cause__ or error.__context__
+    return False
+
+
+class _Job:
+    def __init__(self, session_id, key, fn, context):
+        self.session_id = session_id
+        self.key = key
+        self.fn = fn
+        self.context = context
+        self.started = False
+        self.done = False
+        self.events = []
+        self.cond = threading.Condition()
+
+    def emit(self, event):
+        with self.cond:
+            self.events.append(event)
+            self.cond.notify_all()
+
+    def finish(self):
+        with self.cond:
+            self.done = True
+            self.cond.notify_all()
+
+
+class Ticket:
+    """Acompanha uma chamada enviada ao scheduler."""
+
+    def __init__(self, scheduler, job, deduplicated):
+        self._scheduler = scheduler
+        self._job = job
+        self.deduplicated = deduplicated
+        self.submitted_at = time.perf_counter()
+
+    def position(self):
+        return self._scheduler.position(self._job)
+
+    def events(self):
+        """Eventos da chamada desde o início: ('queued', {'position'}) enquanto
+        espera, depois os eventos da função, ('retry', {'attempt', 'delay'}) a
+        cada nova tentativa e, se falhar de vez, ('error', {'error'})."""
+        job, seen, last_position = self._job, 0, None
+        while True:
+            with job.cond:
+                job.cond.wait_for(lambda: len(job.events) > seen or job.done, timeout=POLL_SECONDS)
+                new_events = job.events[seen:]
+                seen += len(new_events)
+                finished = job.done and seen == len(job.events)
+                started = job.started
+
+            if not started:
+                position = self.position()
+                if position != last_position:
+                    last_position = position
+                    yield 'queued', {'position': position}
+            yield from new_events
+            if finished:
+                return
+
+    def result(self):
+        """Bloqueia até o fim; devolve o payload do evento 'done' ou levanta o erro."""
+        for kind, payload in self.events():
+            if kind == 'error':
+                raise payload['error']
+            if kind == 'done':
+                return payload
+        raise RuntimeError("A chamada terminou sem resultado.")
+
+
+class Scheduler:
+    """Pool limitado de chamadas ao modelo, com rodízio entre sessões."""
+
+    def __init__(self, max_concurrency=MAX_CONCURRENT_CALLS, max_retries=MAX_RETRIES,
+                 backoff_base=BACKOFF_BASE, backoff_max=BACKOFF_MAX):
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self._lock = threading.Condition()
+        self._queues = collections.OrderedDict()   # sessão -> fila; ordem = próximo atendimento
+        self._by_key = {}                          # chave -> chamada na fila ou em andamento
+        self._paused_until = 0.0
+        self._counters = collections.Counter()
+        self._in_flight = 0
+        self._max_in_flight = 0
+
+        for i in range(max_concurrency):
+            threading.Thread(target=self._work, name=f"llm-scheduler-{i}", daemon=True).start()
+
+    def submit(self, session_id, key, fn):
+        """Enfileira `fn` (sem argumentos, devolve um iterável de eventos).
+
+        `key` identifica chamadas equivalentes para deduplicação (None = nunca
+        deduplicar). O contexto atual (`contextvars`) é capturado aqui.
+        """
+        with self._lock:
+            job = self._by_key.get(key) if key is not None else None
+            if job is not None:
+                self._counters['deduplicated'] += 1
+                return Ticket(self, job, deduplicated=True)
+
+            job = _Job(session_id, key, fn, contextvars.copy_context())
+            self._queues.setdefault(session_id, collections.deque()).append(job)
+            if key is not None:
+                self._by_key[key] = job
+            self._counters['submitted'] += 1
+            self._lock.notify()
+        return Ticket(self, job, deduplicated=False)
+
+    def position(self, job):
+        """Posição na fila (1 = próxima a ser atendida; 0 = já em andamento)."""
+        with self._lock:
+            if job.started or job.done:
+                return 0
+            queues = [list(queue) for queue in self._queues.values()]
+        position = 0
+        for depth in range(max(map(len, queues), default=0)):
+            for queue in queues:
+                if depth < len(queue):
+                    position += 1
+                    if queue[depth] is job:
+                        return position
+        return 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                **{name: self._counters[name] for name in ('submitted', 'deduplicated', 'completed', 'failed', 'retries')},
+                'queued': sum(len(queue) for queue in self._queues.values()),
+                'in_flight': self._in_flight,
+                'max_in_flight': self._max_in_flight,
+            }
+
+    # --- Workers ---
+
+    def _next_job(self):
+        """Primeira chamada da sessão da vez; a sessão vai para o fim do rodízio."""
+        for session_id in list(self._queues):
+            queue = self._queues.pop(session_id)
+            job = queue.popleft()
+            if queue:
+                self._queues[session_id] = queue
+            return job
+        return None
+
+    def _work(self):
+        while True:
+            with self._lock:
+                job = self._next_job()
+                while job is None:
+                    self._lock.wait()
+                    job = self._next_job()
+                job.started = True
+                self._in_flight += 1
+                self._max_in_flight = max(self._max_in_flight, self._in_flight)
+            try:
+                self._run(job)
+            finally:
+                with self._lock:
+                    self._in_flight -= 1
+                    if self._by_key.get(job.key) is job:
+                        del self._by_key[job.key]
+
+    def _wait_for_pause(self):
+        while True:
+            with self._lock:
+                delay = self._paused_until - time.monotonic()
+            if delay <= 0:
+                return
+            time.sleep(delay)
+
+    def _backoff(self, attempt, error):
+        retry_after = getattr(error, 'retry_after', None)
+        if retry_after:
+            return float(retry_after)
+        delay = min(self.backoff_max, self.backoff_base * 2 ** attempt)
+        return delay * (0.5 + random.random() / 2)
+
+    def _run(self, job):
+        for attempt in range(self.max_retries + 1):
+            self._wait_for_pause()
+            try:
+                # Cada passo do gerador roda no contexto de quem enviou a chamada
+                events = iter(job.context.run(job.fn))
+                while True:
+                    event = job.context.run(next, events, None)
+                    if event is None:
+                        break
+                    job.emit(event)
+            except Exception as error:
+                if is_rate_limit(error) and attempt < self.max_retries:
+                    delay = self._backoff(attempt, error)
+                    with self._lock:
+                        self._counters['retries'] += 1
+                        self._paused_until = max(self._paused_until, time.monotonic() + delay)
+                    job.emit(('retry', {'attempt': attempt + 1, 'delay': delay}))
+                    continue
+                with self._lock:
+                    self._counters['failed'] += 1
+                job.emit(('error', {'error': error}))
+                job.finish()
+                return
+
+            with self._lock:
+                self._counters['completed'] += 1
+            job.finish()
+            return
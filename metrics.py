@@ -0,0 +1,143 @@
+"""Spans de tempo leves para os caminhos quentes do app.
+
+Um `Recorder` por processo (compartilhado entre sessões, thread-safe) guarda,
+por nome de span, o número de chamadas, o tempo total e as durações mais
+recentes (para mediana e p95), além da soma dos atributos numéricos (bytes
+serializados, tokens, linhas). As últimas spans ficam em uma fila curta para
+inspeção no painel de administração.
+
+    with recorder.span('figure.type_by_manufacturer') as attrs:
+        fig = build()
+        attrs['bytes'] = len(fig.to_json())
+
+Durações medidas fora do `with` (ex.: a latência do modelo, que vem dos
+eventos da chamada) entram por `record`. `snapshot()` devolve tudo em um dict
+serializável em JSON; `dump` grava esse dict em disco, para coleta externa e
+para os benchmarks.
+"""
+import collections
+import contextlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:  # Windows: sem getrusage
+    resource = None
+
+WINDOW = 200          # durações recentes por span (mediana e p95)
+RECENT_SPANS = 100    # últimas spans guardadas para o painel
+
+
+def _percentile(values, q):
+    ordered = sorted(values)
+    return ordered[round(q * (len(ordered) - 1))]
+
+
+def process_memory():
+    """Memória do processo em MB: residente atual e pico (None se indisponível)."""
+    current = None
+    try:
+        with open('/proc/self/statm') as f:
+            current = int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1024 ** 2
+    except (OSError, ValueError):
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024 if resource else None
+    return {'rss_mb': current, 'peak_rss_mb': peak}
+
+
+class _Stats:
+    def __init__(self, window):
+        self.calls = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.recent = collections.deque(maxlen=window)
+        self.attrs = collections.Counter()
+
+    def add(self, seconds, attrs):
+        self.calls += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.recent.append(seconds)
+        for key, value in attrs.items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                self.attrs[key] += value
+
+    def as_dict(self):
+        return {
+            'calls': self.calls,
+            'total_s': self.total,
+            'mean_ms': 1000 * self.total / self.calls,
+            'p50_ms': 1000 * _percentile(self.recent, 0.5),
+            'p95_ms': 1000 * _percentile(self.recent, 0.95),
+            'max_ms': 1000 * self.max,
+            'last_ms': 1000 * self.recent[-1],
+            'attrs': dict(self.attrs),
+        }
+
+
+class Recorder:
+    def __init__(self, window=WINDOW, recent=RECENT_SPANS):
+        self.window = window
+        self.started_at = time.time()
+        self._stats = {}
+        self._recent = collections.deque(maxlen=recent)
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def span(self, name, **attrs):
+        """Mede o bloco; atributos podem ser adicionados ao dict devolvido."""
+        start = time.perf_counter()
+        try:
+            yield attrs
+        finally:
+            self.record(name, time.perf_counter() - start, **attrs)
+
+    def record(self, name, seconds, **attrs):
+        with self._lock:
+            if name not in self._stats:
+                self._stats[name] = _Stats(self.window)
+            self._stats[name].add(seconds, attrs)
+            self._recent.append({'name': name, 'at': time.time(), 'ms': 1000 * seconds, **attrs})
+
+    def summary(self):
+        """Uma linha por span, da que mais consumiu tempo no total para a que menos consumiu."""
+        with self._lock:
+            rows = [{'span': name, **stats.as_dict()} for name, stats in self._stats.items()]
+        return sorted(rows, key=lambda row: row['total_s'], reverse=True)
+
+    def recent(self):
+        with self._lock:
+            return list(self._recent)
+
+    def snapshot(self, **extra):
+        """Estado completo, serializável em JSON (`extra` entra no topo, ex.: estatísticas de caches)."""
+        return {
+            'generated_at': time.time(),
+            'uptime_s': time.time() - self.started_at,
+            'process': process_memory(),
+            'spans': {row.pop('span'): row for row in self.summary()},
+            'recent': self.recent(),
+            **extra,
+        }
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+            self._recent.clear()
+            self.started_at = time.time()
+
+
+def to_json(snapshot):
+    return json.dumps(snapshot, indent=2, sort_keys=True, default=str)
+
+
+def dump(snapshot, path):
+    """Grava o snapshot em `path` (troca atômica: leitores nunca veem meio arquivo)."""
+    path = Path(path)
+    tmp_path = Path(f"{path}.tmp")
+    tmp_path.write_text(to_json(snapshot))
+    os.replace(tmp_path, path)
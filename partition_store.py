@@ -0,0 +1,415 @@
+"""Ingestão incremental de arquivos diários de anúncios, particionada por data.
+
+Em vez de um único `vehicles_us.csv`, o app pode ler um diretório onde chegam
+arquivos CSV (um por dia, por exemplo). Cada arquivo é lido e limpo uma única
+vez e gravado em fragmentos Parquet, um por valor de `date_posted`:
+
+    <snapshot_dir>/partitions/<date_posted>/<arquivo>-<hash>.parquet
+
+O manifesto (`manifest.json`) registra, por arquivo de origem, tamanho, mtime,
+hash, ordem de ingestão (`seq`) e os fragmentos gerados; e, por partição, uma
+versão derivada dos arquivos que contribuem para ela. Um refresh só relê
+arquivos novos ou alterados e remove os fragmentos dos arquivos apagados, então
+o custo acompanha o tamanho da mudança e não o histórico inteiro.
+
+O frame em memória segue a ordem de ingestão: um arquivo novo só acrescenta
+linhas ao fim. `read_frame` lê então apenas os fragmentos novos, e
+`AppendCache` estende estruturas posicionais (índice do filtro, ordenações)
+com as linhas novas em vez de refazê-las. Arquivos alterados ou apagados
+mudam linhas do meio: aí o frame e essas estruturas são refeitos.
+
+As versões por partição permitem invalidação seletiva: agregados de um recorte
+de datas só mudam se alguma partição do recorte mudou (`scope_version`), e
+`PartitionCache` guarda um valor por partição, refazendo só as que mudaram.
+
+Os fragmentos precisam do pyarrow (`data_store.SNAPSHOT_DISPONIVEL`); sem ele
+o módulo ainda importa (constantes, caches, versões por partição), mas o modo
+de diretório fica indisponível.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+import pandas as pd
+
+import data_store
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+PARTITION_COLUMN = 'date_posted'
+MISSING_PARTITION = 'sem_data'     # linhas sem `date_posted`
+DROP_PATTERN = '*.csv'
+REFRESH_SECONDS = 60               # intervalo mínimo entre varreduras do diretório
+
+# Incrementar quando o layout dos fragmentos ou do manifesto mudar
+MANIFEST_FORMAT_VERSION = 2
+
+
+def _arrow_type(dtype):
+    if dtype == 'category':
+        return pa.string()
+    if dtype == 'boolean':
+        return pa.bool_()
+    return pa.from_numpy_dtype(dtype)
+
+
+# Tipos dos fragmentos, os mesmos do snapshot Parquet de data_engine
+FRAGMENT_SCHEMA = pa.schema([
+    (column, _arrow_type(dtype)) for column, dtype in data_store.CAR_DATA_SCHEMA.items()
+]) if data_store.SNAPSHOT_DISPONIVEL else None
+
+
+# --- Manifesto ---
+
+def partitions_dir(snapshot_dir=data_store.SNAPSHOT_DIR):
+    return Path(snapshot_dir) / 'partitions'
+
+
+def manifest_path(snapshot_dir=data_store.SNAPSHOT_DIR):
+    return partitions_dir(snapshot_dir) / 'manifest.json'
+
+
+def empty_manifest():
+    return {'format_version': MANIFEST_FORMAT_VERSION, 'version': None, 'drops': {}, 'partitions': {}}
+
+
+def read_manifest(snapshot_dir=data_store.SNAPSHOT_DIR):
+    """Manifesto gravado, ou None se não existir ou for de outro formato."""
+    try:
+        manifest = json.loads(manifest_path(snapshot_dir).read_text())
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+    if manifest.get('format_version') != MANIFEST_FORMAT_VERSION:
+        return None
+    return manifest
+
+
+def _write_manifest(snapshot_dir, manifest):
+    path = manifest_path(snapshot_dir)
+    tmp_path = Path(f"{path}.tmp")
+    tmp_path.write_text(json.dumps(manifest, indent=2, sort_keys=True))
+    os.replace(tmp_path, path)
+
+
+def _digest(items):
+    return hashlib.sha256(json.dumps(items, sort_keys=True).encode()).hexdigest()[:16]
+
+
+# --- Fragmentos ---
+
+def _write_fragments(csv_path, sha256, snapshot_dir):
+    """Limpa o CSV e grava um fragmento por data. Retorna {data: {'path', 'rows'}}."""
+    df = data_store.read_csv_clean(csv_path)
+    categoricals = df.select_dtypes('category').columns
+    df = df.astype({column: object for column in categoricals})
+
+    fragments = {}
+    keys = df[PARTITION_COLUMN].fillna(MISSING_PARTITION)
+    for partition, part in df.groupby(keys, sort=True):
+        relative = Path(partition) / f"{Path(csv_path).stem}-{sha256[:8]}.parquet"
+        path = partitions_dir(snapshot_dir) / relative
+        path.parent.mkdir(parents=True, exist_ok=True)
+        table = pa.Table.from_pandas(part, schema=FRAGMENT_SCHEMA, preserve_index=False)
+        tmp_path = Path(f"{path}.tmp")
+        pq.write_table(table, tmp_path, compression='zstd')
+        os.replace(tmp_path, path)
+        fragments[partition] = {'path': str(relative), 'rows': len(part)}
+    return fragments
+
+
+def _partition_versions(drops):
+    """Versão de cada partição: hash dos arquivos (e linhas) que contribuem para ela."""
+    contributions = {}
+    for name, drop in drops.items():
+        for partition, fragment in drop['fragments'].items():
+            contributions.setdefault(partition, []).append((name, drop['sha256'], fragment['rows']))
+    return {
+        partition: {'version': _digest(sorted(items)), 'rows': sum(rows for _, _, rows in items)}
+        for partition, items in sorted(contributions.items())
+    }
+
+
+def refresh(drop_dir, snapshot_dir=data_store.SNAPSHOT_DIR, pattern=DROP_PATTERN):
+    """Sincroniza o manifesto com os arquivos de `drop_dir`.
+
+    Arquivos com mesmo tamanho e mtime são pulados sem leitura; se só o mtime
+    mudou, o hash decide (como em `data_store.snapshot_is_fresh`). Retorna
+    (manifesto, resumo), com as partições alteradas no resumo.
+    """
+    start = time.perf_counter()
+    drop_dir = Path(drop_dir)
+    if not drop_dir.is_dir():
+        raise FileNotFoundError(drop_dir)
+    partitions_dir(snapshot_dir).mkdir(parents=True, exist_ok=True)
+
+    previous = read_manifest(snapshot_dir) or empty_manifest()
+    drops = {}
+    added, changed = [], []
+    # Arquivos novos ou alterados vão para o fim da ordem de ingestão
+    next_seq = max((drop['seq'] for drop in previous['drops'].values()), default=0) + 1
+    for csv_path in sorted(drop_dir.glob(pattern)):
+        stat = os.stat(csv_path)
+        old = previous['drops'].get(csv_path.name)
+        if old is not None and old['size'] == stat.st_size and old['mtime_ns'] == stat.st_mtime_ns:
+            drops[csv_path.name] = old
+            continue
+        sha256 = data_store.file_sha256(csv_path)
+        if old is not None and old['sha256'] == sha256:
+            drops[csv_path.name] = {**old, 'mtime_ns': stat.st_mtime_ns}
+            continue
+        drops[csv_path.name] = {
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'sha256': sha256,
+            'seq': next_seq,
+            'fragments': _write_fragments(csv_path, sha256, snapshot_dir),
+        }
+        next_seq += 1
+        (added if old is None else changed).append(csv_path.name)
+    removed = sorted(set(previous['drops']) - set(drops))
+
+    partitions = _partition_versions(drops)
+    manifest = {'format_version': MANIFEST_FORMAT_VERSION, 'drops': drops, 'partitions': partitions}
+    # Versão do conjunto = a de um escopo sem filtro
+    manifest['version'] = scope_version(manifest)
+    if manifest != previous:
+        _write_manifest(snapshot_dir, manifest)
+        _remove_stale_fragments(previous, manifest, snapshot_dir)
+
+    changed_partitions = sorted(
+        partition for partition in set(previous['partitions']) | set(partitions)
+        if previous['partitions'].get(partition, {}).get('version') != partitions.get(partition, {}).get('version')
+    )
+    summary = {
+        'added': added,
+        'changed': changed,
+        'removed': removed,
+        'partitions_changed': changed_partitions,
+        'rows': sum(info['rows'] for info in partitions.values()),
+        'seconds': time.perf_counter() - start,
+    }
+    return manifest, summary
+
+
+def _remove_stale_fragments(previous, manifest, snapshot_dir):
+    # Só depois de gravar o manifesto novo, para que um leitor nunca veja um
+    # manifesto apontando para fragmentos apagados
+    keep = {fragment['path'] for drop in manifest['drops'].values() for fragment in drop['fragments'].values()}
+    root = partitions_dir(snapshot_dir)
+    for drop in previous['drops'].values():
+        for fragment in drop['fragments'].values():
+            if fragment['path'] in keep:
+                continue
+            path = root / fragment['path']
+            path.unlink(missing_ok=True)
+            if path.parent.exists() and not any(path.parent.iterdir()):
+                path.parent.rmdir()
+
+
+# --- Leitura e Escopo ---
+
+def partitions_for(manifest, filters=()):
+    """Partições que um filtro (formato de data_browser) pode tocar."""
+    partitions = set(manifest['partitions'])
+    for column, op, value in filters:
+        if column == PARTITION_COLUMN and op == 'in':
+            partitions &= set(value)
+    return sorted(partitions)
+
+
+def scope_version(manifest, filters=()):
+    """Versão dos dados que um filtro enxerga: só muda se alguma partição dele mudou."""
+    versions = [(p, manifest['partitions'][p]['version']) for p in partitions_for(manifest, filters)]
+    return _digest(versions)
+
+
+def fragment_paths(manifest, snapshot_dir=data_store.SNAPSHOT_DIR, partitions=None):
+    """Caminhos dos fragmentos, em ordem de ingestão (arquivo de origem) e data."""
+    root = partitions_dir(snapshot_dir)
+    wanted = None if partitions is None else set(partitions)
+    fragments = [
+        (drop['seq'], partition, fragment['path'])
+        for drop in manifest['drops'].values()
+        for partition, fragment in drop['fragments'].items()
+        if wanted is None or partition in wanted
+    ]
+    return [root / path for _, _, path in sorted(fragments)]
+
+
+def _read_fragments(paths):
+    table = pq.read_table([str(path) for path in paths], schema=FRAGMENT_SCHEMA)
+    return data_store.apply_schema(table.to_pandas())
+
+
+def _append(df, tail):
+    """`df` seguido de `tail`, com as categorias das duas partes unidas (em ordem)."""
+    dtypes = {
+        column: pd.CategoricalDtype(df[column].cat.categories.union(tail[column].cat.categories))
+        for column in df.select_dtypes('category').columns
+    }
+    return pd.concat([df.astype(dtypes), tail.astype(dtypes)], ignore_index=True)
+
+
+def read_frame(manifest, snapshot_dir=data_store.SNAPSHOT_DIR, previous=None, previous_manifest=None):
+    """DataFrame com todas as partições, no schema compacto de data_store.
+
+    Com o frame (`previous`) de uma versão anterior e o manifesto dela, se os
+    fragmentos antigos são um prefixo dos atuais (só chegaram arquivos), lê
+    apenas os novos e os acrescenta ao fim. As linhas antigas mantêm as
+    posições, e `attrs['appended_to']` = (versão anterior, nº de linhas
+    anteriores) diz isso a `AppendCache`.
+    """
+    paths = fragment_paths(manifest, snapshot_dir)
+    if not paths:
+        raise FileNotFoundError(partitions_dir(snapshot_dir))
+    known = fragment_paths(previous_manifest, snapshot_dir) if previous is not None else []
+    if known and paths[:len(known)] == known:
+        if len(paths) == len(known):
+            return previous
+        df = _append(previous, _read_fragments(paths[len(known):]))
+        df.attrs['appended_to'] = (previous_manifest['version'], len(previous))
+    else:
+        df = _read_fragments(paths)
+    df.attrs['dataset_version'] = manifest['version']
+    return df
+
+
+# --- Cache por Partição ---
+
+class PartitionCache:
+    """Um valor por partição, refeito só quando a versão da partição muda.
+
+    `get(versions, build)` recebe {partição: versão} e chama `build(partições)`
+    uma única vez com as que faltam ou estão desatualizadas; `build` devolve
+    {partição: valor}.
+
+    Com `combine(somar, subtrair)`, `total` devolve a soma dos valores de todas
+    as partições, atualizada pela diferença: soma os valores novos e subtrai
+    os que eles substituíram, sem voltar a somar o histórico inteiro.
+    """
+
+    def __init__(self, combine=None):
+        self._combine = combine
+        self._entries = {}
+        self._total = None
+        self._added, self._removed = [], []
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+
+    def _replace(self, partition, entry):
+        old = self._entries.pop(partition, None)
+        if entry is not None:
+            self._entries[partition] = entry
+        # Diferenças pendentes só existem depois que o total foi calculado
+        if self._total is not None:
+            if old is not None:
+                self._removed.append(old[1])
+            if entry is not None:
+                self._added.append(entry[1])
+
+    def get(self, versions, build):
+        with self._lock:
+            stale = [p for p, version in versions.items() if self._entries.get(p, (None,))[0] != version]
+            self.hits += len(versions) - len(stale)
+            self.misses += len(stale)
+            if stale:
+                built = build(stale)
+                for partition in stale:
+                    self._replace(partition, (versions[partition], built[partition]))
+            return {p: self._entries[p][1] for p in versions}
+
+    def prune(self, partitions):
+        """Descarta partições que não existem mais."""
+        with self._lock:
+            for partition in set(self._entries) - set(partitions):
+                self._replace(partition, None)
+
+    def total(self, versions, build):
+        """Soma dos valores das partições de `versions` (as demais são descartadas)."""
+        with self._lock:
+            self.prune(versions)
+            values = self.get(versions, build)
+            if self._total is None:
+                self._total = self._combine(values.values(), ())
+            elif self._added or self._removed:
+                self._total = self._combine([self._total, *self._added], self._removed)
+            self._added, self._removed = [], []
+            return self._total
+
+
+# --- Estruturas Posicionais ---
+
+class AppendCache:
+    """Estrutura derivada do frame mais recente, estendida quando ele só ganhou linhas.
+
+    `build(df)` monta do zero; `extend(anterior, df, start)` devolve uma
+    estrutura nova com as linhas `df[start:]` acrescentadas, sem alterar a
+    anterior (que pode estar em uso por outro rerun). Vale quando
+    `df.attrs['appended_to']` aponta para a versão em cache (ver `read_frame`);
+    nos demais casos, `build`.
+    """
+
+    def __init__(self, build, extend):
+        self._build = build
+        self._extend = extend
+        self._version = None
+        self._value = None
+        self._lock = threading.Lock()
+        self.builds = 0
+        self.extensions = 0
+
+    def get(self, df):
+        version = data_store.dataset_version(df)
+        with self._lock:
+            if version != self._version:
+                base = df.attrs.get('appended_to')
+                if base is not None and self._version is not None and base[0] == self._version:
+                    self._value = self._extend(self._value, df, base[1])
+                    self.extensions += 1
+                else:
+                    self._value = self._build(df)
+                    self.builds += 1
+                self._version = version
+            return self._value
+
+
+# --- Diretório Monitorado ---
+
+class PartitionStore:
+    """Diretório de arquivos diários com refresh limitado a um por `interval` segundos."""
+
+    def __init__(self, drop_dir, snapshot_dir=data_store.SNAPSHOT_DIR, interval=REFRESH_SECONDS, pattern=DROP_PATTERN):
+        self.drop_dir = Path(drop_dir)
+        self.snapshot_dir = Path(snapshot_dir)
+        self.interval = interval
+        self.pattern = pattern
+        self.manifest = None
+        self.last_summary = None
+        self._checked_at = None
+        self._frame = None   # (frame, manifesto) da última leitura
+        self._lock = threading.Lock()
+
+    def current(self, force=False):
+        """Manifesto atual; varre o diretório se `force` ou se o intervalo passou."""
+        with self._lock:
+            now = time.monotonic()
+            if force or self.manifest is None or now - self._checked_at >= self.interval:
+                self.manifest, self.last_summary = refresh(self.drop_dir, self.snapshot_dir, self.pattern)
+                self._checked_at = now
+            return self.manifest
+
+    def read_frame(self, manifest):
+        """Frame de `manifest`, a partir do último lido quando só chegaram arquivos novos."""
+        with self._lock:
+            previous, previous_manifest = self._frame or (None, None)
+            df = read_frame(manifest, self.snapshot_dir, previous, previous_manifest)
+            self._frame = (df, manifest)
+            return df
@@ -0,0 +1,553 @@
+"""Respostas determinísticas para as perguntas mais comuns do chat, sem o LLM.
+
+Um parser de intenção reconhece, em português e inglês, perguntas de média,
+contagem e top-N por fabricante, modelo, combustível, condição, tipo, etc.,
+com filtros simples (4x4, faixas de preço/quilometragem/ano, valores de
+categoria). Cada intenção reconhecida vira uma consulta vetorizada sobre os
+agregados em cache (cubo, frames filtrados, ordenações pré-calculadas), e a
+resposta é formatada como pede `prompts/system.txt`: resumo, lista e tabela
+markdown em português.
+
+O parser é conservador: qualquer pergunta que ele não entenda por completo
+retorna None e segue para o agente.
+"""
+import re
+import threading
+import unicodedata
+
+import numpy as np
+
+import aggregates
+
+MIN_PRICE = 500          # system.txt: descartar preços abaixo de $500
+TOP_ROWS_DEFAULT = 5
+SUMMARY_ITEMS = 3
+
+# coluna: (rótulo, palavras que a mencionam)
+DIMENSIONS = {
+    'manufacturer': ('Fabricante', ('fabricante', 'fabricantes', 'marca', 'marcas', 'manufacturer', 'manufacturers', 'brand', 'brands', 'make', 'makes')),
+    'model': ('Modelo', ('modelo', 'modelos', 'model', 'models')),
+    'fuel': ('Combustível', ('combustivel', 'combustiveis', 'fuel', 'fuels')),
+    'condition': ('Condição', ('condicao', 'condicoes', 'condition', 'conditions')),
+    'type': ('Tipo', ('tipo', 'tipos', 'type', 'types')),
+    'transmission': ('Transmissão', ('transmissao', 'transmissoes', 'cambio', 'transmission', 'transmissions')),
+    'paint_color': ('Cor', ('cor', 'cores', 'color', 'colors', 'colour', 'paint_color')),
+    'model_year': ('Ano do Modelo', ('ano', 'anos', 'year', 'years', 'model_year')),
+}
+
+# coluna: (rótulo da média, palavras que a mencionam)
+MEASURES = {
+    'price': ('Preço Médio', ('preco', 'precos', 'price', 'prices', 'valor')),
+    'odometer': ('Quilometragem Média', ('quilometragem', 'km', 'odometer', 'mileage', 'milhagem')),
+    'cylinders': ('Média de Cilindros', ('cilindro', 'cilindros', 'cylinder', 'cylinders')),
+    'days_listed': ('Média de Dias Anunciado', ('days_listed', 'dias')),
+}
+
+COLUMN_LABELS = {
+    **{column: label for column, (label, _) in DIMENSIONS.items()},
+    'price': 'Preço',
+    'odometer': 'Quilometragem',
+    'cylinders': 'Cilindros',
+    'days_listed': 'Dias Anunciado',
+    'is_4wd': 'Tração 4x4',
+}
+
+# Médias que o cubo responde sem voltar às linhas: (soma, contagem de não nulos)
+CUBE_MEANS = {'price': ('price_sum', 'count'), 'odometer': ('odometer_sum', 'odometer_count')}
+
+MEAN_WORDS = {'media', 'medias', 'medio', 'medios', 'average', 'mean', 'avg'}
+COUNT_WORDS = {
+    'conte', 'contar', 'contagem', 'quantos', 'quantas', 'numero', 'count', 'many', 'number',
+    'vendidos', 'vendidas', 'populares', 'popular', 'comum', 'comuns', 'common', 'frequentes',
+}
+ASCENDING_WORDS = {'menor', 'menores', 'menos', 'lowest', 'least', 'fewest', 'smallest'}
+SINGULAR_WORDS = {'comum', 'common'}
+GROUP_WORDS = {'por', 'by', 'per', 'cada', 'each'}
+NEGATION_WORDS = {'sem', 'nao', 'not', 'without', 'nem', 'nor', 'never', 'nunca'}
+EXCLUSION_WORDS = {'exceto', 'excluindo', 'excluir', 'salvo', 'fora', 'except', 'excluding', 'exclude', 'besides', 'other', 'outros', 'outras'}
+
+# palavra: (coluna de ordenação, crescente) — "os 5 carros mais caros"
+TOP_ROW_WORDS = {
+    **dict.fromkeys(['caro', 'caros', 'cara', 'caras', 'expensive'], ('price', False)),
+    **dict.fromkeys(['barato', 'baratos', 'barata', 'baratas', 'cheapest', 'cheap'], ('price', True)),
+    **dict.fromkeys(['antigo', 'antigos', 'antiga', 'antigas', 'oldest'], ('model_year', True)),
+    **dict.fromkeys(['novos', 'novas', 'newest'], ('model_year', False)),
+}
+TOP_ROW_COLUMNS = ['model', 'model_year', 'price']
+NUMBER_WORDS = {'tres': 3, 'three': 3, 'cinco': 5, 'five': 5, 'dez': 10, 'ten': 10}
+# Um número só vira o N de um top-N logo depois destas palavras ("os 5", "top 10")
+TOP_N_MARKERS = {'os', 'as', 'the', 'top', 'primeiros', 'primeiras', 'first', 'liste', 'list', 'mostre', 'show', 'quais', 'which'}
+
+# Palavras sem conteúdo próprio; qualquer outra palavra que não seja coluna,
+# medida, valor de categoria ou termo da intenção (ex.: o nome de um modelo,
+# "anunciados", "dólares") faz a pergunta seguir para o agente
+STOPWORDS = {
+    'a', 'o', 'as', 'os', 'um', 'uma', 'de', 'do', 'da', 'dos', 'das', 'em', 'no', 'na', 'nos', 'nas', 'ao', 'aos',
+    'com', 'para', 'pra', 'e', 'ou', 'que', 'qual', 'quais', 'sao', 'esta', 'estao', 'estejam', 'existe',
+    'existem', 'ha', 'tem', 'entre', 'todos', 'todas', 'total', 'geral', 'me', 'mostre', 'mostrar', 'mostrando',
+    'liste', 'listar', 'lista', 'exiba', 'calcule', 'informe', 'diga', 'carro', 'carros', 'veiculo', 'veiculos',
+    'automovel', 'automoveis', 'anuncio', 'anuncios', 'dataset', 'dados', 'utilizam', 'usam', 'mais', 'maior',
+    'maiores', 'primeiros', 'primeiras', 'top', 'ranking', 'rank', 'estado', 'tracao', 'true', 'is_4wd',
+    'the', 'an', 'of', 'for', 'in', 'on', 'with', 'and', 'or', 'what', 'which', 'is', 'are', 'there', 'how',
+    'do', 'does', 'show', 'list', 'give', 'me', 'all', 'car', 'cars', 'vehicle', 'vehicles', 'listing', 'listings',
+    'overall', 'most', 'highest', 'biggest', 'largest', 'first', 'dolares', 'dollars', 'usd',
+}
+
+# Perguntas com estes termos pedem cálculos que os modelos de consulta não cobrem
+UNSUPPORTED_WORDS = {
+    'relacao', 'ratio', 'taxa', 'rate', 'idade', 'age', 'mediana', 'median', 'desvio', 'std',
+    'soma', 'sum', 'porque', 'why', 'diferenca', 'difference', 'percentual', 'percentage',
+    'percent', 'proporcao', 'share', 'vs', 'versus', 'atual',
+}
+UNSUPPORTED_PREFIXES = ('divid', 'correla', 'compar', 'tendenc', 'trend', 'previs', 'predict', 'distribui', 'histog', 'evolu', 'grafic')
+UNSUPPORTED_PHRASES = ('abaixo da media', 'acima da media', 'below average', 'above average', 'por que', '/', '*', '%')
+
+# Valores de categoria ambíguos em texto livre ("new", "other"): só via agente
+AMBIGUOUS_VALUES = {'other', 'new', 'custom'}
+VALUE_SYNONYMS = {
+    'fuel': {'gasolina': 'gas', 'gasoline': 'gas', 'hibrido': 'hybrid', 'hibridos': 'hybrid', 'eletrico': 'electric', 'eletricos': 'electric'},
+    'condition': {'excelente': 'excellent', 'excelentes': 'excellent', 'bom': 'good', 'boa': 'good', 'bons': 'good', 'como novo': 'like new', 'razoavel': 'fair', 'regular': 'fair', 'sucata': 'salvage'},
+    'transmission': {'automatico': 'automatic', 'automatica': 'automatic', 'automaticos': 'automatic', 'cambio manual': 'manual'},
+    'type': {'suvs': 'SUV', 'picape': 'pickup', 'picapes': 'pickup', 'seda': 'sedan', 'sedans': 'sedan', 'caminhao': 'truck', 'caminhoes': 'truck', 'conversivel': 'convertible', 'perua': 'wagon', 'minivan': 'mini-van', 'onibus': 'bus'},
+    'paint_color': {'preto': 'black', 'preta': 'black', 'pretos': 'black', 'branco': 'white', 'branca': 'white', 'brancos': 'white', 'prata': 'silver', 'cinza': 'grey', 'gray': 'grey', 'azul': 'blue', 'vermelho': 'red', 'vermelha': 'red', 'verde': 'green', 'marrom': 'brown', 'amarelo': 'yellow', 'laranja': 'orange', 'roxo': 'purple'},
+}
+FOUR_WD_PHRASES = ('4x4', '4wd', 'is_4wd', 'awd', 'quatro rodas', 'tracao integral', 'four wheel drive')
+TWO_WD_PHRASES = ('4x2', '2wd')
+
+ACRONYMS = {'bmw': 'BMW', 'gmc': 'GMC', 'suv': 'SUV'}
+
+# --- Filtros Numéricos (removidos do texto antes de procurar palavras-chave) ---
+
+_NUMBER = r"\$?\s*(\d[\d.,]*)\s*(k|mil)?"
+_NUMERIC_COLUMNS = {
+    'price': r"(?:preco|precos|price|prices|valor)",
+    'odometer': r"(?:quilometragem|km|odometer|mileage)",
+}
+_UPPER_OPS = r"(<=|<|abaixo de|menor que|menores que|inferior a|ate|under|below|less than)"
+_LOWER_OPS = r"(>=|>|acima de|maior que|maiores que|superior a|over|above|more than|greater than)"
+_INCLUSIVE_OPS = {'<=', '>=', 'ate'}
+_YEAR = r"((?:19|20)\d{2})"
+
+
+def _normalize(text):
+    """Minúsculas e sem acentos, para casar palavras-chave em pt/en."""
+    decomposed = unicodedata.normalize('NFKD', str(text).lower())
+    return ''.join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def _parse_number(text, suffix):
+    text = text.rstrip('.,')
+    if ',' in text and '.' in text:
+        text = text.replace(',', '') if text.rfind('.') > text.rfind(',') else text.replace('.', '').replace(',', '.')
+    if re.fullmatch(r"\d{1,3}(?:[.,]\d{3})+", text):
+        value = float(re.sub(r"[.,]", "", text))
+    else:
+        value = float(text.replace(',', '.'))
+    return value * 1000 if suffix else value
+
+
+def _bound(op, value, direction):
+    """Limite da faixa (sempre inclusiva): operadores estritos excluem o próprio valor."""
+    return value if op in _INCLUSIVE_OPS else np.nextafter(value, direction)
+
+
+def _extract_numeric_filters(text):
+    """Filtros de faixa de preço, quilometragem e ano; devolve (filtros, texto restante)."""
+    filters = {}
+
+    def take(pattern, build):
+        nonlocal text
+        for match in list(re.finditer(pattern, text)):
+            column, bounds = build(match)
+            low, high = filters.get(column, (-np.inf, np.inf))
+            filters[column] = (max(low, bounds[0]), min(high, bounds[1]))
+        text = re.sub(pattern, ' ', text)
+
+    for column, names in _NUMERIC_COLUMNS.items():
+        take(
+            rf"{names}\s*(?:entre|between)\s*{_NUMBER}\s*(?:e|and|-)\s*{_NUMBER}",
+            lambda m, c=column: (c, (_parse_number(m[1], m[2]), _parse_number(m[3], m[4]))),
+        )
+        take(
+            rf"{names}\s*(?:de\s+)?{_UPPER_OPS}\s*{_NUMBER}",
+            lambda m, c=column: (c, (-np.inf, _bound(m[1], _parse_number(m[2], m[3]), -np.inf))),
+        )
+        take(
+            rf"{names}\s*(?:de\s+)?{_LOWER_OPS}\s*{_NUMBER}",
+            lambda m, c=column: (c, (_bound(m[1], _parse_number(m[2], m[3]), np.inf), np.inf)),
+        )
+
+    take(rf"(?:de|from|entre|between)\s+{_YEAR}\s+(?:a|ate|e|and|to)\s+{_YEAR}", lambda m: ('model_year', (int(m[1]), int(m[2]))))
+    take(rf"(?:apos|depois de|after)\s+{_YEAR}", lambda m: ('model_year', (int(m[1]) + 1, np.inf)))
+    take(rf"(?:a partir de|desde|since)\s+{_YEAR}", lambda m: ('model_year', (int(m[1]), np.inf)))
+    take(rf"(?:antes de|before)\s+{_YEAR}", lambda m: ('model_year', (-np.inf, int(m[1]) - 1)))
+    take(rf"(?:ate|until)\s+{_YEAR}", lambda m: ('model_year', (-np.inf, int(m[1]))))
+    take(rf"\b{_YEAR}\b", lambda m: ('model_year', (int(m[1]), int(m[1]))))
+
+    return tuple((column, 'range', bounds) for column, bounds in filters.items()), text
+
+
+# --- Parser de Intenção ---
+
+def build_vocabulary(df):
+    """Frases que identificam valores de categoria: {frase normalizada: (coluna, valor)}."""
+    vocabulary = {}
+    for column in ['manufacturer', 'type', 'condition', 'fuel', 'transmission', 'paint_color']:
+        if column not in df.columns:
+            continue
+        categories = set(df[column].cat.categories)
+        for value in categories - AMBIGUOUS_VALUES:
+            vocabulary[_normalize(value)] = (column, value)
+            if column == 'type':
+                vocabulary[_normalize(value) + 's'] = (column, value)  # "trucks", "sedans"
+        for phrase, value in VALUE_SYNONYMS.get(column, {}).items():
+            if value in categories:
+                vocabulary[phrase] = (column, value)
+    return vocabulary
+
+
+def _has_phrase(padded, phrase):
+    return f" {phrase} " in padded
+
+
+# Termos que o parser sabe interpretar (além de números e valores de categoria)
+_KNOWN_WORDS = (
+    STOPWORDS | MEAN_WORDS | COUNT_WORDS | ASCENDING_WORDS | GROUP_WORDS | set(TOP_ROW_WORDS)
+    | {name for _, names in DIMENSIONS.values() for name in names}
+    | {name for _, names in MEASURES.values() for name in names}
+)
+
+
+def _is_known(token):
+    return token == '|' or token.isdigit() or token in NUMBER_WORDS or token in _KNOWN_WORDS
+
+
+def parse(question, vocabulary):
+    """Intenção da pergunta (dict) ou None se ela não for reconhecida com segurança."""
+    text = _normalize(question)
+    if any(phrase in text for phrase in UNSUPPORTED_PHRASES):
+        return None
+
+    numeric_filters, text = _extract_numeric_filters(text)
+    tokens = re.findall(r"[a-z0-9_\-]+", text)
+    words = set(tokens)
+    if words & UNSUPPORTED_WORDS or any(t.startswith(UNSUPPORTED_PREFIXES) for t in tokens):
+        return None
+    padded = f" {' '.join(tokens)} "
+
+    # Valores de categoria (frases mais longas primeiro: "like new" antes de "new")
+    selected = {}
+    for phrase in sorted(vocabulary, key=len, reverse=True):
+        if _has_phrase(padded, phrase):
+            column, value = vocabulary[phrase]
+            selected.setdefault(column, [])
+            if value not in selected[column]:
+                selected[column].append(value)
+            padded = padded.replace(f" {phrase} ", " | ")
+
+    filters = tuple((column, 'in', tuple(values)) for column, values in selected.items())
+    for phrase in FOUR_WD_PHRASES + TWO_WD_PHRASES:
+        match = re.search(rf"(\S+) {re.escape(phrase)} ", padded)
+        if match:
+            # Só a negação colada ao termo é entendida ("sem 4x4", "not 4wd")
+            negated_by_word = match[1] in NEGATION_WORDS
+            filters += (('is_4wd', 'in', (not (negated_by_word or phrase in TWO_WD_PHRASES),)),)
+            padded = padded.replace(match[0] if negated_by_word else f" {phrase} ", " | ", 1)
+            break
+    filters += numeric_filters
+
+    tokens = padded.split()
+    # Negações e exclusões que sobraram ("não são 4x4", "exceto pickups") e
+    # palavras fora do vocabulário mudariam a consulta: o agente responde
+    if any(t in NEGATION_WORDS or t in EXCLUSION_WORDS for t in tokens):
+        return None
+    if any(not _is_known(t) for t in tokens):
+        return None
+    mentioned = [
+        column for column, (_, names) in DIMENSIONS.items()
+        if any(t in names for t in tokens) and column not in selected
+    ]
+    grouped_by = [
+        column for column, (_, names) in DIMENSIONS.items()
+        if any(tokens[i] in GROUP_WORDS and tokens[i + 1] in names for i in range(len(tokens) - 1))
+    ]
+    measures = [column for column, (_, names) in MEASURES.items() if any(t in names for t in tokens)]
+    numbers = []
+    for i, t in enumerate(tokens):
+        if t.isdigit() or t in NUMBER_WORDS:
+            value = int(t) if t.isdigit() else NUMBER_WORDS[t]
+            # Número que não é o N de um top-N ("mais de 10 anos", "igual a 0") não foi entendido
+            if not (0 < value <= 100 and (i == 0 or tokens[i - 1] in TOP_N_MARKERS)):
+                return None
+            numbers.append(value)
+    n = numbers[0] if len(numbers) == 1 else None
+    if len(numbers) > 1:
+        return None
+
+    wants_mean = bool(words & MEAN_WORDS)
+    wants_count = bool(words & COUNT_WORDS)
+    sort_words = {TOP_ROW_WORDS[t] for t in tokens if t in TOP_ROW_WORDS}
+    if len(sort_words) > 1 or (wants_mean and wants_count):
+        return None
+
+    intent = {'filters': filters, 'n': n, 'ascending': bool(words & ASCENDING_WORDS)}
+
+    # "Os 5 carros mais caros": linhas individuais, ordenadas
+    if sort_words and not wants_mean and not wants_count:
+        sort_by, ascending = sort_words.pop()
+        if set(mentioned) <= {'model', 'model_year'} and not grouped_by:
+            return {**intent, 'kind': 'top_rows', 'sort_by': sort_by, 'ascending': ascending, 'n': n or TOP_ROWS_DEFAULT}
+        # "Quais fabricantes são mais caros?": média da coluna de ordenação por grupo
+        if sort_by != 'price' or len(mentioned) != 1:
+            return None
+        return {**intent, 'kind': 'mean', 'measure': 'price', 'by': mentioned[0], 'ascending': ascending}
+
+    if not (wants_mean or wants_count):
+        return None
+
+    # Agrupamento: "por X" explícito, senão a única dimensão citada, senão a
+    # coluna filtrada por mais de um valor ("gasolina e diesel")
+    candidates = grouped_by or mentioned
+    if len(candidates) > 1:
+        return None
+    if not candidates:
+        candidates = [column for column, op, values in filters if op == 'in' and len(values) > 1]
+        if len(candidates) > 1:
+            return None
+    by = candidates[0] if candidates else None
+    if n is None and words & SINGULAR_WORDS and by is not None:
+        n = 1
+    intent.update(by=by, n=n)
+
+    if wants_count:
+        return {**intent, 'kind': 'count', 'measure': None}
+
+    if sort_words:
+        sort_by, ascending = sort_words.pop()
+        if measures and measures != [sort_by]:
+            return None
+        measures, intent['ascending'] = [sort_by], ascending
+    if len(measures) > 1:
+        return None
+    return {**intent, 'kind': 'mean', 'measure': measures[0] if measures else 'price'}
+
+
+# --- Formatação (regras de system.txt) ---
+
+def _title(value):
+    return ' '.join(ACRONYMS.get(word.lower(), word.title()) for word in str(value).split(' '))
+
+
+def _format_value(column, value):
+    if column == 'price':
+        return f"$ {value:,.2f}"
+    if column == 'model_year':
+        return str(int(value))
+    if column == 'count':
+        return f"{int(value):,}"
+    if column in ('odometer', 'cylinders', 'days_listed'):
+        return f"{value:,.2f}"
+    if column == 'is_4wd':
+        return "Sim" if value else "Não"
+    return _title(value)
+
+
+def _markdown_table(headers, rows, numeric):
+    lines = [
+        "| " + " | ".join(headers) + " |",
+        "| " + " | ".join("---:" if is_numeric else ":---" for is_numeric in numeric) + " |",
+    ]
+    lines += ["| " + " | ".join(row) + " |" for row in rows]
+    return "\n".join(lines)
+
+
+def _typed_value(bound, direction):
+    """Valor digitado por trás de um limite de `_bound`, e se o operador era estrito.
+
+    Um limite estrito é o vizinho em ponto flutuante de um valor com até duas
+    casas decimais (`np.nextafter`), o que nenhum número digitado é.
+    """
+    previous = np.nextafter(bound, -direction)
+    if round(bound, 2) != bound and round(previous, 2) == previous:
+        return previous, True
+    return bound, False
+
+
+def _describe_filters(filters):
+    parts = []
+    for column, op, value in filters:
+        label = COLUMN_LABELS.get(column, column)
+        if op == 'in':
+            parts.append(f"{label}: {', '.join(_format_value(column, v) for v in value)}")
+            continue
+        low, high = value
+        if low == high:
+            parts.append(f"{label}: {_format_value(column, low)}")
+        elif np.isinf(high):
+            low, strict = _typed_value(low, np.inf)
+            parts.append(f"{label}: {'acima de' if strict else 'a partir de'} {_format_value(column, low)}")
+        elif np.isinf(low):
+            high, strict = _typed_value(high, -np.inf)
+            parts.append(f"{label}: {'abaixo de' if strict else 'até'} {_format_value(column, high)}")
+        else:
+            parts.append(f"{label}: de {_format_value(column, low)} a {_format_value(column, high)}")
+    return " · ".join(parts)
+
+
+def describe(intent, filters):
+    """Equivalente pandas da consulta, exibido no painel de debug."""
+    lines = ["# Consulta direta (sem LLM)"]
+    if filters:
+        lines.append(f"# filtros: {_describe_filters(filters)}")
+    order = f".sort_values(ascending={intent['ascending']})"
+    head = f".head({intent['n']})" if intent['n'] else ""
+    if intent['kind'] == 'top_rows':
+        lines.append(
+            f"df.sort_values('{intent['sort_by']}', ascending={intent['ascending']})"
+            f".drop_duplicates(subset=['model', 'model_year']).head({intent['n']})[{TOP_ROW_COLUMNS}]"
+        )
+    elif intent['by'] is None:
+        lines.append("len(df)" if intent['kind'] == 'count' else f"df['{intent['measure']}'].mean()")
+    elif intent['kind'] == 'count':
+        lines.append(f"df.groupby('{intent['by']}', observed=True).size(){order}{head}")
+    else:
+        lines.append(f"df.groupby('{intent['by']}', observed=True)['{intent['measure']}'].mean(){order}{head}")
+    return "\n".join(lines)
+
+
+# --- Motor de Consultas ---
+
+class QueryEngine:
+    """Responde intenções reconhecidas a partir dos agregados em cache do app.
+
+    `cube_for(filters)`, `frame_for(filters)` e `sorted_ids_for(filters,
+    sort_by, ascending)` são os getters em cache do app (cubo, linhas
+    filtradas e posições ordenadas); `df` é o dataset completo.
+    """
+
+    def __init__(self, df, cube_for, frame_for, sorted_ids_for):
+        self.df = df
+        self.vocabulary = build_vocabulary(df)
+        self.cube_for = cube_for
+        self.frame_for = frame_for
+        self.sorted_ids_for = sorted_ids_for
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def parse(self, question):
+        return parse(question, self.vocabulary)
+
+    def answer(self, question, filters=()):
+        """{'text', 'trace'} para perguntas reconhecidas; None encaminha ao agente."""
+        intent = self.parse(question)
+        result = None
+        if intent is not None:
+            try:
+                result = self._run(intent, tuple(filters))
+            except (KeyError, ValueError, TypeError):
+                result = None
+        with self._lock:
+            if result is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return result
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {'hits': self.hits, 'misses': self.misses, 'hit_rate': self.hits / total if total else 0.0}
+
+    def _run(self, intent, global_filters):
+        filters = intent['filters']
+        shows_price = intent['kind'] == 'top_rows' or intent['measure'] == 'price'
+        if shows_price and not any(column == 'price' for column, _, _ in filters):
+            filters += (('price', 'range', (MIN_PRICE, np.inf)),)
+        all_filters = global_filters + filters
+
+        if intent['kind'] == 'top_rows':
+            body = self._top_rows(intent, all_filters)
+        else:
+            body = self._grouped(intent, all_filters)
+
+        text = body if not filters else f"{body}\n\n_Filtros: {_describe_filters(filters)}_"
+        return {'text': text, 'trace': [{'code': describe(intent, all_filters), 'output': body}]}
+
+    def _grouped(self, intent, filters):
+        by, measure = intent['by'], intent['measure']
+        counting = intent['kind'] == 'count'
+        value_column = 'count' if counting else measure
+
+        if by in aggregates.CUBE_DIMENSIONS + [None] and (counting or measure in CUBE_MEANS):
+            # Cubo em cache: agrupa algumas centenas de células, não as linhas
+            cube = self.cube_for(filters)
+            columns = ['count'] if counting else list(CUBE_MEANS[measure])
+            sums = cube.groupby(by, observed=True)[columns].sum() if by else cube[columns].sum().to_frame().T
+            values = sums['count'] if counting else sums[columns[0]] / sums[columns[1]].replace(0, np.nan)
+        else:
+            frame = self.frame_for(filters)
+            if by:
+                grouped = frame.groupby(by, observed=True)
+                values = grouped.size() if counting else grouped[measure].mean()
+            else:
+                values = np.array([len(frame) if counting else frame[measure].mean()])
+
+        if by is None:
+            value = np.asarray(values)[0]
+            if counting:
+                return f"Número de anúncios: **{_format_value('count', value)}**"
+            if np.isnan(value):
+                return "Nenhum anúncio corresponde aos filtros."
+            return f"{MEASURES[measure][0]}: **{_format_value(measure, value)}**"
+
+        values = values.dropna()
+        values = values[values > 0] if counting else values
+        if values.empty:
+            return "Nenhum anúncio corresponde aos filtros."
+        values = values.sort_values(ascending=intent['ascending'])
+        if intent['n']:
+            values = values.head(intent['n'])
+
+        value_label = "Anúncios" if counting else MEASURES[measure][0]
+        by_label = DIMENSIONS[by][0]
+        order = "do menor para o maior" if intent['ascending'] else "do maior para o menor"
+        summary = [f"{value_label} por {by_label.lower()} ({order}):", ""]
+        summary += [
+            f"{i}. {_format_value(by, key)} ({_format_value(value_column, value)})"
+            for i, (key, value) in enumerate(values.head(SUMMARY_ITEMS).items(), start=1)
+        ]
+        table = _markdown_table(
+            [by_label, value_label],
+            [[_format_value(by, key), _format_value(value_column, value)] for key, value in values.items()],
+            [by == 'model_year', True],
+        )
+        return "\n".join(summary) + "\n\n" + table
+
+    def _top_rows(self, intent, filters):
+        n, sort_by = intent['n'], intent['sort_by']
+        ids = self.sorted_ids_for(filters, sort_by, intent['ascending'])
+        # Ordenações pré-calculadas: só o começo do vetor é lido até achar n veículos únicos
+        chunk = max(n * 20, 200)
+        while True:
+            rows = self.df.take(ids[:chunk]).drop_duplicates(subset=['model', 'model_year'])
+            if len(rows) >= n or chunk >= len(ids):
+                break
+            chunk *= 4
+        rows = rows.head(n)
+        if rows.empty:
+            return "Nenhum anúncio corresponde aos filtros."
+
+        adjective = {('price', False): "mais caros", ('price', True): "mais baratos",
+                     ('model_year', True): "mais antigos", ('model_year', False): "mais novos"}[(sort_by, intent['ascending'])]
+        summary = [f"Os {len(rows)} veículos {adjective} (sem repetir modelo/ano):", ""]
+        summary += [
+            f"{i}. {_format_value('model', row.model)} {_format_value('model_year', row.model_year)} ({_format_value('price', row.price)})"
+            for i, row in enumerate(rows.head(SUMMARY_ITEMS).itertuples(), start=1)
+        ]
+        table = _markdown_table(
+            [COLUMN_LABELS[c] for c in TOP_ROW_COLUMNS],
+            [[_format_value(c, getattr(row, c)) for c in TOP_ROW_COLUMNS] for row in rows.itertuples()],
+            [False, True, True],
+        )
+        return "\n".join(summary) + "\n\n" + table
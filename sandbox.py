@@ -0,0 +1,353 @@
+"""Pool de processos para executar o código gerado pelo agente.
+
+Cada worker é um processo Python mantido aquecido: carrega o dataset uma vez a
+partir do snapshot Arrow (leitura rápida, sem reprocessar o CSV) e depois só
+recebe o código e o filtro de cada chamada, nada de re-serializar o DataFrame.
+A conversão para pandas copia as colunas, então cada worker guarda a sua
+própria cópia do dataset: a memória cresce com `WORKERS`.
+
+Por chamada, o worker aplica um limite de CPU (RLIMIT_CPU) e captura o stdout,
+enviando cada trecho impresso de volta ao processo do Streamlit assim que é
+escrito. O processo pai impõe o limite de tempo de parede e o de tamanho da
+saída: se algum estourar, o worker é morto e substituído. O teto de memória
+(RLIMIT_AS) vale para o worker inteiro. Como cada chamada roda em um processo separado, duas sessões não
+disputam o `sys.stdout` global e um código descontrolado não derruba o
+servidor.
+
+No modo de diretório (`partition_store`), cada chamada leva o manifesto da
+sessão: um worker que ainda está numa versão anterior lê só os arquivos novos
+antes de executar o código, sem reiniciar o pool a cada refresh.
+"""
+import contextlib
+import io
+import multiprocessing
+import os
+import queue
+import sys
+import threading
+import time
+import traceback
+import types
+import weakref
+
+try:
+    import resource
+except ImportError:  # Windows: sem limites por processo
+    resource = None
+
+WORKERS = 2
+CALL_TIMEOUT = 20          # segundos de relógio por chamada
+CALL_CPU_SECONDS = 15      # segundos de CPU por chamada
+WORKER_MEMORY_MB = 2048    # memória adicional permitida além do dataset carregado
+MAX_OUTPUT_BYTES = 1 << 20  # stdout aceito por chamada; o resto é descartado
+
+
+# --- Processo Worker ---
+
+class _PipeWriter(io.TextIOBase):
+    """stdout do worker: cada write vira uma mensagem para o processo pai."""
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    def writable(self):
+        return True
+
+    def write(self, text):
+        if text:
+            self._conn.send(('out', text))
+        return len(text)
+
+
+def _set_memory_ceiling(memory_mb):
+    """RLIMIT_AS a partir do tamanho virtual atual (dataset e bibliotecas não contam)."""
+    if resource is None:
+        return
+    try:
+        with open('/proc/self/statm') as f:
+            current = int(f.read().split()[0]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        return  # sem /proc (ex.: macOS): não dá para medir a base com segurança
+    limit = current + memory_mb * 1024 * 1024
+    _, hard = resource.getrlimit(resource.RLIMIT_AS)
+    if hard != resource.RLIM_INFINITY:
+        limit = min(limit, hard)
+    resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
+
+
+def _set_cpu_limit(cpu_seconds):
+    """Limite de CPU relativo ao que o worker já consumiu (SIGXCPU encerra o processo)."""
+    if resource is None:
+        return
+    used = resource.getrusage(resource.RUSAGE_SELF)
+    limit = int(used.ru_utime + used.ru_stime) + 1 + cpu_seconds
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    if hard != resource.RLIM_INFINITY:
+        limit = min(limit, hard)
+    resource.setrlimit(resource.RLIMIT_CPU, (limit, hard))
+
+
+def _load_dataset(csv_path, snapshot_dir, manifest):
+    import data_store
+
+    if manifest is not None:
+        # Diretório de arquivos diários: os fragmentos da versão pedida pelo
+        # pool, não a do manifesto em disco (que um refresh pode ter trocado)
+        import partition_store
+
+        return partition_store.read_frame(manifest, snapshot_dir)
+    if data_store.SNAPSHOT_DISPONIVEL:
+        return data_store.read_snapshot(csv_path, snapshot_dir)
+    return data_store.read_csv_clean(csv_path)
+
+
+def _remove_unused_categories(df):
+    """Categorias só das linhas do recorte: `value_counts` e `crosstab` não listam zeros de fora dele."""
+    categoricals = df.select_dtypes('category').columns
+    return df.assign(**{column: df[column].cat.remove_unused_categories() for column in categoricals})
+
+
+def _worker_main(conn, csv_path, snapshot_dir, manifest, memory_mb):
+    import pandas as pd
+
+    import data_browser
+    import data_store
+
+    import partition_store
+
+    car_data = _load_dataset(csv_path, snapshot_dir, manifest)
+    filtered_cache = {(): car_data}
+
+    if memory_mb:
+        _set_memory_ceiling(memory_mb)
+
+    conn.send(('ready', len(car_data)))
+    stdout = _PipeWriter(conn)
+
+    while True:
+        message = conn.recv()
+        if message is None:
+            break
+        code, filters, cpu_seconds, new_manifest = message
+
+        if new_manifest is not None:
+            # Outra versão do diretório: só os fragmentos novos são lidos (uma
+            # falha aqui encerra o worker, e o pool inicia outro já na versão nova)
+            car_data = partition_store.read_frame(new_manifest, snapshot_dir, car_data, manifest)
+            manifest = new_manifest
+            filtered_cache = {(): car_data}
+
+        if filters not in filtered_cache:
+            mask = data_browser.filter_mask(car_data, filters)
+            filtered_cache = {(): car_data, filters: _remove_unused_categories(car_data[mask])}
+        df = data_store.read_only_view(filtered_cache[filters])
+
+        if cpu_seconds:
+            _set_cpu_limit(cpu_seconds)
+
+        error = None
+        sys.stdout = stdout
+        try:
+            exec(code, {'df': df, 'pd': pd}, {})
+        except MemoryError:
+            error = "Erro: limite de memória excedido pelo código."
+        except Exception as e:
+            error = f"Erro: {e}"
+        except BaseException:
+            error = f"Erro: {traceback.format_exc(limit=1)}"
+        finally:
+            sys.stdout = sys.__stdout__
+        conn.send(('done', error))
+
+
+# --- Pool (processo do Streamlit) ---
+
+_SPAWN_LOCK = threading.Lock()
+
+
+@contextlib.contextmanager
+def _bare_main_module():
+    """Esconde o `__main__` enquanto um worker é iniciado.
+
+    O spawn reimporta o módulo `__main__` no processo filho; sob o Streamlit
+    ele é o próprio app.py, que seria executado inteiro em cada worker.
+    O diretório deste módulo também fica no `sys.path` durante o start: o
+    filho importa `sandbox` a partir de uma cópia dele, e uma thread de
+    aquecimento pode iniciar workers depois que a execução do script terminou
+    (o AppTest, por exemplo, restaura o `sys.path` ao fim de cada execução).
+    """
+    with _SPAWN_LOCK:
+        main = sys.modules.get('__main__')
+        sys.modules['__main__'] = types.ModuleType('__main__')
+        module_dir = os.path.dirname(os.path.abspath(__file__))
+        added_path = module_dir not in sys.path
+        if added_path:
+            sys.path.insert(0, module_dir)
+        try:
+            yield
+        finally:
+            sys.modules['__main__'] = main
+            if added_path:
+                sys.path.remove(module_dir)
+
+
+class _Worker:
+    def __init__(self, ctx, csv_path, snapshot_dir, manifest, memory_mb):
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(
+            target=_worker_main,
+            args=(child_conn, str(csv_path), str(snapshot_dir), manifest, memory_mb),
+            daemon=True,
+        )
+        with _bare_main_module():
+            self.process.start()
+        child_conn.close()
+        self.ready = False
+        self.manifest_version = manifest['version'] if manifest is not None else None
+
+    def wait_ready(self, timeout):
+        if not self.ready:
+            if not self.conn.poll(timeout):
+                raise TimeoutError("Worker do sandbox não inicializou a tempo.")
+            self.conn.recv()
+            self.ready = True
+
+    def kill(self):
+        self.process.kill()
+        self.process.join(timeout=5)
+        self.conn.close()
+
+
+def _shutdown(workers):
+    for worker in list(workers):
+        try:
+            worker.conn.send(None)
+        except (OSError, ValueError):
+            pass
+        worker.process.join(timeout=1)
+        if worker.process.is_alive():
+            worker.kill()
+
+
+class SandboxPool:
+    """Pool de workers aquecidos, seguro para uso concorrente entre sessões.
+
+    No modo de diretório (`partition_store`), `manifest` é a versão inicial
+    dos dados. Cada chamada pode trazer um manifesto mais novo: o worker que a
+    recebe passa para ele, e os workers iniciados depois (inclusive os que
+    substituem um worker morto) já partem do último manifesto recebido.
+    """
+
+    def __init__(self, csv_path, snapshot_dir, size=WORKERS, timeout=CALL_TIMEOUT,
+                 cpu_seconds=CALL_CPU_SECONDS, memory_mb=WORKER_MEMORY_MB, startup_timeout=120,
+                 max_output_bytes=MAX_OUTPUT_BYTES, manifest=None):
+        # spawn: o processo do Streamlit tem várias threads, fork não é seguro
+        self._ctx = multiprocessing.get_context('spawn')
+        self._paths = (csv_path, snapshot_dir)
+        self.memory_mb = memory_mb
+        self.manifest = manifest
+        self.timeout = timeout
+        self.cpu_seconds = cpu_seconds
+        self.max_output_bytes = max_output_bytes
+        self.startup_timeout = startup_timeout
+
+        self._all = []
+        self._idle = queue.Queue()
+        self._lock = threading.Lock()
+        for _ in range(size):
+            self._idle.put(self._spawn())
+        weakref.finalize(self, _shutdown, self._all)
+
+    def _spawn(self):
+        worker = _Worker(self._ctx, *self._paths, self.manifest, self.memory_mb)
+        with self._lock:
+            self._all.append(worker)
+        return worker
+
+    def _replace(self, worker):
+        worker.kill()
+        with self._lock:
+            self._all.remove(worker)
+        return self._spawn()
+
+    def events(self, code, filters=(), manifest=None):
+        """Executa `code` em um worker, gerando eventos conforme chegam.
+
+        Eventos: ('out', trecho do stdout) e, no máximo uma vez, ('error', mensagem)
+        para exceção ou limite de tempo/CPU/memória/saída. Passado
+        `max_output_bytes`, a saída é cortada e o worker substituído: o pai
+        nunca acumula mais do que isso de uma chamada. `manifest` é a versão
+        dos dados da chamada (modo de diretório).
+        """
+        if manifest is not None:
+            self.manifest = manifest
+        worker = self._idle.get()
+        try:
+            worker.wait_ready(self.startup_timeout)
+            # O manifesto só viaja quando o worker está em outra versão
+            update = manifest if manifest is not None and manifest['version'] != worker.manifest_version else None
+            worker.conn.send((code, tuple(filters), self.cpu_seconds, update))
+            if update is not None:
+                worker.manifest_version = update['version']
+        except (TimeoutError, OSError, EOFError):
+            self._idle.put(self._replace(worker))
+            yield 'error', "Erro: o sandbox de execução não está disponível."
+            return
+
+        deadline = time.monotonic() + self.timeout
+        finished = False
+        output_bytes = 0
+        try:
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not worker.conn.poll(remaining):
+                    yield 'error', f"Erro: tempo limite de {self.timeout}s excedido; execução interrompida."
+                    return
+                try:
+                    kind, payload = worker.conn.recv()
+                except EOFError:
+                    # Processo morreu (ex.: SIGXCPU ao estourar o limite de CPU)
+                    yield 'error', "Erro: a execução foi encerrada por exceder os limites de CPU ou memória."
+                    return
+                if kind == 'out':
+                    data = payload.encode()
+                    output_bytes += len(data)
+                    if output_bytes > self.max_output_bytes:
+                        kept = data[:len(data) - (output_bytes - self.max_output_bytes)].decode(errors='ignore')
+                        if kept:
+                            yield 'out', kept
+                        yield 'error', f"\n[Saída truncada em {self.max_output_bytes:,} bytes; execução interrompida.]"
+                        return
+                    yield 'out', payload
+                elif kind == 'done':
+                    finished = True
+                    if payload:
+                        yield 'error', payload
+                    return
+        finally:
+            # Worker que não terminou a chamada (timeout, morte ou consumidor que
+            # abandonou o gerador) pode ter mensagens pendentes: substitui
+            self._idle.put(worker if finished else self._replace(worker))
+
+    def stream(self, code, filters=(), manifest=None):
+        """Trechos de texto da execução (stdout e, por último, o erro, se houver)."""
+        for _, text in self.events(code, filters, manifest):
+            yield text
+
+    def execute(self, code, filters=(), manifest=None):
+        """Retorna (stdout, erro ou None)."""
+        output, error = [], None
+        for kind, text in self.events(code, filters, manifest):
+            if kind == 'out':
+                output.append(text)
+            else:
+                error = text
+        return ''.join(output), error
+
+    def run(self, code, filters=(), manifest=None):
+        output, error = self.execute(code, filters, manifest)
+        return output + (error or '')
+
+    def close(self):
+        _shutdown(self._all)
+
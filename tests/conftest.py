@@ -0,0 +1,29 @@
+"""Fixtures compartilhadas: dataset sintético (o mesmo gerador dos benchmarks)."""
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / 'benchmarks'))
+
+import data_store  # noqa: E402
+import synthetic_data  # noqa: E402
+
+ROWS = 3000
+
+
+@pytest.fixture(scope='session')
+def car_csv(tmp_path_factory):
+    """vehicles_us.csv sintético, com o snapshot Arrow já gerado ao lado."""
+    workdir = tmp_path_factory.mktemp('car_data')
+    csv_path = workdir / 'vehicles_us.csv'
+    synthetic_data.generate(ROWS).to_csv(csv_path, index=False)
+    data_store.load_car_data(csv_path, workdir / '.cache')
+    return csv_path
+
+
+@pytest.fixture(scope='session')
+def car_data(car_csv):
+    return data_store.load_car_data(car_csv, car_csv.parent / '.cache')
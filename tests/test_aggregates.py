@@ -0,0 +1,89 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import aggregates
+
+
+@pytest.fixture(scope='module')
+def cube(car_data):
+    return aggregates.build_cube(car_data)
+
+
+@pytest.mark.parametrize('dimensions', [['manufacturer', 'type'], ['condition', 'model_year'], ['fuel']])
+def test_cube_slice_matches_groupby(cube, car_data, dimensions):
+    expected = car_data.groupby(dimensions, observed=True).agg(
+        count=('price', 'size'), price_sum=('price', 'sum'), odometer_sum=('odometer', 'sum'),
+    )
+    for measure in ['count', 'price_sum', 'odometer_sum']:
+        sliced = aggregates.cube_slice(cube, dimensions, measure).set_index(dimensions)[measure]
+        pd.testing.assert_series_equal(sliced, expected[measure], check_dtype=False, check_exact=False)
+
+
+def test_filtered_cube_matches_groupby_of_filtered_rows(cube, car_data):
+    filters = [('manufacturer', 'in', ('ford', 'toyota')), ('model_year', 'range', (2005, 2015))]
+    sliced = aggregates.cube_slice(aggregates.filter_cube(cube, filters), 'type').set_index('type')['count']
+    rows = car_data[car_data['manufacturer'].isin(['ford', 'toyota']) & car_data['model_year'].between(2005, 2015)]
+    expected = rows.groupby('type', observed=True).size()
+    pd.testing.assert_series_equal(sliced, expected, check_dtype=False, check_names=False)
+
+
+def test_manufacturer_counts_matches_value_counts(cube, car_data):
+    counts = aggregates.manufacturer_counts(cube)
+    expected = car_data['manufacturer'].value_counts()
+    assert counts.to_dict() == expected.to_dict()
+    assert counts.is_monotonic_decreasing
+
+
+@pytest.fixture(scope='module')
+def summaries(car_data):
+    return aggregates.build_price_summaries(car_data)
+
+
+def test_box_stats_match_pandas_quantiles(summaries, car_data):
+    box = summaries['box']
+    prices = car_data.groupby('condition', observed=True)['price']
+    quantiles = prices.quantile([0.25, 0.5, 0.75]).unstack()
+    np.testing.assert_allclose(box['q1'], quantiles.loc[box.index, 0.25])
+    np.testing.assert_allclose(box['median'], quantiles.loc[box.index, 0.5])
+    np.testing.assert_allclose(box['q3'], quantiles.loc[box.index, 0.75])
+    np.testing.assert_allclose(box['mean'], prices.mean().loc[box.index])
+    assert box['n'].to_dict() == prices.size().to_dict()
+
+    for condition, stats in box.iterrows():
+        values = car_data.loc[car_data['condition'] == condition, 'price']
+        iqr = stats['q3'] - stats['q1']
+        inside = values[values.between(stats['q1'] - 1.5 * iqr, stats['q3'] + 1.5 * iqr)]
+        assert (stats['lowerfence'], stats['upperfence']) == (inside.min(), inside.max())
+        assert len(stats['outliers']) <= aggregates.MAX_OUTLIERS_PER_BOX
+
+
+@pytest.mark.parametrize('bin_mode', ['adaptive', 'fixed'])
+def test_price_histogram_counts_add_up_to_manufacturer_counts(summaries, cube, bin_mode):
+    manufacturers = ['ford', 'toyota', 'bmw']
+    edges, histograms = aggregates.price_histogram(summaries, manufacturers, bin_mode=bin_mode)
+    counts = aggregates.manufacturer_counts(cube)
+    assert set(histograms) == set(manufacturers)
+    for manufacturer, histogram in histograms.items():
+        assert len(histogram) == len(edges) - 1
+        assert histogram.sum() == counts[manufacturer]
+
+
+def test_depreciation_ols_matches_polyfit(car_data):
+    summary = aggregates.build_depreciation_summary(car_data, point_budget=500)
+    rows = car_data[car_data['odometer'] < car_data['odometer'].quantile(0.99)]
+    assert summary['total_points'] == len(rows)
+    for vehicle_type, group in rows.groupby('type', observed=True):
+        if len(group) < 2:
+            continue
+        slope, intercept = np.polyfit(group['odometer'].astype('float64'), group['price'].astype('float64'), 1)
+        fit = summary['ols'].loc[vehicle_type]
+        assert fit['slope'] == pytest.approx(slope, rel=1e-6)
+        assert fit['intercept'] == pytest.approx(intercept, rel=1e-6)
+        assert fit['n'] == len(group)
+
+
+def test_depreciation_sample_respects_point_budget(car_data):
+    summary = aggregates.build_depreciation_summary(car_data, point_budget=500)
+    assert len(summary['sample']) <= 500 + summary['ols'].shape[0]
+    assert summary['density']['counts'].sum() == summary['total_points']
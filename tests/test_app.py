@@ -0,0 +1,162 @@
+"""Reruns ponta a ponta do app com o AppTest (sem navegador, modelo falso)."""
+import json
+import shutil
+import threading
+import time
+
+import pytest
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+
+from conftest import ROOT
+
+QUESTION = "Escreva código: cilindros por combustível, passo a passo"
+WARMUP_THREADS = ('agent-warmup', 'response-warmup')
+
+
+@pytest.fixture
+def app_dir(car_csv, tmp_path, monkeypatch):
+    """Diretório de trabalho do app: CSV sintético, prompts e dump de métricas."""
+    shutil.copy(car_csv, tmp_path / 'vehicles_us.csv')
+    (tmp_path / 'prompts').symlink_to(ROOT / 'prompts')
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv('ANALISTA_FAKE_LLM', '1')
+    monkeypatch.setenv('ANALISTA_METRICS_PATH', str(tmp_path / 'metrics.json'))
+    st.cache_resource.clear()
+    yield tmp_path
+    wait_for_warmup()
+    st.cache_resource.clear()
+
+
+def run(at):
+    # Cada run do AppTest recompila o app.py; um ast.parse concorrente nas
+    # threads de aquecimento pode derrubar a compilação no Python 3.11
+    wait_for_warmup()
+    start = time.perf_counter()
+    at.run()
+    assert not at.exception, at.exception[0].value
+    return time.perf_counter() - start
+
+
+def spans(app_dir):
+    return json.loads((app_dir / 'metrics.json').read_text())['spans']
+
+
+def wait_for_warmup():
+    # Também tira os aquecimentos da disputa de CPU com os reruns medidos
+    for thread in threading.enumerate():
+        if thread.name in WARMUP_THREADS:
+            thread.join()
+
+
+def test_chat_turn_does_not_build_the_dashboard(app_dir):
+    at = AppTest.from_file(str(ROOT / 'app.py'), default_timeout=300)
+    at.session_state['active_view'] = 'chat'
+    run(at)
+    at.chat_input[0].set_value(QUESTION)
+    chat_turn = run(at)
+
+    assert any(m.value == QUESTION for m in at.chat_message[0].markdown)
+    # Tempo do rerun fora da chamada ao agente (modelo e sandbox)
+    rerun_overhead = chat_turn - spans(app_dir)['llm.turn']['total_s']
+    # O cubo pode ser montado pela consulta direta do chat; figuras e resumos dos gráficos, não
+    chart_work = [
+        name for name in spans(app_dir)
+        if name.startswith(('figure.', 'serialize.', 'render.')) or name in ('aggregate.summaries', 'aggregate.depreciation')
+    ]
+    assert chart_work == []
+
+    # Referência: o mesmo processo pagando o dashboard inteiro com os caches vazios
+    st.cache_resource.clear()
+    dashboard = AppTest.from_file(str(ROOT / 'app.py'), default_timeout=300)
+    dashboard_rerun = run(dashboard)
+    assert any(name.startswith('figure.') for name in spans(app_dir))
+    assert rerun_overhead < dashboard_rerun
+
+
+def test_suggested_question_is_answered_from_the_warm_cache(app_dir, monkeypatch):
+    at = AppTest.from_file(str(ROOT / 'app.py'), default_timeout=300)
+    at.session_state['active_view'] = 'chat'
+    run(at)
+    # O pré-cálculo roda em segundo plano com o modelo falso; espera todas as respostas
+    deadline = time.monotonic() + 60
+    while not any(c.value.startswith("Respostas prontas: 15 de 15") for c in at.caption):
+        assert time.monotonic() < deadline, "pré-cálculo não terminou"
+        time.sleep(0.5)
+        run(at)
+
+    def no_network(*args, **kwargs):
+        raise AssertionError("chamada de rede com a resposta em cache")
+    monkeypatch.setattr('socket.socket.connect', no_network)
+
+    # Pergunta que a consulta direta não responde: só o cache evita o modelo
+    at.button(key='btn_1d').click()
+    run(at)
+    assert any(c.value == "⚡ Resposta pronta (cache)" for c in at.caption)
+    assert 'llm.turn' not in spans(app_dir)
+    assert 'llm.warmup' in spans(app_dir)
+
+
+def test_empty_global_filter_still_finishes_the_rerun(app_dir, car_data):
+    counts = car_data.groupby(['manufacturer', 'type', 'condition'], observed=False).size()
+    manufacturer, vehicle_type, condition = counts[counts == 0].index[0]
+    at = AppTest.from_file(str(ROOT / 'app.py'), default_timeout=300)
+    run(at)
+    at.multiselect(key='global_manufacturers').set_value([manufacturer])
+    at.multiselect(key='global_types').set_value([vehicle_type])
+    at.multiselect(key='global_conditions').set_value([condition])
+    run(at)
+
+    assert any(w.value.startswith("Nenhum anúncio corresponde") for w in at.warning)
+    # O fim do script roda mesmo sem gráficos: a métrica do rerun é gravada
+    assert spans(app_dir)['rerun.dashboard']['calls'] == 2
+
+
+def test_raw_page_is_clamped_when_the_filters_shrink_the_result(app_dir, car_data):
+    at = AppTest.from_file(str(ROOT / 'app.py'), default_timeout=300)
+    at.session_state['active_view'] = 'raw'
+    run(at)
+    assert at.number_input(key='raw_page').value == 1
+    at.number_input(key='raw_page').set_value(10)
+    run(at)
+    assert at.caption[0].value.startswith("Mostrando 451–500 de")
+
+    manufacturer = car_data['manufacturer'].value_counts().index[-1]
+    at.multiselect(key='raw_manufacturers').set_value([manufacturer])
+    run(at)
+    n_rows = (car_data['manufacturer'] == manufacturer).sum()
+    n_pages = -(-n_rows // 50)
+    assert n_pages < 10
+    assert at.number_input(key='raw_page').value == n_pages
+    assert not at.warning
+
+
+@pytest.mark.parametrize('warmup, expected_calls', [(None, 0), ('1', 1)])
+def test_startup_precomputes_gemini_responses_only_when_asked(app_dir, monkeypatch, warmup, expected_calls):
+    monkeypatch.delenv('ANALISTA_FAKE_LLM')
+    monkeypatch.setenv('GOOGLE_API_KEY', 'chave-de-teste')
+    if warmup:
+        monkeypatch.setenv('ANALISTA_WARMUP', warmup)
+    calls = []
+    monkeypatch.setattr('assistant.warm_responses', lambda *args: calls.append(args))
+
+    at = AppTest.from_file(str(ROOT / 'app.py'), default_timeout=300)
+    run(at)
+    wait_for_warmup()
+    assert len(calls) == expected_calls
+
+
+def test_broken_ai_install_disables_the_chat_without_crashing_the_warmup(app_dir, monkeypatch):
+    # Pacotes presentes (IA_DISPONIVEL), mas a importação falha
+    monkeypatch.delattr('langchain.agents.create_agent')
+    errors = []
+    monkeypatch.setattr(threading, 'excepthook', errors.append)
+
+    at = AppTest.from_file(str(ROOT / 'app.py'), default_timeout=300)
+    run(at)
+    wait_for_warmup()
+    assert errors == []
+
+    at.session_state['active_view'] = 'chat'
+    run(at)
+    assert any(w.value.startswith("As bibliotecas do LangChain") for w in at.warning)
@@ -0,0 +1,32 @@
+import pytest
+
+pytest.importorskip('langchain')
+
+from langchain.agents import create_agent  # noqa: E402
+from langchain.tools import tool  # noqa: E402
+from langchain_core.messages import HumanMessage  # noqa: E402
+
+import assistant  # noqa: E402
+import fake_llm  # noqa: E402
+
+
+@tool
+def PythonCodeExecutor(code: str) -> str:
+    """Ferramenta de teste: escreve a saída em dois trechos."""
+    write = assistant.tool_output_writer()
+    write("parcial 1\n")
+    write("parcial 2\n")
+    return "parcial 1\nparcial 2\n"
+
+
+def test_tool_output_streams_before_the_tool_finishes():
+    agent = create_agent(model=fake_llm.FakeToolCallingModel(), tools=[PythonCodeExecutor])
+    events = [(kind, payload) for kind, payload in assistant.stream_events(agent, [HumanMessage("cilindros")])
+              if kind != 'token']
+    kinds = [kind for kind, _ in events]
+    assert kinds == ['model', 'tool_output', 'tool_output', 'tool', 'model', 'done']
+    assert [payload['text'] for kind, payload in events if kind == 'tool_output'] == ["parcial 1\n", "parcial 2\n"]
+
+
+def test_tool_output_writer_is_a_no_op_outside_the_agent():
+    assistant.tool_output_writer()("ignorado")
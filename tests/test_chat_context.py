@@ -0,0 +1,38 @@
+import pytest
+
+pytest.importorskip('langchain')
+
+from langchain.agents import create_agent  # noqa: E402
+from langchain.tools import tool  # noqa: E402
+
+import chat_context  # noqa: E402
+import fake_llm  # noqa: E402
+from conftest import ROOT  # noqa: E402
+
+TURNS = 40
+
+
+@tool
+def PythonCodeExecutor(code: str) -> str:
+    """Ferramenta de teste: devolve uma tabela de 30 linhas, como um groupby grande."""
+    rows = '\n'.join(f"| modelo {i} | {1000 * i} |" for i in range(30))
+    return f"| model | price |\n|---|---|\n{rows}\n"
+
+
+def test_prompt_size_stays_flat_over_a_long_session():
+    system_prompt = (ROOT / 'prompts' / 'system.txt').read_text()
+    agent = create_agent(model=fake_llm.FakeToolCallingModel(), tools=[PythonCodeExecutor], system_prompt=system_prompt)
+
+    history, input_tokens, history_tokens = [], [], []
+    for turn in range(TURNS):
+        history.append({'role': 'user', 'content': f"Pergunta {turn}: preço médio por modelo no ano {2000 + turn}?"})
+        messages, report = chat_context.build_context(history, system_prompt=system_prompt)
+        response = agent.invoke({'messages': messages})
+        history.append({'role': 'assistant', 'content': response['messages'][-1].content})
+        input_tokens.append(chat_context.usage_input_tokens(response['messages']))
+        history_tokens.append(report['history_tokens'])
+
+    # O histórico cresce sem parar; o prompt de cada turno, depois de encher o resumo, não
+    assert history_tokens[-1] > 5 * history_tokens[4]
+    settled = input_tokens[chat_context.SUMMARY_MAX_TURNS + chat_context.RECENT_TURNS:]
+    assert max(settled) <= 1.05 * min(settled)
@@ -0,0 +1,37 @@
+import pytest
+
+import data_engine
+
+pytest.importorskip('duckdb')
+
+FORD = (('manufacturer', 'in', ('ford',)),)
+
+
+@pytest.fixture(scope='module')
+def engine(car_csv):
+    return data_engine.open_duckdb(car_csv, car_csv.parent / '.cache')
+
+
+def test_sql_sees_only_the_filtered_rows(engine, car_data):
+    result, _ = engine.sql("SELECT manufacturer, count(*) AS n FROM cars GROUP BY 1", FORD)
+    assert result.to_dict('records') == [{'manufacturer': 'ford', 'n': (car_data['manufacturer'] == 'ford').sum()}]
+
+
+@pytest.mark.parametrize('query', [
+    "SELECT * FROM cars_all",
+    "SELECT * FROM main.cars_all",
+    "SELECT count(*) FROM cars WHERE price IN (SELECT price FROM cars_all)",
+    "WITH x AS (SELECT * FROM cars_all) SELECT * FROM x",
+    "WITH a AS (SELECT * FROM cars_all), cars_all AS (SELECT * FROM cars) SELECT * FROM a",
+    "SELECT * FROM cars_all, (WITH cars_all AS (SELECT * FROM cars) SELECT * FROM cars_all)",
+    "SELECT * FROM query_table('cars_all')",
+    "SELECT * FROM duckdb_tables()",
+])
+def test_sql_rejects_sources_other_than_cars(engine, query):
+    with pytest.raises(ValueError, match="só pode ler a tabela `cars`"):
+        engine.sql(query, FORD)
+
+
+def test_sql_accepts_ctes_over_cars(engine):
+    result, _ = engine.sql("WITH cars_all AS (SELECT * FROM cars) SELECT DISTINCT manufacturer FROM cars_all", FORD)
+    assert result['manufacturer'].tolist() == ['ford']
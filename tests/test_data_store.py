@@ -0,0 +1,38 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import data_store
+
+
+@pytest.fixture
+def original(car_data):
+    return car_data.copy(deep=True)
+
+
+def test_read_only_view_shares_buffers(car_data):
+    view = data_store.read_only_view(car_data)
+    assert np.shares_memory(view['price'].to_numpy(), car_data['price'].to_numpy())
+
+
+@pytest.mark.parametrize('user_code', [
+    "df['price'] = 0",
+    "df.loc[df.index[:10], 'odometer'] = -1",
+    "df['model_year'] += 1",
+    "df.fillna({'paint_color': 'black'}, inplace=True)",
+    "df.drop(columns=['model'], inplace=True)",
+    "df.sort_values('price', inplace=True)",
+    "df['manufacturer'] = df['manufacturer'].cat.rename_categories(str.upper)",
+    "df.iloc[0, 0] = 123456",
+])
+def test_tool_code_cannot_change_car_data(car_data, original, user_code):
+    # Mesmo formato do exec do PythonCodeExecutor no sandbox
+    exec(user_code, {'df': data_store.read_only_view(car_data), 'pd': pd}, {})
+    pd.testing.assert_frame_equal(car_data, original)
+
+
+def test_write_copies_only_the_touched_column(car_data):
+    view = data_store.read_only_view(car_data)
+    view['price'] = 0
+    assert not np.shares_memory(view['price'].to_numpy(), car_data['price'].to_numpy())
+    assert np.shares_memory(view['odometer'].to_numpy(), car_data['odometer'].to_numpy())
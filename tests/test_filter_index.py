@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+import data_browser
+import filter_index
+
+FILTERS = [
+    ('manufacturer', 'in', ('ford', 'toyota')),
+    ('paint_color', 'in', ('white', 'não existe')),
+    ('model_year', 'range', (2005, 2015)),
+    ('odometer', 'range', (50_000.0, 120_000.0)),
+    ('price', 'range', (-1, -1)),
+]
+
+
+@pytest.fixture(scope='module')
+def index(car_data):
+    return filter_index.build_filter_index(car_data)
+
+
+@pytest.mark.parametrize('filter_', FILTERS)
+def test_row_ids_for_matches_filter_mask(index, car_data, filter_):
+    assert filter_index.supports(index, filter_)
+    expected = np.flatnonzero(data_browser.filter_mask(car_data, [filter_]))
+    np.testing.assert_array_equal(np.sort(filter_index.row_ids_for(index, filter_)), expected)
+
+
+def test_indexed_filter_mask_matches_column_scan(index, car_data):
+    filters = FILTERS[:4]
+    np.testing.assert_array_equal(
+        data_browser.filter_mask(car_data, filters, index),
+        data_browser.filter_mask(car_data, filters),
+    )
+
+
+def test_extended_index_matches_rebuilt_index(car_data):
+    start = len(car_data) // 2
+    extended = filter_index.extend_filter_index(filter_index.build_filter_index(car_data.iloc[:start]), car_data, start)
+    rebuilt = filter_index.build_filter_index(car_data)
+    for filter_ in FILTERS:
+        np.testing.assert_array_equal(
+            np.sort(filter_index.row_ids_for(extended, filter_)),
+            np.sort(filter_index.row_ids_for(rebuilt, filter_)),
+        )
@@ -0,0 +1,139 @@
+import threading
+import time
+
+import pytest
+
+import fake_llm
+import llm_scheduler
+
+
+class ProviderError(Exception):
+    def __init__(self, message, code=None, status=None):
+        super().__init__(message)
+        self.code = code
+        self.status = status
+
+
+class ResourceExhausted(Exception):
+    pass
+
+
+def wrapped(cause):
+    try:
+        raise cause
+    except Exception as e:
+        try:
+            raise RuntimeError("Error calling model") from e
+        except RuntimeError as outer:
+            return outer
+
+
+@pytest.mark.parametrize('error', [
+    fake_llm.RateLimitError(),
+    ProviderError("quota", code=429),
+    ProviderError("quota", status='RESOURCE_EXHAUSTED'),
+    ResourceExhausted("quota"),
+    wrapped(ProviderError("quota", code=429)),
+])
+def test_rate_limits_are_detected_by_type_or_code(error):
+    assert llm_scheduler.is_rate_limit(error)
+
+
+@pytest.mark.parametrize('error', [
+    ValueError("linha 429 do arquivo inválida"),
+    ProviderError("Too many requests in the log, 429 entries", code=400),
+    wrapped(KeyError('429')),
+])
+def test_messages_mentioning_429_are_not_rate_limits(error):
+    assert not llm_scheduler.is_rate_limit(error)
+
+
+def provider_call(provider, name, attempts=None, seconds=0.05):
+    """Chamada que passa pelo provedor falso (429 quando ele está no limite)."""
+    def fn():
+        if attempts is not None:
+            attempts.setdefault(name, []).append(time.monotonic())
+        with provider.request():
+            time.sleep(seconds)
+        yield 'done', name
+    return fn
+
+
+def test_sessions_are_served_in_turn():
+    scheduler = llm_scheduler.Scheduler(max_concurrency=1)
+    gate, order = threading.Event(), []
+
+    def call(name):
+        def fn():
+            order.append(name)
+            yield 'done', name
+        return fn
+
+    # Segura o único worker enquanto as duas sessões enfileiram
+    blocker = scheduler.submit('outra', None, lambda: iter([('done', gate.wait())]))
+    while blocker.position() != 0:
+        time.sleep(0.01)
+    tickets = [scheduler.submit('a', None, call(f"a{i}")) for i in range(3)]
+    tickets += [scheduler.submit('b', None, call(f"b{i}")) for i in range(2)]
+    assert [ticket.position() for ticket in tickets] == [1, 3, 5, 2, 4]
+    gate.set()
+    for ticket in [blocker, *tickets]:
+        ticket.result()
+    assert order == ['a0', 'b0', 'a1', 'b1', 'a2']
+
+
+def test_identical_calls_in_flight_reach_the_provider_once():
+    provider = fake_llm.FakeProvider(max_concurrent=1)
+    scheduler = llm_scheduler.Scheduler(max_concurrency=2)
+    tickets = [
+        scheduler.submit(session, 'mesma pergunta', provider_call(provider, 'resposta', seconds=0.2))
+        for session in ('a', 'b', 'c')
+    ]
+    assert [ticket.result() for ticket in tickets] == ['resposta'] * 3
+    assert [ticket.deduplicated for ticket in tickets] == [False, True, True]
+    assert provider.accepted == 1
+    assert scheduler.stats()['deduplicated'] == 2
+
+    # Terminada a chamada, a mesma chave volta a ir ao provedor
+    scheduler.submit('a', 'mesma pergunta', provider_call(provider, 'resposta')).result()
+    assert provider.accepted == 2
+
+
+def test_concurrency_within_the_provider_limit_avoids_rate_limits():
+    provider = fake_llm.FakeProvider(max_concurrent=2)
+    scheduler = llm_scheduler.Scheduler(max_concurrency=2)
+    tickets = [scheduler.submit(f"s{i}", None, provider_call(provider, i)) for i in range(8)]
+    assert [ticket.result() for ticket in tickets] == list(range(8))
+    assert provider.rejected == 0
+    assert scheduler.stats()['max_in_flight'] == 2
+
+
+def test_rate_limited_calls_are_retried_after_the_backoff():
+    provider = fake_llm.FakeProvider(max_concurrent=2)
+    scheduler = llm_scheduler.Scheduler(max_concurrency=4, max_retries=20, backoff_base=0.02, backoff_max=0.1)
+    attempts = {}
+    tickets = [scheduler.submit(f"s{i}", None, provider_call(provider, i, attempts)) for i in range(8)]
+    assert [ticket.result() for ticket in tickets] == list(range(8))
+
+    assert provider.rejected > 0
+    assert provider.max_in_flight <= provider.max_concurrent
+    stats = scheduler.stats()
+    assert stats['retries'] == provider.rejected
+    assert stats['max_in_flight'] <= scheduler.max_concurrency
+    for i, ticket in enumerate(tickets):
+        delays = [event['delay'] for kind, event in ticket.events() if kind == 'retry']
+        starts = attempts[i]
+        assert len(starts) == len(delays) + 1
+        # Cada nova tentativa só começa depois do backoff da anterior
+        for delay, before, after in zip(delays, starts, starts[1:]):
+            assert after - before >= delay
+
+
+def test_rate_limits_past_the_retry_budget_surface_as_errors():
+    provider = fake_llm.FakeProvider(max_concurrent=0)
+    scheduler = llm_scheduler.Scheduler(max_concurrency=1, max_retries=2, backoff_base=0.01)
+    ticket = scheduler.submit('a', None, provider_call(provider, 'x'))
+    with pytest.raises(fake_llm.RateLimitError):
+        ticket.result()
+    assert provider.rejected == 3
+    assert scheduler.stats()['failed'] == 1
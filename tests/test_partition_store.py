@@ -0,0 +1,89 @@
+import subprocess
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import data_browser
+import filter_index
+import partition_store
+import synthetic_data
+from conftest import ROOT
+
+ROWS_PER_DROP = 2000
+
+
+def write_drop(drop_dir, day, seed=None):
+    df = synthetic_data.generate(ROWS_PER_DROP, seed=day if seed is None else seed)
+    df['date_posted'] = f"2019-01-{day + 1:02d}"
+    if day == 2:
+        # Categorias que não existiam nos arquivos anteriores, no começo e no fim da ordem
+        df.loc[:20, 'model'] = 'aaa modelo novo'
+        df.loc[21:40, 'model'] = 'zzz modelo novo'
+    df.to_csv(drop_dir / f"listings-{day}.csv", index=False)
+
+
+@pytest.fixture
+def store(tmp_path):
+    drop_dir = tmp_path / 'drops'
+    drop_dir.mkdir()
+    for day in range(2):
+        write_drop(drop_dir, day)
+    return partition_store.PartitionStore(drop_dir, tmp_path / 'snapshot', interval=0)
+
+
+def test_new_drops_are_appended_to_the_previous_frame(store):
+    before = store.read_frame(store.current())
+    write_drop(store.drop_dir, 2)
+    write_drop(store.drop_dir, 3)
+    after = store.read_frame(store.current())
+
+    assert after.attrs['appended_to'] == (before.attrs['dataset_version'], len(before))
+    pd.testing.assert_frame_equal(after, partition_store.read_frame(store.manifest, store.snapshot_dir))
+    pd.testing.assert_frame_equal(after.iloc[:len(before)], before, check_categorical=False)
+
+
+def test_changed_drop_reads_the_whole_frame(store):
+    store.read_frame(store.current())
+    write_drop(store.drop_dir, 0, seed=99)
+    after = store.read_frame(store.current())
+
+    assert 'appended_to' not in after.attrs
+    pd.testing.assert_frame_equal(after, partition_store.read_frame(store.manifest, store.snapshot_dir))
+
+
+def test_extended_index_and_sort_orders_match_a_rebuild(store):
+    caches = [
+        partition_store.AppendCache(filter_index.build_filter_index, filter_index.extend_filter_index),
+        partition_store.AppendCache(data_browser.build_sort_orders, data_browser.extend_sort_orders),
+    ]
+    for cache in caches:
+        cache.get(store.read_frame(store.current()))
+    write_drop(store.drop_dir, 2)
+    df = store.read_frame(store.current())
+    index, sort_orders = (cache.get(df) for cache in caches)
+    assert [(cache.builds, cache.extensions) for cache in caches] == [(1, 1), (1, 1)]
+
+    rebuilt = filter_index.build_filter_index(df)
+    assert index['n_rows'] == rebuilt['n_rows']
+    for column, postings in rebuilt['values'].items():
+        assert postings.keys() == index['values'][column].keys()
+        for value, positions in postings.items():
+            np.testing.assert_array_equal(index['values'][column][value], positions)
+    for column, (sorted_values, order) in rebuilt['ranges'].items():
+        np.testing.assert_array_equal(index['ranges'][column][0], sorted_values)
+        np.testing.assert_array_equal(index['ranges'][column][1], order)
+    for column, order in data_browser.build_sort_orders(df).items():
+        np.testing.assert_array_equal(sort_orders[column], order)
+
+
+def test_app_modules_import_without_pyarrow():
+    # Sem pyarrow o app volta ao caminho do CSV; só o modo de diretório fica indisponível
+    code = (
+        "import sys\n"
+        "sys.modules.update(dict.fromkeys(['pyarrow', 'pyarrow.ipc', 'pyarrow.parquet']))\n"
+        "import data_engine, data_store, partition_store, sandbox\n"
+        "assert not data_store.SNAPSHOT_DISPONIVEL and partition_store.FRAGMENT_SCHEMA is None\n"
+    )
+    subprocess.run([sys.executable, '-c', code], cwd=ROOT, check=True)
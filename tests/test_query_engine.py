@@ -0,0 +1,106 @@
+import numpy as np
+import pytest
+
+import aggregates
+import assistant
+import data_browser
+import query_engine
+
+
+@pytest.fixture(scope='module')
+def vocabulary(car_data):
+    return query_engine.build_vocabulary(car_data)
+
+
+@pytest.fixture(scope='module')
+def engine(car_data):
+    """Motor com getters sem cache, calculados direto das linhas filtradas."""
+    sort_orders = data_browser.build_sort_orders(car_data)
+
+    def frame_for(filters):
+        return car_data[data_browser.filter_mask(car_data, filters)]
+
+    return query_engine.QueryEngine(
+        car_data,
+        cube_for=lambda filters: aggregates.build_cube(frame_for(filters)),
+        frame_for=frame_for,
+        sorted_ids_for=lambda filters, sort_by, ascending: data_browser.row_ids(car_data, sort_orders, filters, sort_by, ascending),
+    )
+
+
+def table_rows(text):
+    """Linhas da tabela markdown da resposta: {rótulo: valor exibido}."""
+    rows = [line.strip('| ').split(' | ') for line in text.splitlines() if line.startswith('| ')]
+    return dict(rows[2:])
+
+
+@pytest.mark.parametrize('question', [
+    "Qual o preço médio de carros que não são 4x4?",
+    "How many cars are not automatic?",
+    "Quantos carros da ford exceto pickups?",
+    "Top 3 manufacturers by listings, excluding ford",
+    "preço médio do Honda Civic",
+    "média de preço dos carros com mais de 10 anos",
+    "How many cars were listed for more than 30 days?",
+    "Quantos carros com preço igual a 0?",
+    "Quantos carros abaixo de 500 dólares?",
+    "Quantos carros foram anunciados em 2019?",
+])
+def test_unhandled_terms_fall_back_to_the_agent(vocabulary, question):
+    assert query_engine.parse(question, vocabulary) is None
+
+
+@pytest.mark.parametrize('question, filters', [
+    ("Preço médio por fabricante sem 4x4", (('is_4wd', 'in', (False,)),)),
+    ("Preço médio por fabricante dos 4x4", (('is_4wd', 'in', (True,)),)),
+])
+def test_handled_filters_still_parse(vocabulary, question, filters):
+    intent = query_engine.parse(question, vocabulary)
+    assert intent is not None
+    assert intent['filters'] == filters
+
+
+def test_currency_word_after_a_price_bound_still_parses(vocabulary):
+    intent = query_engine.parse("Quantos carros por tipo com preço abaixo de 5000 dólares?", vocabulary)
+    [(column, op, (low, high))] = intent['filters']
+    assert (column, op) == ('price', 'range')
+    assert high < 5000
+
+
+def test_suggested_questions_keep_their_direct_answers(vocabulary):
+    parsed = [prompt for prompt in assistant.SUGGESTED_PROMPTS if query_engine.parse(prompt, vocabulary) is not None]
+    assert "Qual o preço médio por fabricante ('manufacturer')?" in parsed
+    assert "Liste os 5 fabricantes com o maior preço médio, mostrando o preço." in parsed
+
+
+def test_mean_price_by_manufacturer_matches_groupby(engine, car_data):
+    answer = engine.answer("Qual o preço médio por fabricante ('manufacturer')?")
+    priced = car_data[car_data['price'] >= query_engine.MIN_PRICE]
+    expected = priced.groupby('manufacturer', observed=True)['price'].mean()
+    assert table_rows(answer['text']) == {
+        query_engine._format_value('manufacturer', m): query_engine._format_value('price', v) for m, v in expected.items()
+    }
+
+
+@pytest.mark.parametrize('question, by, rows', [
+    ("Quantos carros por tipo em 2015?", 'type', lambda df: df['model_year'] == 2015),
+    ("Quantos carros por ano do modelo?", 'model_year', lambda df: np.ones(len(df), dtype=bool)),
+])
+def test_counts_match_groupby(engine, car_data, question, by, rows):
+    answer = engine.answer(question)
+    expected = car_data[rows(car_data)].groupby(by, observed=True).size()
+    assert table_rows(answer['text']) == {
+        query_engine._format_value(by, k): query_engine._format_value('count', n) for k, n in expected.items() if n > 0
+    }
+
+
+@pytest.mark.parametrize('question, described', [
+    ("Quantos carros por tipo com preço acima de 5000?", "Preço: acima de $ 5,000.00"),
+    ("Quantos carros por tipo com preço > 5000?", "Preço: acima de $ 5,000.00"),
+    ("Quantos carros por tipo com preço >= 5000?", "Preço: a partir de $ 5,000.00"),
+    ("Quantos carros por tipo com preço abaixo de 5000?", "Preço: abaixo de $ 5,000.00"),
+    ("Quantos carros por tipo com preço até 5000?", "Preço: até $ 5,000.00"),
+])
+def test_strict_price_bounds_are_described_as_strict(engine, question, described):
+    answer = engine.answer(question)
+    assert answer['text'].endswith(f"_Filtros: {described}_")
@@ -0,0 +1,87 @@
+import threading
+import time
+
+import pytest
+
+import sandbox
+
+
+@pytest.fixture(scope='module')
+def pool(car_csv):
+    pool = sandbox.SandboxPool(car_csv, car_csv.parent / '.cache', size=2, timeout=4,
+                               cpu_seconds=1, memory_mb=256, max_output_bytes=10_000)
+    yield pool
+    pool.close()
+
+
+def test_filtered_df(pool):
+    output, error = pool.execute("print(df['manufacturer'].value_counts().to_dict())",
+                                 (('manufacturer', 'in', ('ford',)),))
+    assert error is None
+    assert list(eval(output)) == ['ford']
+
+
+def test_concurrent_calls_run_in_parallel(pool):
+    results = {}
+
+    def call(tag):
+        results[tag] = pool.execute(f"import time; time.sleep(1.5); print({tag!r})")
+
+    threads = [threading.Thread(target=call, args=(tag,)) for tag in ('a', 'b')]
+    start = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert time.monotonic() - start < 2.5
+    assert results == {'a': ('a\n', None), 'b': ('b\n', None)}
+
+
+@pytest.mark.parametrize('code, message', [
+    ("while True: pass", "limites de CPU ou memória"),
+    ("x = bytearray(512 * 1024 ** 2)", "limite de memória"),
+    ("import time; time.sleep(10)", "tempo limite de 4s"),
+])
+def test_limits_kill_the_call_and_the_pool_recovers(pool, car_data, code, message):
+    output, error = pool.execute(code)
+    assert message in error
+    assert pool.execute("print(len(df))") == (f"{len(car_data)}\n", None)
+    assert len(pool._all) == 2
+
+
+def test_output_is_capped(pool):
+    output, error = pool.execute("for i in range(10 ** 8): print(i)")
+    assert "Saída truncada" in error
+    assert len(output.encode()) <= 10_000
+    assert pool.execute("print('ok')") == ('ok\n', None)
+
+
+def test_output_streams_before_the_call_ends(pool):
+    events = pool.events("import time\nprint('primeiro', flush=True)\ntime.sleep(1)\nprint('fim')")
+    start = time.monotonic()
+    assert next(events) == ('out', 'primeiro')
+    assert time.monotonic() - start < 0.8
+    assert ''.join(text for _, text in events) == "\nfim\n"
+
+
+def test_directory_pool_follows_new_manifests_without_restarting(tmp_path):
+    import partition_store
+    from test_partition_store import write_drop
+
+    drop_dir = tmp_path / 'drops'
+    drop_dir.mkdir()
+    write_drop(drop_dir, 0)
+    store = partition_store.PartitionStore(drop_dir, tmp_path / 'snapshot', interval=0)
+    manifest = store.current()
+    pool = sandbox.SandboxPool(drop_dir, tmp_path / 'snapshot', size=1, manifest=manifest)
+    try:
+        rows = int(pool.execute("print(len(df))", manifest=manifest)[0])
+        pids = [worker.process.pid for worker in pool._all]
+        write_drop(drop_dir, 1)
+        manifest = store.current()
+        output, error = pool.execute("print(len(df), df['date_posted'].nunique())", manifest=manifest)
+        assert error is None
+        assert output.split() == [str(rows + manifest['partitions']['2019-01-02']['rows']), '2']
+        assert [worker.process.pid for worker in pool._all] == pids
+    finally:
+        pool.close()
@@ -0,0 +1,81 @@
+import pytest
+
+import tool_cache
+
+FORD = (('manufacturer', 'in', ('ford',)),)
+CODE = "media = df.groupby('manufacturer')['price'].mean()\nprint(media)"
+
+
+def test_formatting_comments_and_variable_names_share_a_fingerprint():
+    rewritten = (
+        "# preço médio\n"
+        "resultado = df.groupby( 'manufacturer' )[ 'price' ].mean()   \n"
+        "\n"
+        "print(resultado)\n"
+    )
+    assert tool_cache.fingerprint(rewritten) == tool_cache.fingerprint(CODE)
+
+
+def test_function_arguments_are_renamed_too():
+    first = "def f(x):\n    return x * 2\nprint(f(df['price']).sum())"
+    second = "def f(valor):\n    return valor * 2\nprint(f(df['price']).sum())"
+    assert tool_cache.fingerprint(first) == tool_cache.fingerprint(second)
+
+
+@pytest.mark.parametrize('other', [
+    "media = df.groupby('manufacturer')['odometer'].mean()\nprint(media)",
+    "media = df.groupby('type')['price'].mean()\nprint(media)",
+    "media = df.groupby('manufacturer')['price'].median()\nprint(media)",
+])
+def test_different_columns_or_methods_change_the_fingerprint(other):
+    assert tool_cache.fingerprint(other) != tool_cache.fingerprint(CODE)
+
+
+@pytest.mark.parametrize('code', [
+    "print(df.sample(5))",
+    "import random\nprint(random.choice(df['model'].tolist()))",
+    "print(pd.Timestamp.now())",
+    "print(df.sample(frac=0.1)['price'].mean())",
+    "print(df[",
+])
+def test_nondeterministic_or_invalid_code_is_not_cached(code):
+    assert tool_cache.fingerprint(code) is None
+    cache = tool_cache.ToolResultCache()
+    cache.put(code, 'v1', (), "saída")
+    assert cache.get(code, 'v1') is None
+    assert cache.stats()['entries'] == 0
+
+
+def test_hits_and_misses_are_counted():
+    cache = tool_cache.ToolResultCache()
+    assert cache.get(CODE, 'v1', FORD) is None
+    cache.put(CODE, 'v1', FORD, "ford 12345.6")
+    assert cache.get(CODE.replace('media', 'm'), 'v1', FORD) == "ford 12345.6"
+    assert cache.stats() == {'hits': 1, 'misses': 1, 'hit_rate': 0.5, 'entries': 1, 'bytes': len("ford 12345.6")}
+
+
+def test_scope_version_or_filters_change_misses():
+    cache = tool_cache.ToolResultCache()
+    cache.put(CODE, 'v1', FORD, "ford")
+    assert cache.get(CODE, 'v2', FORD) is None
+    assert cache.get(CODE, 'v1', (('manufacturer', 'in', ('toyota',)),)) is None
+    assert cache.get(CODE, 'v1') is None
+    assert cache.get(CODE, 'v1', FORD) == "ford"
+
+
+def test_lru_evicts_by_byte_budget():
+    cache = tool_cache.ToolResultCache(budget_bytes=25)
+    codes = [f"print(df['price'].quantile({q}))" for q in (0.1, 0.2, 0.3)]
+    cache.put(codes[0], 'v1', (), "a" * 10)
+    cache.put(codes[1], 'v1', (), "b" * 10)
+    assert cache.get(codes[0], 'v1') == "a" * 10  # o primeiro passa a ser o mais recente
+    cache.put(codes[2], 'v1', (), "c" * 10)
+
+    assert cache.get(codes[1], 'v1') is None
+    assert cache.get(codes[0], 'v1') == "a" * 10
+    assert cache.get(codes[2], 'v1') == "c" * 10
+    assert cache.stats()['bytes'] == 20
+
+    # Maior que o orçamento inteiro: nem entra, nem despeja os outros
+    cache.put("print(df.describe())", 'v1', (), "x" * 26)
+    assert cache.stats()['entries'] == 2
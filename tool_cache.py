@@ -0,0 +1,117 @@
+"""Cache de resultados do PythonCodeExecutor, endereçado pelo conteúdo do código.
+
+A chave é a impressão digital da AST normalizada do código (sem espaços nem
+comentários, com nomes de variáveis locais renomeados em ordem de aparição)
+mais a versão dos dados no escopo do filtro e o filtro ativo. Assim `df.groupby('manufacturer')
+['price'].mean()` escrito com outra formatação ou atribuído a outra variável
+reaproveita o resultado anterior.
+
+O cache é compartilhado entre sessões (thread-safe) e tem despejo LRU por
+orçamento de bytes. Não é esvaziado quando os dados mudam: com a ingestão
+particionada, a versão na chave é a das partições que o filtro enxerga, então
+só os resultados que dependem de partições alteradas deixam de ser
+encontrados (e saem pelo LRU); os demais continuam valendo.
+"""
+import ast
+import builtins
+import hashlib
+import threading
+from collections import OrderedDict
+
+DEFAULT_BUDGET_BYTES = 16 * 1024 * 1024
+
+# Nomes que nunca são renomeados: o DataFrame, o pandas e os builtins
+_RESERVED_NAMES = {'df', 'pd', *dir(builtins)}
+
+# Código que usa estes nomes pode dar resultados diferentes a cada execução
+_NONDETERMINISTIC_NAMES = {'random', 'sample', 'shuffle', 'now', 'today', 'time', 'perf_counter', 'uuid4'}
+
+
+class _Normalizer(ast.NodeTransformer):
+    def __init__(self):
+        self.names = {}
+        self.deterministic = True
+
+    def _canonical(self, name):
+        if name in _RESERVED_NAMES:
+            return name
+        return self.names.setdefault(name, f"v{len(self.names)}")
+
+    def visit_Name(self, node):
+        if node.id in _NONDETERMINISTIC_NAMES:
+            self.deterministic = False
+        node.id = self._canonical(node.id)
+        return node
+
+    def visit_arg(self, node):
+        node.arg = self._canonical(node.arg)
+        return self.generic_visit(node)
+
+    def visit_Attribute(self, node):
+        if node.attr in _NONDETERMINISTIC_NAMES:
+            self.deterministic = False
+        return self.generic_visit(node)
+
+
+def fingerprint(code):
+    """Hash da AST normalizada, ou None se o código não deve ser cacheado."""
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return None
+    normalizer = _Normalizer()
+    tree = normalizer.visit(tree)
+    if not normalizer.deterministic:
+        return None
+    return hashlib.sha256(ast.dump(tree, include_attributes=False).encode()).hexdigest()
+
+
+class ToolResultCache:
+    def __init__(self, budget_bytes=DEFAULT_BUDGET_BYTES):
+        self.budget_bytes = budget_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _key(self, code, dataset_version, filters):
+        code_hash = fingerprint(code)
+        if code_hash is None:
+            return None
+        return code_hash, dataset_version, tuple(filters)
+
+    def get(self, code, dataset_version, filters=()):
+        key = self._key(code, dataset_version, filters)
+        with self._lock:
+            if key is None or key not in self._entries:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key]
+
+    def put(self, code, dataset_version, filters, output):
+        key = self._key(code, dataset_version, filters)
+        size = len(output.encode())
+        if key is None or size > self.budget_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._size -= len(self._entries.pop(key).encode())
+            self._entries[key] = output
+            self._size += size
+            while self._size > self.budget_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted.encode())
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0,
+                'entries': len(self._entries),
+                'bytes': self._size,
+            }